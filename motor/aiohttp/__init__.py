@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Serve GridFS files with Motor and aiohttp.
+"""Serve GridFS files, and store uploads, with Motor and aiohttp.
 
 Requires Python 3.4 or later and aiohttp 2.0 or later.
 
@@ -25,8 +25,11 @@ import mimetypes
 
 import aiohttp.web
 import gridfs
+from motor import motor_http
 from motor.motor_asyncio import (AsyncIOMotorDatabase,
-                                 AsyncIOMotorGridFSBucket)
+                                 AsyncIOMotorGridFSBucket,
+                                 AsyncIOMotorGridIn,
+                                 AsyncIOMotorGridOut)
 
 
 def get_gridfs_file(bucket, filename, request):
@@ -109,14 +112,48 @@ def set_extra_headers(response, gridout):
     pass
 
 
-def _config_error(request):
+def create_grid_in(root_collection, filename, request):
+    """Override to create the file an upload is written to.
+
+    By default the filename portion of the URL is used as the filename, and
+    the request's Content-Type as the file's content type. To choose the
+    file's ``_id``, chunk size, or other fields, pass a function that
+    returns an :class:`~motor.motor_asyncio.AsyncIOMotorGridIn` to
+    :class:`AIOHTTPGridFSUpload`. For example::
+
+        def create_grid_in_with_user(root_collection, filename, request):
+            return AsyncIOMotorGridIn(
+                root_collection,
+                filename=filename,
+                metadata={'user': request.headers['X-User']})
+
+        client = AsyncIOMotorClient()
+        upload_handler = AIOHTTPGridFSUpload(
+            client.my_database, create_grid_in=create_grid_in_with_user)
+
+    :Parameters:
+      - `root_collection`: An
+        :class:`~motor.motor_asyncio.AsyncIOMotorCollection`, the GridFS root
+        collection
+      - `filename`: A string, the URL portion matching {filename} in the URL
+        pattern
+      - `request`: An :class:`aiohttp.web.Request`
+    """
+    kwargs = {'filename': filename}
+    if request.content_type:
+        kwargs['contentType'] = request.content_type
+
+    return AsyncIOMotorGridIn(root_collection, **kwargs)
+
+
+def _config_error(request, handler='AIOHTTPGridFS'):
     try:
         formatter = request.match_info.route.resource.get_info()['formatter']
-        msg = ('Bad AIOHTTPGridFS route "%s", requires a {filename} variable' %
-               formatter)
+        msg = ('Bad %s route "%s", requires a {filename} variable' %
+               (handler, formatter))
     except (KeyError, AttributeError):
         # aiohttp API changed? Fall back to simpler error message.
-        msg = ('Bad AIOHTTPGridFS route for request: %s' % request)
+        msg = ('Bad %s route for request: %s' % (handler, request))
 
     raise aiohttp.web.HTTPInternalServerError(text=msg) from None
 
@@ -147,11 +184,23 @@ class AIOHTTPGridFS:
     a GridFS file requires a quick check of the file's ``uploadDate`` in
     MongoDB. Pass a custom :func:`get_cache_time` to customize this.
 
+    Range requests are answered with 206 Partial Content, reading only the
+    chunks that hold the requested bytes, so clients can seek in videos and
+    resume downloads. Single, suffix and multiple ranges are supported, and
+    an If-Range header is checked against the Etag or Last-Modified date.
+
     :Parameters:
       - `database`: An :class:`AsyncIOMotorDatabase`
       - `get_gridfs_file`: Optional override for :func:`get_gridfs_file`
       - `get_cache_time`: Optional override for :func:`get_cache_time`
       - `set_extra_headers`: Optional override for :func:`set_extra_headers`
+      - `cache`: Optional :class:`~motor.motor_cache.FileCache` to serve
+        small, popular files from memory. Files are cached by filename, so
+        don't share a cache between handlers that map a filename to
+        different files.
+      - `metadata_cache`: Optional :class:`~motor.motor_cache.MetadataCache`
+        to answer conditional and HEAD requests, and 404s, without querying
+        MongoDB. Like `cache`, it is keyed by filename.
 
     .. _GridFS: https://docs.mongodb.com/manual/core/gridfs/
     """
@@ -161,16 +210,21 @@ class AIOHTTPGridFS:
                  root_collection='fs',
                  get_gridfs_file=get_gridfs_file,
                  get_cache_time=get_cache_time,
-                 set_extra_headers=set_extra_headers):
+                 set_extra_headers=set_extra_headers,
+                 cache=None,
+                 metadata_cache=None):
         if not isinstance(database, AsyncIOMotorDatabase):
             raise TypeError("First argument to AIOHTTPGridFS must be "
                             "AsyncIOMotorDatabase, not %r" % database)
 
         self._database = database
         self._bucket = AsyncIOMotorGridFSBucket(self._database, root_collection)
+        self._root_collection = self._database[root_collection]
         self._get_gridfs_file = get_gridfs_file
         self._get_cache_time = get_cache_time
         self._set_extra_headers = set_extra_headers
+        self._cache = cache
+        self._metadata_cache = metadata_cache
 
     @asyncio.coroutine
     def __call__(self, request):
@@ -184,12 +238,7 @@ class AIOHTTPGridFS:
             raise aiohttp.web.HTTPMethodNotAllowed(
                 method=request.method, allowed_methods={'GET', 'HEAD'})
 
-        try:
-            gridout = yield from self._get_gridfs_file(self._bucket,
-                                                       filename,
-                                                       request)
-        except gridfs.NoFile:
-            raise aiohttp.web.HTTPNotFound(text=request.path)
+        gridout, data = yield from self._get_file(filename, request)
 
         resp = aiohttp.web.StreamResponse()
         self._set_standard_headers(request.path, resp, gridout)
@@ -215,24 +264,136 @@ class AIOHTTPGridFS:
             resp.set_status(304)
             return resp
 
-        resp.content_length = gridout.length
+        length = gridout.length
+        ranges = motor_http.parse_range(request.headers.get("Range"), length)
+        if ranges is not None and not motor_http.if_range_matches(
+                request.headers.get("If-Range"),
+                resp.headers["Etag"],
+                gridout.upload_date):
+            # The file changed since the client cached part of it.
+            ranges = None
+
+        if ranges == []:
+            resp.set_status(416)
+            resp.headers["Content-Range"] = "bytes */%d" % length
+            resp.content_length = 0
+            return resp
+
+        trailer = b''
+        if ranges is None:
+            parts = [(b'', 0, length)]
+            resp.content_length = length
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            parts = [(b'', start, end)]
+            resp.set_status(206)
+            resp.headers["Content-Range"] = motor_http.content_range(
+                start, end, length)
+            resp.content_length = end - start
+        else:
+            boundary, headers, trailer = motor_http.multipart_parts(
+                ranges, length, resp.headers.get("Content-Type"))
+            parts = [(header, start, end)
+                     for header, (start, end) in zip(headers, ranges)]
+            resp.set_status(206)
+            resp.headers["Content-Type"] = (
+                "multipart/byteranges; boundary=" + boundary)
+            resp.content_length = motor_http.multipart_length(
+                ranges, headers, trailer)
+
         yield from resp.prepare(request)
 
         if request.method == 'GET':
+            if (data is None and self._cache is not None
+                    and self._cache.cacheable(gridout)):
+                data = yield from gridout.read()
+                self._cache.put(filename, gridout, data)
+
             resp.set_tcp_cork(True)
             try:
-                written = 0
-                while written < gridout.length:
-                    # Reading chunk_size at a time minimizes buffering.
-                    chunk = yield from gridout.read(gridout.chunk_size)
-                    resp.write(chunk)
+                for header, start, end in parts:
+                    if header:
+                        resp.write(header)
+
+                    yield from self._write_range(resp, gridout, start, end,
+                                                 data)
+
+                if trailer:
+                    resp.write(trailer)
                     yield from resp.drain()
-                    written += len(chunk)
             finally:
                 resp.set_tcp_nodelay(True)
 
         return resp
 
+    @asyncio.coroutine
+    def _get_file(self, filename, request):
+        # Returns (gridout, contents if cached or None).
+        cached = None
+        if self._cache is not None:
+            cached = self._cache.get(filename)
+            if cached is not None and cached[2]:
+                return cached[:2]
+
+        try:
+            gridout = yield from self._open(filename, request)
+        except gridfs.NoFile:
+            if cached is not None:
+                self._cache.discard(filename)
+
+            raise aiohttp.web.HTTPNotFound(text=request.path)
+
+        data = None
+        if cached is not None:
+            data = self._cache.validate(filename, gridout)
+
+        return gridout, data
+
+    @asyncio.coroutine
+    def _open(self, filename, request):
+        # Returns a gridout, made from a cached file document if possible.
+        metadata_cache = self._metadata_cache
+        if metadata_cache is not None:
+            found, document = metadata_cache.get(filename)
+            if found:
+                if document is None:
+                    raise gridfs.NoFile(filename)
+
+                return AsyncIOMotorGridOut(self._root_collection,
+                                           file_document=document)
+
+        try:
+            gridout = yield from self._get_gridfs_file(self._bucket,
+                                                       filename,
+                                                       request)
+
+            # A custom get_gridfs_file may return an unopened gridout.
+            yield from gridout.open()
+        except gridfs.NoFile:
+            if metadata_cache is not None:
+                metadata_cache.put(filename, None)
+
+            raise
+
+        if metadata_cache is not None:
+            metadata_cache.put(filename, gridout.delegate._file)
+
+        return gridout
+
+    @asyncio.coroutine
+    def _write_range(self, resp, gridout, start, end, data=None):
+        if data is not None:
+            resp.write(data[start:end])
+            yield from resp.drain()
+            return
+
+        gridout.seek(start)
+        # Reading up to each chunk boundary minimizes buffering.
+        for size in motor_http.range_reads(gridout, start, end):
+            chunk = yield from gridout.read(size)
+            resp.write(chunk)
+            yield from resp.drain()
+
     def _set_standard_headers(self, path, resp, gridout):
         resp.last_modified = gridout.upload_date
         content_type = gridout.content_type
@@ -244,6 +405,7 @@ class AIOHTTPGridFS:
 
         # MD5 is calculated on the MongoDB server when GridFS file is created.
         resp.headers["Etag"] = '"%s"' % gridout.md5
+        resp.headers["Accept-Ranges"] = "bytes"
 
         # Overridable method get_cache_time.
         cache_time = self._get_cache_time(path,
@@ -259,3 +421,93 @@ class AIOHTTPGridFS:
             resp.headers["Cache-Control"] = "max-age=" + str(cache_time)
         else:
             resp.headers["Cache-Control"] = "public"
+
+
+class AIOHTTPGridFSUpload:
+    """Stream request bodies into `GridFS`_.
+
+    This class is a :ref:`request handler <aiohttp-web-handler>` that stores
+    the raw body of a POST or PUT request as a new GridFS file.
+
+    .. code-block:: python
+
+        client = AsyncIOMotorClient()
+        upload_handler = AIOHTTPGridFSUpload(client.my_database)
+
+        app = aiohttp.web.Application()
+
+        # The upload URL pattern must have a "{filename}" variable.
+        resource = app.router.add_resource('/upload/{filename}')
+        resource.add_route('POST', upload_handler)
+        resource.add_route('PUT', upload_handler)
+
+    The body is read from ``request.content`` a chunk at a time and written
+    to an :class:`~motor.motor_asyncio.AsyncIOMotorGridIn`, so memory use
+    doesn't grow with the size of the upload. The response has status 201
+    and a JSON body like ``{"_id": "...", "length": 1234}``. If the upload
+    fails or the client disconnects, the chunks already written are
+    removed. Set the application's ``client_max_size`` to accept large
+    uploads.
+
+    :Parameters:
+      - `database`: An :class:`AsyncIOMotorDatabase`
+      - `root_collection` (optional): The GridFS bucket name
+      - `create_grid_in`: Optional override for :func:`create_grid_in`
+      - `parallel_upload` (optional): If True, insert chunks in concurrent
+        batches, see :meth:`AsyncIOMotorGridIn.parallel_upload`
+
+    .. _GridFS: https://docs.mongodb.com/manual/core/gridfs/
+    """
+
+    def __init__(self,
+                 database,
+                 root_collection='fs',
+                 create_grid_in=create_grid_in,
+                 parallel_upload=False):
+        if not isinstance(database, AsyncIOMotorDatabase):
+            raise TypeError("First argument to AIOHTTPGridFSUpload must be "
+                            "AsyncIOMotorDatabase, not %r" % database)
+
+        self._database = database
+        self._root_collection = database[root_collection]
+        self._create_grid_in = create_grid_in
+        self._parallel_upload = parallel_upload
+
+    @asyncio.coroutine
+    def __call__(self, request):
+        """Store the request body in GridFS."""
+        try:
+            filename = request.match_info['filename']
+        except KeyError:
+            _config_error(request, 'AIOHTTPGridFSUpload')
+
+        if request.method not in ('POST', 'PUT'):
+            raise aiohttp.web.HTTPMethodNotAllowed(
+                method=request.method, allowed_methods={'POST', 'PUT'})
+
+        grid_in = self._create_grid_in(self._root_collection,
+                                       filename,
+                                       request)
+
+        if self._parallel_upload:
+            grid_in.parallel_upload()
+
+        try:
+            chunk_size = grid_in.chunk_size
+            while True:
+                # Reading chunk_size at a time minimizes buffering.
+                chunk = yield from request.content.read(chunk_size)
+                if not chunk:
+                    break
+
+                yield from grid_in.write(chunk)
+
+            yield from grid_in.close()
+        except (Exception, asyncio.CancelledError):
+            # Failed, or the client disconnected.
+            yield from grid_in.abort()
+            raise
+
+        return aiohttp.web.json_response(
+            {'_id': str(grid_in._id), 'length': grid_in.length},
+            status=201)
@@ -16,9 +16,17 @@ from __future__ import unicode_literals, absolute_import
 
 """Framework-agnostic core of Motor, an asynchronous driver for MongoDB."""
 
+import collections
+import datetime
 import functools
+import heapq
+import itertools
+import numbers
 import sys
 import textwrap
+import time
+import uuid
+import weakref
 
 import pymongo
 import pymongo.auth
@@ -29,11 +37,28 @@ import pymongo.mongo_client
 import pymongo.mongo_replica_set_client
 import pymongo.son_manipulator
 
-from pymongo.bulk import BulkOperationBuilder
+from bson import BSON, RE_TYPE
+from bson.binary import Binary
+from bson.code import Code
+from bson.dbref import DBRef
+from bson.decimal128 import Decimal128
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from bson.regex import Regex
+from bson.son import SON
+from bson.timestamp import Timestamp
+from pymongo.bulk import BulkOperationBuilder, _Bulk
+from pymongo.helpers import _index_list
 from pymongo.database import Database
 from pymongo.collection import Collection
 from pymongo.cursor import Cursor, _QUERY_OPTIONS
 from pymongo.command_cursor import CommandCursor
+from pymongo.operations import _WriteOp
+from pymongo.results import (BulkWriteResult,
+                             InsertManyResult,
+                             InsertOneResult)
 
 from .metaprogramming import (AsyncCommand,
                               AsyncRead,
@@ -41,10 +66,13 @@ from .metaprogramming import (AsyncCommand,
                               coroutine_annotation,
                               create_class_with_framework,
                               DelegateMethod,
+                              invalidate_reads,
                               motor_coroutine,
                               MotorCursorChainingMethod,
                               ReadOnlyProperty)
+from . import motor_bulk, motor_cache, motor_dump, motor_process
 from .motor_common import callback_type_error
+from .motor_py3_compat import integer_types, string_types
 from motor.docstrings import *
 
 HAS_SSL = True
@@ -57,6 +85,220 @@ except ImportError:
 PY352 = sys.version_info >= (3, 5, 2)
 PY35 = sys.version_info >= (3, 5)
 
+# Sampled documents per partition when choosing split points with $sample.
+_SAMPLES_PER_PARTITION = 100
+
+
+def _partition_bounds(collection, filter, key, num_partitions, split):
+    """Choose up to num_partitions - 1 ascending split points for ``key``.
+
+    Runs on a worker thread. ``collection`` is a PyMongo Collection.
+    """
+    if num_partitions < 2:
+        return []
+
+    if split == 'splitVector':
+        # splitVector ignores the filter; the ranges are still a partition of
+        # the filtered results, only less evenly sized.
+        db = collection.database
+        size = db.command('collStats', collection.name).get('size', 0)
+        result = db.command(SON([
+            ('splitVector', collection.full_name),
+            ('keyPattern', {key: 1}),
+            ('maxChunkSizeBytes', max(1, int(size // num_partitions)))]))
+
+        points = [_get_path(doc, key) for doc in result['splitKeys']]
+    else:
+        pipeline = [{'$match': filter or {}},
+                    {'$sample': {'size': num_partitions *
+                                         _SAMPLES_PER_PARTITION}},
+                    {'$project': {'_id': 0, 'k': '$' + key}},
+                    {'$sort': {'k': 1}}]
+
+        points = [doc.get('k') for doc in collection.aggregate(pipeline)]
+
+    # Range queries only match values of the same BSON type as their bounds,
+    # so split on values of one type. Documents whose key is missing, null,
+    # or of another type all land in the first partition.
+    points = [p for p in points if p is not None]
+    if not points:
+        return []
+
+    kind = type(points[len(points) // 2])
+    points = [p for p in points if type(p) is kind]
+    bounds = []
+    for i in range(1, num_partitions):
+        point = points[i * len(points) // num_partitions]
+        if not bounds or point != bounds[-1]:
+            bounds.append(point)
+
+    return bounds
+
+
+def _get_path(document, path):
+    """The value at a field path like "a.b" in a document, or None."""
+    if path in document:
+        return document[path]
+
+    value = document
+    for name in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+
+        value = value.get(name)
+
+    return value
+
+
+def _partition_filters(filter, key, bounds):
+    """One query per range between consecutive split points."""
+    if not bounds:
+        return [filter or {}]
+
+    ranges = [{'$not': {'$gte': bounds[0]}}]
+    ranges.extend({'$gte': lo, '$lt': hi} for lo, hi in zip(bounds, bounds[1:]))
+    ranges.append({'$gte': bounds[-1]})
+    if filter:
+        return [{'$and': [filter, {key: r}]} for r in ranges]
+
+    return [{key: r} for r in ranges]
+
+
+def _bson_order(value):
+    """A key that sorts values the way MongoDB compares them in a sort.
+
+    Raises TypeError for a value that isn't a BSON type.
+    """
+    if isinstance(value, MinKey):
+        return (0, )
+    elif value is None:
+        return (1, )
+    elif isinstance(value, bool):
+        return (8, value)
+    elif isinstance(value, integer_types + (float, )):
+        return (2, value)
+    elif isinstance(value, Decimal128):
+        return (2, value.to_decimal())
+    elif isinstance(value, Binary):
+        return (6, len(value), value.subtype, bytes(value))
+    elif isinstance(value, uuid.UUID):
+        # Encoded as binary subtype 3, the default uuid_representation.
+        return (6, 16, 3, value.bytes)
+    elif isinstance(value, Code):
+        # Before strings: Code is a str subclass.
+        if value.scope is None:
+            return (13, value)
+        return (14, value, _bson_order(value.scope))
+    elif isinstance(value, string_types):
+        return (3, value)
+    elif isinstance(value, DBRef):
+        # Stored as an embedded document.
+        return _bson_order(value.as_doc())
+    elif isinstance(value, dict):
+        # Compared field by field: the value's type, name, then value.
+        fields = []
+        for k, v in value.items():
+            order = _bson_order(v)
+            fields.append((order[0], k, order))
+
+        return (4, tuple(fields))
+    elif isinstance(value, (list, tuple)):
+        return (5, tuple(_bson_order(v) for v in value))
+    elif isinstance(value, bytes):
+        return (6, len(value), 0, value)
+    elif isinstance(value, ObjectId):
+        return (7, value.binary)
+    elif isinstance(value, datetime.datetime):
+        return (9, value)
+    elif isinstance(value, Timestamp):
+        return (10, value.time, value.inc)
+    elif isinstance(value, (Regex, RE_TYPE)):
+        return (11, value.pattern)
+    elif isinstance(value, MaxKey):
+        return (127, )
+
+    raise TypeError("can't sort %r like MongoDB" % (value, ))
+
+
+# MongoDB sorts an empty array before null or a missing field.
+_EMPTY_ARRAY_ORDER = (0, 1)
+
+
+def _sort_values(value, parts):
+    """The values at a field path, with arrays along the path expanded."""
+    for i, part in enumerate(parts):
+        if isinstance(value, list):
+            values = []
+            for element in value:
+                values.extend(_sort_values(element, parts[i:]))
+
+            return values or [None]
+
+        value = value.get(part) if isinstance(value, dict) else None
+
+    return [value]
+
+
+class _SortKey(object):
+    """Compare documents by a sort specification like [('a', 1), ('b', -1)].
+
+    Like MongoDB, an array is compared by its smallest element when sorting
+    ascending and its largest when sorting descending.
+    """
+    __slots__ = ('values', 'directions')
+
+    def __init__(self, document, sort_spec):
+        values = []
+        for key, direction in sort_spec:
+            orders = []
+            for value in _sort_values(document, key.split('.')):
+                if isinstance(value, list):
+                    if value:
+                        orders.extend(_bson_order(v) for v in value)
+                    else:
+                        orders.append(_EMPTY_ARRAY_ORDER)
+                else:
+                    orders.append(_bson_order(value))
+
+            if direction == pymongo.ASCENDING:
+                values.append(min(orders))
+            else:
+                values.append(max(orders))
+
+        self.values = values
+        self.directions = [direction for _, direction in sort_spec]
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __ne__(self, other):
+        return self.values != other.values
+
+    def __lt__(self, other):
+        for mine, theirs, direction in zip(self.values,
+                                           other.values,
+                                           self.directions):
+            if mine != theirs:
+                if direction == pymongo.ASCENDING:
+                    return mine < theirs
+                return theirs < mine
+
+        return False
+
+
+def _server_cursor_id(delegate):
+    """A PyMongo cursor's server cursor id, 0 if it has none or is dead.
+
+    None if the first batch hasn't been requested.
+    """
+    if isinstance(delegate, Cursor):
+        cursor_id, killed = delegate._Cursor__id, delegate._Cursor__killed
+    else:
+        cursor_id = delegate._CommandCursor__id
+        killed = delegate._CommandCursor__killed
+
+    return 0 if killed else cursor_id
+
 
 class AgnosticBase(object):
     def __eq__(self, other):
@@ -139,9 +381,47 @@ class AgnosticClient(AgnosticBaseProperties):
         else:
             self.io_loop = self._framework.get_event_loop()
 
+        self._cursor_reaper = None
+
     def get_io_loop(self):
         return self.io_loop
 
+    def start_cursor_reaper(self, interval=1, idle_timeout=None):
+        """Kill abandoned and idle cursors' server cursors in batches.
+
+        Once started, the reaper follows each cursor from this client that
+        has sent a query, through a weak reference. Every `interval` seconds
+        it kills, with one killCursors message per server and namespace, the
+        server cursors of the Motor cursors that were garbage collected
+        before they were exhausted or closed, and those that have not fetched
+        a batch for `idle_timeout` seconds. Cursors waiting for the server
+        aren't idle. Once a cursor killed for being idle has returned the
+        documents it had already fetched, its next fetch raises
+        :exc:`~pymongo.errors.CursorNotFound`.
+
+        Calling this again returns the running reaper. Returns a
+        :class:`MotorCursorReaper`, whose attributes count the cursors it
+        tracks and kills.
+
+        :Parameters:
+          - `interval` (optional): seconds between batches of kills
+          - `idle_timeout` (optional): seconds a cursor may go without
+            fetching a batch before it is killed, default no limit
+        """
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError('idle_timeout must be positive or None')
+
+        if self._cursor_reaper is None or self._cursor_reaper.stopped:
+            reaper_class = create_class_with_framework(
+                AgnosticCursorReaper, self._framework, self.__module__)
+
+            self._cursor_reaper = reaper_class(self, interval, idle_timeout)
+
+        return self._cursor_reaper
+
     def __getattr__(self, name):
         if name.startswith('_'):
             raise AttributeError(
@@ -279,46 +559,52 @@ class AgnosticCollection(AgnosticBaseProperties):
     __motor_class_name__ = 'MotorCollection'
     __delegate_class__ = Collection
 
-    bulk_write           = AsyncCommand(doc=bulk_write_doc)
-    count                = AsyncRead()
+    bulk_write           = AsyncWrite(doc=bulk_write_doc)
+    count                = AsyncRead(cached=True)
     create_index         = AsyncCommand()
     create_indexes       = AsyncCommand(doc=create_indexes_doc)
-    delete_many          = AsyncCommand(doc=delete_many_doc)
-    delete_one           = AsyncCommand(doc=delete_one_doc)
-    distinct             = AsyncRead()
-    drop                 = AsyncCommand(doc=drop_doc)
+    delete_many          = AsyncWrite(doc=delete_many_doc)
+    delete_one           = AsyncWrite(doc=delete_one_doc)
+    distinct             = AsyncRead(cached=True)
+    drop                 = AsyncWrite(doc=drop_doc)
     drop_index           = AsyncCommand()
     drop_indexes         = AsyncCommand()
     ensure_index         = AsyncCommand()
-    find_and_modify      = AsyncCommand()
-    find_one             = AsyncRead(doc=find_one_doc)
-    find_one_and_delete  = AsyncCommand(doc=find_one_and_delete_doc)
-    find_one_and_replace = AsyncCommand(doc=find_one_and_replace_doc)
-    find_one_and_update  = AsyncCommand(doc=find_one_and_update_doc)
+    find_and_modify      = AsyncWrite()
+    find_one             = AsyncRead(doc=find_one_doc, cached=True)
+    find_one_and_delete  = AsyncWrite(doc=find_one_and_delete_doc)
+    find_one_and_replace = AsyncWrite(doc=find_one_and_replace_doc)
+    find_one_and_update  = AsyncWrite(doc=find_one_and_update_doc)
     full_name            = ReadOnlyProperty()
     group                = AsyncRead()
     index_information    = AsyncRead(doc=index_information_doc)
     inline_map_reduce    = AsyncRead()
     insert               = AsyncWrite()
     insert_many          = AsyncWrite(doc=insert_many_doc)
-    insert_one           = AsyncCommand(doc=insert_one_doc)
+    insert_one           = AsyncWrite(doc=insert_one_doc)
     map_reduce           = AsyncCommand(doc=mr_doc).wrap(Collection)
     name                 = ReadOnlyProperty()
     options              = AsyncRead()
     reindex              = AsyncCommand()
     remove               = AsyncWrite()
-    rename               = AsyncCommand()
-    replace_one          = AsyncCommand(doc=replace_one_doc)
+    rename               = AsyncWrite()
+    replace_one          = AsyncWrite(doc=replace_one_doc)
     save                 = AsyncWrite()
     update               = AsyncWrite(doc=update_doc)
-    update_many          = AsyncCommand(doc=update_many_doc)
-    update_one           = AsyncCommand(doc=update_one_doc)
+    update_many          = AsyncWrite(doc=update_many_doc)
+    update_one           = AsyncWrite(doc=update_one_doc)
     with_options         = DelegateMethod().wrap(Collection)
 
     _async_aggregate    = AsyncRead(attr_name='aggregate')
     _async_list_indexes = AsyncRead(attr_name='list_indexes')
     __parallel_scan     = AsyncRead(attr_name='parallel_scan')
 
+    # A motor_cache.QueryCache, see enable_cache.
+    _query_cache = None
+
+    # Map query keys to Futures waiting for them, see enable_single_flight.
+    _single_flight = None
+
     def __init__(self, database, name, codec_options=None,
                  read_preference=None, write_concern=None, read_concern=None,
                  _delegate=None):
@@ -361,6 +647,70 @@ class AgnosticCollection(AgnosticBaseProperties):
             "failing because no such method exists." %
             self.delegate.name)
 
+    def enable_cache(self, ttl=5, max_size=1000, cache=None):
+        """Cache the results of reads through this collection object.
+
+        Results of :meth:`find_one`, :meth:`count`, :meth:`distinct`, and
+        :meth:`MotorCursor.to_list` on cursors from :meth:`find`, are kept
+        for `ttl` seconds, keyed by the method and its arguments (filter,
+        projection, sort, skip, limit, hint, and so on) and this collection's
+        read preference and codec options. The least recently used results
+        are evicted beyond `max_size`::
+
+          cache = collection.enable_cache(ttl=10)
+          doc = yield collection.find_one({'_id': 1})  # Queries the server.
+          doc = yield collection.find_one({'_id': 1})  # From the cache.
+          print(cache.hits, cache.misses)
+
+        Writes through this object, like :meth:`insert_one`,
+        :meth:`update_many`, :meth:`find_one_and_update`, or
+        :meth:`bulk_write`, discard the cached results for this collection.
+        Other writers, including other MotorCollection objects for the same
+        collection, do not: results may be up to `ttl` seconds stale. Pass
+        the same `cache` to several MotorCollection objects to share it.
+
+        A cursor whose :meth:`~MotorCursor.to_list` result came from the cache
+        is then exhausted.
+
+        :Parameters:
+          - `ttl` (optional): seconds to keep a result, default 5
+          - `max_size` (optional): the maximum number of results, default 1000
+          - `cache` (optional): a :class:`~motor.motor_cache.QueryCache` to
+            use instead of creating one
+
+        Returns the :class:`~motor.motor_cache.QueryCache`.
+        """
+        if cache is None:
+            cache = motor_cache.QueryCache(ttl, max_size)
+
+        self._query_cache = cache
+        return cache
+
+    def disable_cache(self):
+        """Stop caching reads through this collection object."""
+        self._query_cache = None
+
+    def enable_single_flight(self):
+        """Share identical reads that are in flight through this object.
+
+        While a :meth:`find_one`, :meth:`count`, or :meth:`distinct` is
+        running, an identical call through this collection object, with the
+        same arguments and read preference, waits for the same server
+        response instead of using another thread and round trip. Each caller
+        gets its own copy of the result.
+
+        A write through this object, like :meth:`insert_one` or
+        :meth:`update_many`, ensures later reads don't share a read that began
+        before the write. Works with :meth:`enable_cache`, sharing only the
+        reads that miss the cache.
+        """
+        if self._single_flight is None:
+            self._single_flight = {}
+
+    def disable_single_flight(self):
+        """Stop sharing in-flight reads through this collection object."""
+        self._single_flight = None
+
     def find(self, *args, **kwargs):
         """Create a :class:`MotorCursor`. Same parameters as for
         PyMongo's :meth:`~pymongo.collection.Collection.find`.
@@ -381,6 +731,246 @@ class AgnosticCollection(AgnosticBaseProperties):
 
         return cursor_class(cursor, self)
 
+    def find_partitioned(self, num_partitions, filter=None, projection=None,
+                         key='_id', ordered=False, split='sample', **kwargs):
+        """Split a query into ranges of `key` and iterate them concurrently.
+
+        Unlike :meth:`parallel_scan`, this works with any storage engine and
+        accepts a filter. The range of `key` in the result set is divided into
+        up to `num_partitions` sub-ranges, and one :class:`MotorCursor` per
+        sub-range is iterated on Motor's thread pool::
+
+          cursor = collection.find_partitioned(4, {'status': 'active'})
+          while (yield cursor.fetch_next):
+              process_document(cursor.next_object())
+
+        Like :meth:`find`, this does no I/O: split points are chosen when
+        iteration begins. By default documents are returned in whatever order
+        the partitions deliver them. With ``ordered=True`` each partition is
+        sorted by `key` and the partitions are concatenated, so the results
+        are sorted by `key`; the first batch of every partition is still
+        fetched concurrently.
+
+        `key` should be indexed and its values should be of a single BSON
+        type. Documents whose `key` is missing or of a different type are all
+        returned by the first partition.
+
+        :Parameters:
+          - `num_partitions`: the maximum number of partitions
+          - `filter` (optional): a query document
+          - `projection` (optional): fields to include or exclude
+          - `key` (optional): the field to partition on, default "_id",
+            which may be a dotted path like "a.b"
+          - `ordered` (optional): if ``True``, return documents sorted by
+            `key`; a `sort` can't be passed as well
+          - `split` (optional): how to choose split points: "sample" (the
+            default) runs a ``$sample`` aggregation over the filtered
+            documents, "splitVector" uses the `splitVector command`_, which
+            requires an index on `key` and is not available on mongos
+          - `**kwargs` (optional): other options for :meth:`find`, such as
+            `batch_size`; not `limit` or `skip`
+
+        Returns a :class:`MotorPartitionedCursor`.
+
+        .. _splitVector command:
+            https://docs.mongodb.com/manual/reference/command/splitVector/
+
+        .. note:: Requires server version **>= 3.2** for the default
+           "sample" split.
+        """
+        if 'callback' in kwargs:
+            raise pymongo.errors.InvalidOperation(
+                "Pass a callback to each or to_list, not to find_partitioned.")
+
+        if (not isinstance(num_partitions, numbers.Integral)
+                or num_partitions < 1):
+            raise ValueError('num_partitions must be a positive int')
+
+        for option in ('limit', 'skip'):
+            if kwargs.get(option):
+                raise pymongo.errors.InvalidOperation(
+                    "Can't pass %s to find_partitioned, it would apply to"
+                    " each partition." % option)
+
+        if ordered and kwargs.get('sort') is not None:
+            raise pymongo.errors.InvalidOperation(
+                "Can't pass a sort with ordered=True, results are sorted by"
+                " key.")
+
+        if split not in ('sample', 'splitVector'):
+            raise ValueError('split must be "sample" or "splitVector", not %r'
+                             % (split, ))
+
+        cursor_class = create_class_with_framework(
+            AgnosticPartitionedCursor, self._framework, self.__module__)
+
+        return cursor_class(self, num_partitions, filter, projection, key,
+                            ordered, split, kwargs)
+
+    def loader(self, key='_id', max_batch_size=1000, projection=None):
+        """Batch lookups of single documents by `key` into one query.
+
+        Calls to :meth:`MotorLoader.load` made during one iteration of the
+        event loop are sent together as one ``find({key: {'$in': [...]}})``,
+        instead of one :meth:`find_one` each::
+
+          loader = collection.loader()
+          docs = yield [loader.load(i) for i in ids]
+
+        The loader also remembers each document it loads, so create one
+        loader per request, or per unit of work that may see stale data.
+
+        :Parameters:
+          - `key` (optional): a top-level field, default "_id", whose values
+            are unique
+          - `max_batch_size` (optional): the most values in one query
+          - `projection` (optional): fields to include or exclude, must
+            include `key`
+
+        Returns a :class:`MotorLoader`.
+        """
+        if (not isinstance(max_batch_size, numbers.Integral)
+                or max_batch_size < 1):
+            raise ValueError('max_batch_size must be a positive int')
+
+        loader_class = create_class_with_framework(
+            AgnosticLoader, self._framework, self.__module__)
+
+        return loader_class(self, key, max_batch_size, projection)
+
+    def buffered_writer(self, max_docs=1000, max_bytes=16 * 1024 * 1024,
+                        max_delay_ms=10):
+        """Combine single-document inserts into unordered batches.
+
+        :meth:`MotorBufferedWriter.insert_one` adds a document to a buffer
+        and returns a Future for it. The buffer is sent with one unordered
+        :meth:`insert_many` as soon as it holds `max_docs` documents or
+        `max_bytes` of BSON, or `max_delay_ms` after its first document::
+
+          writer = collection.buffered_writer(max_delay_ms=5)
+          result = yield writer.insert_one({'event': 'click'})
+          print(result.inserted_id)
+
+        Each Future resolves to an
+        :class:`~pymongo.results.InsertOneResult`, or fails with the error
+        for its document, such as
+        :class:`~pymongo.errors.DuplicateKeyError`. Other documents in the
+        batch are inserted regardless.
+
+        :Parameters:
+          - `max_docs` (optional): the most documents in a batch
+          - `max_bytes` (optional): the most bytes of BSON in a batch
+          - `max_delay_ms` (optional): the longest a document waits in the
+            buffer, in milliseconds; 0 sends each document immediately
+
+        Returns a :class:`MotorBufferedWriter`.
+        """
+        if max_docs < 1:
+            raise ValueError('max_docs must be positive')
+
+        if max_bytes < 1:
+            raise ValueError('max_bytes must be positive')
+
+        if max_delay_ms < 0:
+            raise ValueError('max_delay_ms must be non-negative')
+
+        writer_class = create_class_with_framework(
+            AgnosticBufferedWriter, self._framework, self.__module__)
+
+        return writer_class(self, max_docs, max_bytes, max_delay_ms)
+
+    def coalescing_updater(self, interval_ms=100, max_pending=1000,
+                           upsert=False):
+        """Merge frequent updates to the same documents before sending them.
+
+        :meth:`MotorCoalescingUpdater.update_one` takes an ``_id`` and an
+        update with only ``$inc``, ``$set`` and ``$addToSet``. Updates to the
+        same ``_id`` are merged in memory: ``$inc`` amounts are summed, the
+        last ``$set`` of a field wins, and ``$addToSet`` values are combined.
+        Every `interval_ms`, or once updates for `max_pending` documents are
+        waiting, the merged updates are sent as one unordered
+        :meth:`bulk_write` of :class:`~pymongo.operations.UpdateOne`::
+
+          updater = collection.coalescing_updater()
+          yield updater.update_one(page_id, {'$inc': {'views': 1}})
+
+        Each call's Future resolves once the merged update that includes it
+        is acknowledged, or fails with its error. Batches are sent one at a
+        time, in order.
+
+        :Parameters:
+          - `interval_ms` (optional): how long updates may wait, in
+            milliseconds
+          - `max_pending` (optional): the most documents with waiting updates
+          - `upsert` (optional): insert documents that don't exist
+
+        Returns a :class:`MotorCoalescingUpdater`.
+        """
+        if interval_ms <= 0:
+            raise ValueError('interval_ms must be positive')
+
+        if (not isinstance(max_pending, numbers.Integral)
+                or max_pending < 1):
+            raise ValueError('max_pending must be a positive int')
+
+        updater_class = create_class_with_framework(
+            AgnosticCoalescingUpdater, self._framework, self.__module__)
+
+        return updater_class(self, interval_ms, max_pending, upsert)
+
+    def bulk_stream(self, ordered=False, batch_size=1000, max_in_flight=2,
+                    bypass_document_validation=False):
+        """Send an unbounded stream of write operations in batches.
+
+        Write operations, like :class:`~pymongo.operations.InsertOne`, are
+        passed one at a time to :meth:`MotorBulkStream.add` and sent with
+        :meth:`bulk_write` in batches of `batch_size`. In Python 3.5 and
+        newer, the stream is an async context manager that sends the last
+        batch on exit::
+
+          async with collection.bulk_stream() as stream:
+              async for doc in source:
+                  await stream.add(InsertOne(doc))
+
+          print(stream.result['nInserted'])
+
+        If the block raises, batches not yet sent are discarded instead, the
+        Futures of operations waiting for them fail with
+        :exc:`~pymongo.errors.InvalidOperation`, and the block's exception
+        propagates rather than any write error.
+
+        The Future returned by :meth:`~MotorBulkStream.add` waits while
+        `max_in_flight` batches are being sent, so a fast producer can't
+        buffer without limit. :meth:`~MotorBulkStream.close` returns the
+        totals, in the format of
+        :attr:`~pymongo.results.BulkWriteResult.bulk_api_result`, with write
+        errors indexed by the order operations were added.
+
+        If `ordered` is True, batches are sent one at a time, and no
+        batches are sent after one with a write error.
+
+        :Parameters:
+          - `ordered` (optional): Apply the operations in order.
+          - `batch_size` (optional): Operations per :meth:`bulk_write`.
+          - `max_in_flight` (optional): The most batches sent at once.
+          - `bypass_document_validation` (optional): If ``True``, allows
+            the writes to opt-out of document level validation.
+
+        Returns a :class:`MotorBulkStream`.
+        """
+        if not isinstance(batch_size, numbers.Integral) or batch_size < 1:
+            raise ValueError('batch_size must be a positive int')
+
+        if (not isinstance(max_in_flight, numbers.Integral)
+                or max_in_flight < 1):
+            raise ValueError('max_in_flight must be a positive int')
+
+        stream_class = create_class_with_framework(
+            AgnosticBulkStream, self._framework, self.__module__)
+
+        return stream_class(self, ordered, batch_size, max_in_flight,
+                            bypass_document_validation)
+
     def aggregate(self, pipeline, **kwargs):
         """Execute an aggregation pipeline on this collection.
 
@@ -522,6 +1112,234 @@ class AgnosticCollection(AgnosticBaseProperties):
 
             original_future.set_result(motor_command_cursors)
 
+    @coroutine_annotation
+    def export(self, file, format='bson', filter=None, projection=None,
+               batch_size=None, parallel=None, progress=None, callback=None):
+        """Write this collection's documents to a file.
+
+        Documents are streamed from the server to `file` on Motor's thread
+        pool, a batch at a time, without building a list in memory. In
+        "bson" format, the format mongodump writes, documents are copied
+        without being decoded. "jsonl" writes one document per line in
+        MongoDB Extended JSON::
+
+          n = yield collection.export('dump.bson', filter={'active': True})
+
+        Pass `progress` to follow a long export; it is called on the event
+        loop with the number of documents and bytes written so far and the
+        average bytes per second.
+
+        With ``parallel=N``, documents are copied from up to N cursors from
+        :meth:`parallel_scan` at once. The order of documents in the file is
+        then arbitrary, and `filter` and `projection` are not supported.
+
+        :Parameters:
+          - `file`: a path, or a file object opened for writing bytes
+          - `format` (optional): "bson" (the default) or "jsonl"
+          - `filter` (optional): a query document
+          - `projection` (optional): fields to include or exclude
+          - `batch_size` (optional): the number of documents per batch
+          - `parallel` (optional): the number of parallel scan cursors
+          - `progress` (optional): function taking (documents, bytes,
+            bytes per second)
+          - `callback` (optional): function taking (number of documents,
+            error)
+
+        If no callback is passed, returns a Future that resolves to the
+        number of documents written.
+        """
+        if format not in motor_dump.FORMATS:
+            raise ValueError('format must be "bson" or "jsonl", not %r'
+                             % (format, ))
+
+        if parallel is not None:
+            if not isinstance(parallel, numbers.Integral) or parallel < 1:
+                raise ValueError('parallel must be a positive int')
+
+            if filter or projection:
+                raise pymongo.errors.InvalidOperation(
+                    "Can't export with a filter or projection in parallel.")
+
+        loop = self.get_io_loop()
+        report = None
+        if progress is not None:
+            report = functools.partial(self._framework.call_soon_threadsafe,
+                                       loop, progress)
+
+        future = self._framework.run_on_executor(loop,
+                                                 motor_dump.export_collection,
+                                                 self.delegate,
+                                                 file,
+                                                 format,
+                                                 filter,
+                                                 projection,
+                                                 batch_size,
+                                                 parallel,
+                                                 report)
+
+        return self._framework.future_or_callback(future, callback, loop)
+
+    @coroutine_annotation
+    def import_file(self, file, format='bson', batch_bytes=None,
+                    concurrency=4, progress=None, callback=None):
+        """Insert the documents from a BSON or JSON Lines file.
+
+        The reverse of :meth:`export`. The file is memory-mapped on Motor's
+        thread pool and split into batches no larger than the server's
+        :attr:`~MotorClient.max_message_size` and
+        :attr:`~MotorClient.max_write_batch_size`. Up to `concurrency`
+        unordered :meth:`insert_many` calls are in flight at once. BSON
+        documents are sent without being decoded::
+
+          result = yield collection.import_file('dump.bson')
+          for error in result['errors']:
+              print(error['batch'], error['offset'], error['error'])
+
+        A batch that fails does not stop the import. The result is a dict
+        with the number of documents inserted, "nInserted", the number of
+        batches, "nBatches", and a list of "errors", one for each batch that
+        failed, with the batch number, the "offset" of the batch's first
+        document, counting documents from 0 at the start of the file, and the
+        exception. Like any unordered insert, the other documents in a failed
+        batch are still inserted.
+
+        :Parameters:
+          - `file`: a path
+          - `format` (optional): "bson" (the default) or "jsonl"
+          - `batch_bytes` (optional): a smaller limit on the BSON size of a
+            batch
+          - `concurrency` (optional): the number of batches inserted at once,
+            default 4
+          - `progress` (optional): function taking (documents inserted,
+            batches completed, batches failed), called on the event loop
+            after each batch
+          - `callback` (optional): function taking (result, error)
+
+        If no callback is passed, returns a Future.
+        """
+        if format not in motor_dump.FORMATS:
+            raise ValueError('format must be "bson" or "jsonl", not %r'
+                             % (format, ))
+
+        if not isinstance(concurrency, numbers.Integral) or concurrency < 1:
+            raise ValueError('concurrency must be a positive int')
+
+        loop = self.get_io_loop()
+        report = None
+        if progress is not None:
+            report = functools.partial(self._framework.call_soon_threadsafe,
+                                       loop, progress)
+
+        future = self._framework.run_on_executor(loop,
+                                                 motor_dump.import_collection,
+                                                 self.delegate,
+                                                 file,
+                                                 format,
+                                                 batch_bytes,
+                                                 concurrency,
+                                                 report)
+
+        return self._framework.future_or_callback(future, callback, loop)
+
+    @coroutine_annotation
+    def parallel_bulk_write(self, requests, bypass_document_validation=False,
+                            max_workers=4, callback=None):
+        """Like an unordered :meth:`bulk_write`, but run chunks concurrently.
+
+        `requests` is split into chunks of the server's maximum write batch
+        size, and up to `max_workers` chunks are sent at once, each on its
+        own connection from the pool. The results are merged into one
+        :class:`~pymongo.results.BulkWriteResult`; if any write failed, a
+        :exc:`~pymongo.errors.BulkWriteError` is raised whose details
+        describe the whole bulk, with write errors and upserted ids indexed
+        by position in `requests`.
+
+        Only worth it for large bulks: the server's write order is
+        arbitrary anyway, but chunks are no longer applied one at a time.
+        If a chunk fails with an error other than a write error, such as a
+        network error, other chunks may have been written.
+
+        :Parameters:
+          - `requests`: A list of write operations.
+          - `bypass_document_validation`: (optional) If ``True``, allows the
+            write to opt-out of document level validation.
+          - `max_workers` (optional): The most chunks to send at once.
+          - `callback` (optional): function taking (result, error), executed
+            when operation completes
+        """
+        if not isinstance(requests, list):
+            raise TypeError("requests must be a list")
+
+        if (not isinstance(max_workers, numbers.Integral)
+                or max_workers < 1):
+            raise ValueError('max_workers must be a positive int')
+
+        bulk = _Bulk(self.delegate, False, bypass_document_validation)
+        for request in requests:
+            if not isinstance(request, _WriteOp):
+                raise TypeError("%r is not a valid request" % (request,))
+
+            request._add_to_bulk(bulk)
+
+        loop = self.get_io_loop()
+        future = invalidate_reads(
+            self._framework, self,
+            lambda: _ParallelBulkWrite(self._framework, loop, bulk,
+                                       self.delegate.write_concern.document,
+                                       max_workers,
+                                       _bulk_write_result).future)
+
+        return self._framework.future_or_callback(future, callback, loop)
+
+    @coroutine_annotation
+    def pipelined_insert_many(self, documents, ordered=True, batch_size=1000,
+                              bypass_document_validation=False,
+                              executor=None, callback=None):
+        """Like :meth:`insert_many`, but encode while the previous batch is
+        sent.
+
+        :meth:`insert_many` encodes each batch of documents to BSON and then
+        sends it, on one thread. This method splits `documents` into batches
+        of `batch_size`, and encodes the next batch on one worker thread
+        while the previous batch is inserted on another, so encoding and
+        network round trips overlap. Batches are inserted one at a time.
+
+        Encoding holds the GIL. To encode on other cores, pass a
+        :class:`~concurrent.futures.ProcessPoolExecutor` as `executor`:
+        documents get their "_id" first, then are copied to a worker
+        process and encoded there.
+
+        Resolves to an :class:`~pymongo.results.InsertManyResult`. If a write
+        fails, a :exc:`~pymongo.errors.BulkWriteError` is raised whose
+        details describe all the batches sent, indexed by position in
+        `documents`. If `ordered` is True no batches are sent after a failed
+        one.
+
+        :Parameters:
+          - `documents`: A sequence of documents to insert.
+          - `ordered` (optional): Insert documents in order, and stop at the
+            first error.
+          - `batch_size` (optional): Documents per batch.
+          - `bypass_document_validation`: (optional) If ``True``, allows the
+            write to opt-out of document level validation.
+          - `executor` (optional): A process pool to encode documents in.
+          - `callback` (optional): function taking (result, error), executed
+            when operation completes
+        """
+        if not isinstance(batch_size, numbers.Integral) or batch_size < 1:
+            raise ValueError('batch_size must be a positive int')
+
+        documents = list(documents)
+        if not documents:
+            raise TypeError("documents must be a non-empty list")
+
+        loop = self.get_io_loop()
+        future = _PipelinedInsert(self, documents, ordered, batch_size,
+                                  bypass_document_validation,
+                                  executor).future
+
+        return self._framework.future_or_callback(future, callback, loop)
+
     def initialize_unordered_bulk_op(self, bypass_document_validation=False):
         """Initialize an unordered batch of write operations.
 
@@ -622,6 +1440,9 @@ class AgnosticBaseCursor(AgnosticBase):
         self.started = False
         self.closed = False
 
+        # Set when the cursor reaper kills this cursor for idling.
+        self._timed_out = False
+
     # python.org/dev/peps/pep-0492/#api-design-and-implementation-revisions
     if PY352:
         exec(textwrap.dedent("""
@@ -651,12 +1472,29 @@ class AgnosticBaseCursor(AgnosticBase):
     def _get_more(self):
         """Initial query or getMore. Returns a Future."""
         if not self.alive:
-            raise pymongo.errors.InvalidOperation(
+            raise self._timed_out_error() or pymongo.errors.InvalidOperation(
                 "Can't call get_more() on a MotorCursor that has been"
                 " exhausted or killed.")
 
         self.started = True
-        return self._refresh()
+        future = self._refresh()
+        self._track(future)
+        return future
+
+    def _track(self, future=None):
+        # "future" is the query or getMore in flight, if any.
+        reaper = self.collection.database.client._cursor_reaper
+        if reaper is not None:
+            reaper.track(self, future)
+
+    def _timed_out_error(self):
+        # Reading past the buffer of a cursor the reaper killed for idling
+        # raises CursorNotFound, instead of looking like the end of results.
+        if self._timed_out:
+            return pymongo.errors.CursorNotFound(
+                'cursor was killed by the cursor reaper after idling')
+
+        return None
 
     @property
     @coroutine_annotation
@@ -717,7 +1555,12 @@ class AgnosticBaseCursor(AgnosticBase):
         else:
             # Dead
             future = self._framework.get_future(self.get_io_loop())
-            future.set_result(False)
+            error = self._timed_out_error()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(False)
+
             return future
 
     def next_object(self):
@@ -806,10 +1649,71 @@ class AgnosticBaseCursor(AgnosticBase):
                 self._get_more(),
                 self._each_got_more, callback)
         else:
-            # Complete
+            # Complete, or killed by the cursor reaper.
+            self._framework.call_soon(
+                self.get_io_loop(),
+                functools.partial(callback, None, self._timed_out_error()))
+
+    def each_batch(self, callback):
+        """Iterates over this cursor one batch at a time.
+
+        Like :meth:`each`, but `callback` is executed once for each batch the
+        server returns, with a list of documents, instead of once per
+        document. `callback` is passed ``(None, None)`` when iteration is
+        complete.
+
+        Cancel iteration early by returning ``False`` from the callback. (Only
+        ``False`` cancels iteration: returning ``None`` or 0 does not.)
+
+        .. code-block:: python
+
+            def each_batch(batch, error):
+                if error:
+                    raise error
+                elif batch:
+                    for doc in batch:
+                        print(doc)
+                else:
+                    IOLoop.current().stop()
+
+            collection.find().batch_size(100).each_batch(callback=each_batch)
+
+        :Parameters:
+         - `callback`: function taking (list of documents, error)
+        """
+        if not callable(callback):
+            raise callback_type_error
+
+        self._each_batch_got_more(callback, None)
+
+    def _each_batch_got_more(self, callback, future):
+        if future:
+            try:
+                future.result()
+            except Exception as error:
+                callback(None, error)
+                return
+
+        n = self._buffer_size()
+        if n > 0:
+            # islice stops after n documents, so next() never refreshes.
+            batch = list(itertools.islice(self.delegate, n))
+
+            # Quit if callback returns exactly False (not None), or closed
+            # this cursor. As in each(), don't close the cursor ourselves.
+            if callback(batch, None) is False or self.closed:
+                return
+
+        if self.alive and (self.cursor_id or not self.started):
+            self._framework.add_future(
+                self.get_io_loop(),
+                self._get_more(),
+                self._each_batch_got_more, callback)
+        else:
+            # Complete, or killed by the cursor reaper.
             self._framework.call_soon(
                 self.get_io_loop(),
-                functools.partial(callback, None, None))
+                functools.partial(callback, None, self._timed_out_error()))
 
     @coroutine_annotation
     def to_list(self, length, callback=None):
@@ -871,16 +1775,29 @@ class AgnosticBaseCursor(AgnosticBase):
                                                     self.get_io_loop())
 
         if not self.alive:
-            to_list_future.set_result([])
+            error = self._timed_out_error()
+            if error is not None:
+                to_list_future.set_exception(error)
+            else:
+                to_list_future.set_result([])
         else:
-            the_list = []
-            self._framework.add_future(
-                self.get_io_loop(),
-                self._get_more(),
-                self._to_list, length, the_list, to_list_future)
+            to_list_future = self._cached(length, to_list_future)
+            if to_list_future is not None:
+                the_list = []
+                self._framework.add_future(
+                    self.get_io_loop(),
+                    self._get_more(),
+                    self._to_list, length, the_list, to_list_future)
 
         return retval
 
+    def _cached(self, length, to_list_future):
+        """Answer a to_list call from the query cache, or arrange to cache it.
+
+        Returns None if answered, else the Future to resolve with the list.
+        """
+        return to_list_future
+
     def _to_list(self, length, the_list, to_list_future, get_more_result):
         # get_more_result is the result of self._get_more().
         # to_list_future will be the result of the user's to_list() call.
@@ -909,6 +1826,139 @@ class AgnosticBaseCursor(AgnosticBase):
         except Exception as exc:
             to_list_future.set_exception(exc)
 
+    def to_queue(self, maxsize=0):
+        """Stream this cursor's documents into a new queue.
+
+        Returns an :class:`asyncio.Queue` for asyncio or a
+        :class:`tornado.queues.Queue` for Tornado, and starts filling it as
+        with :meth:`stream_into`. Batches are only fetched from the server
+        while the queue has room, so a slow consumer bounds memory use to
+        about `maxsize` documents plus one batch::
+
+          async def f():
+              queue = collection.find().to_queue(100)
+              while True:
+                  doc = await queue.get()
+                  if doc is None:
+                      break  # The cursor is exhausted.
+                  elif isinstance(doc, Exception):
+                      raise doc
+
+                  await process(doc)
+
+        :Parameters:
+         - `maxsize` (optional): maximum number of documents in the queue,
+           0 (the default) means unbounded
+        """
+        queue = self._framework.get_queue(self.get_io_loop(), maxsize)
+        self.stream_into(queue)
+        return queue
+
+    @coroutine_annotation
+    def stream_into(self, queue, callback=None):
+        """Put this cursor's documents into a queue as the consumer makes room.
+
+        `queue` is an :class:`asyncio.Queue` or a
+        :class:`tornado.queues.Queue`. Documents are put one at a time, and a
+        getMore is only sent when the current batch has been put and the queue
+        has room for more. When the cursor is exhausted ``None`` is put in the
+        queue. If a query or getMore fails, the exception is put in the queue
+        instead, and streaming stops.
+
+        To stop early, close this cursor: ``None`` is still put in the queue
+        before the returned Future resolves. With asyncio you can instead
+        cancel the returned Future, and the cursor is closed on the server.
+
+        :Parameters:
+         - `queue`: the queue to fill
+         - `callback` (optional): function taking (number of documents,
+           error), executed when streaming stops
+
+        If a callback is passed, returns None, else returns a Future that
+        resolves to the number of documents put in the queue, not counting
+        ``None`` or an exception.
+        """
+        if self._query_flags() & _QUERY_OPTIONS['tailable_cursor']:
+            raise pymongo.errors.InvalidOperation(
+                "Can't call stream_into on tailable cursor")
+
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        retval = self._framework.future_or_callback(future, callback, loop)
+
+        # The put waiting for room in the queue, if any.
+        pending = [None]
+        self._framework.add_future(loop, future, self._stream_cancelled,
+                                   queue, pending)
+        self._stream_into(queue, future, pending, 0)
+        return retval
+
+    def _stream_cancelled(self, queue, pending, future):
+        # The consumer cancelled: stop now, even if waiting for queue room.
+        if future.cancelled():
+            if pending[0] is not None:
+                pending[0].cancel()
+                pending[0] = None
+
+            if not queue.full():
+                # In case someone is still waiting on the queue.
+                queue.put_nowait(None)
+
+            self._framework.schedule_coroutine(self.get_io_loop(),
+                                               self.close())
+
+    def _stream_into(self, queue, future, pending, n, result=None):
+        # "result" is the Future from the last put or getMore, or None.
+        loop = self.get_io_loop()
+        pending[0] = None
+        if future.done():
+            # Cancelled, _stream_cancelled has closed the cursor.
+            return
+        elif result is not None:
+            try:
+                result.result()
+            except Exception as exc:
+                self._stream_end(queue, future, pending, n, exc)
+                return
+
+        while True:
+            if self.closed:
+                # Closed by the consumer, who may still be reading the queue.
+                self._stream_end(queue, future, pending, n, None)
+                return
+            elif self._buffer_size():
+                doc = self.next_object()
+                n += 1
+                if queue.full():
+                    put = pending[0] = self._framework.queue_put(loop, queue,
+                                                                 doc)
+                    self._framework.add_future(loop, put, self._stream_into,
+                                               queue, future, pending, n)
+                    return
+
+                queue.put_nowait(doc)
+            elif self.alive:
+                self._framework.add_future(
+                    loop,
+                    self._get_more(),
+                    self._stream_into, queue, future, pending, n)
+                return
+            else:
+                self._stream_end(queue, future, pending, n,
+                                 self._timed_out_error())
+                return
+
+    def _stream_end(self, queue, future, pending, n, error):
+        # Put None or the exception in the queue, then resolve the Future.
+        def done(put):
+            pending[0] = None
+            if not future.done() and not put.cancelled():
+                future.set_result(n)
+
+        loop = self.get_io_loop()
+        put = pending[0] = self._framework.queue_put(loop, queue, error)
+        self._framework.add_future(loop, put, done)
+
     def get_io_loop(self):
         return self.collection.get_io_loop()
 
@@ -972,6 +2022,85 @@ class AgnosticCursor(AgnosticBaseCursor):
 
     _Cursor__die  = AsyncRead()
 
+    # A ProcessPoolExecutor, see decode_in_processes.
+    _decode_executor = None
+
+    def decode_in_processes(self, executor):
+        """Decode this cursor's documents in a process pool.
+
+        PyMongo decodes each batch on one of Motor's threads, holding the
+        GIL, so decoding large documents slows the event loop and every
+        other thread. After calling this method, batches are fetched as raw
+        BSON and decoded in `executor`, a
+        :class:`~concurrent.futures.ProcessPoolExecutor`, so decoding runs on
+        other cores::
+
+          executor = ProcessPoolExecutor()
+          cursor = collection.find().decode_in_processes(executor)
+          docs = yield cursor.to_list(None)
+
+        Each batch's bytes are copied to a worker process once, and the
+        decoded documents are copied back, so this only pays off for large
+        documents. The collection's codec options must be picklable.
+
+        Must be called before iteration begins. Returns this cursor.
+        """
+        if self.started:
+            raise pymongo.errors.InvalidOperation(
+                "cannot set options after executing query")
+
+        delegate = self.delegate
+        if self._decode_executor is None:
+            self._codec_options = delegate._Cursor__codec_options
+            delegate._Cursor__codec_options = self._codec_options._replace(
+                document_class=RawBSONDocument)
+
+        self._decode_executor = executor
+        return self
+
+    def _get_more(self):
+        future = super(self.__class__, self)._get_more()
+        if self._decode_executor is None:
+            return future
+
+        loop = self.get_io_loop()
+        decoded = self._framework.get_future(loop)
+        self._framework.add_future(loop, future, self._decode, decoded)
+        return decoded
+
+    def _decode(self, decoded, future):
+        try:
+            n = future.result()
+        except Exception as exc:
+            decoded.set_exception(exc)
+            return
+
+        # The buffer may hold the rest of a batch decoded earlier.
+        data = self._data()
+        if not n or not isinstance(data[0], RawBSONDocument):
+            decoded.set_result(n)
+            return
+
+        self._framework.add_future(
+            self.get_io_loop(),
+            self._framework.run_on_executor(self.get_io_loop(),
+                                            motor_process.decode_batch,
+                                            self._decode_executor,
+                                            list(data),
+                                            self._codec_options),
+            self._on_decoded, data, decoded)
+
+    def _on_decoded(self, data, decoded, future):
+        try:
+            docs = future.result()
+        except Exception as exc:
+            decoded.set_exception(exc)
+            return
+
+        data.clear()
+        data.extend(docs)
+        decoded.set_result(len(docs))
+
     def rewind(self):
         """Rewind this cursor to its unevaluated state."""
         self.delegate.rewind()
@@ -988,6 +2117,53 @@ class AgnosticCursor(AgnosticBaseCursor):
     def __deepcopy__(self, memo):
         return self.__class__(self.delegate.__deepcopy__(memo), self.collection)
 
+    def _cached(self, length, to_list_future):
+        cache = self.collection._query_cache
+        if cache is None or self.started:
+            return to_list_future
+
+        # Every option that can change the documents returned, or how
+        # they're decoded.
+        delegate = self.delegate
+        read_concern = delegate._Cursor__read_concern
+        query = (delegate._Cursor__spec,
+                 delegate._Cursor__projection,
+                 delegate._Cursor__ordering,
+                 delegate._Cursor__skip,
+                 delegate._Cursor__limit,
+                 delegate._Cursor__empty,
+                 delegate._Cursor__modifiers,
+                 delegate._Cursor__max_scan,
+                 delegate._Cursor__min,
+                 delegate._Cursor__max,
+                 delegate._Cursor__collation,
+                 delegate._Cursor__hint,
+                 delegate._Cursor__comment,
+                 delegate._Cursor__max_time_ms,
+                 delegate._Cursor__explain,
+                 delegate._Cursor__query_flags,
+                 delegate._Cursor__manipulate,
+                 read_concern.document,
+                 length)
+
+        key = motor_cache.query_key(self.collection.full_name, 'find', query,
+                                    {}, delegate._Cursor__read_preference,
+                                    delegate._Cursor__codec_options)
+
+        if key is None:
+            return to_list_future
+
+        found, docs = cache.get(key)
+        if not found:
+            return cache.remember(self._framework, self.get_io_loop(), key,
+                                  to_list_future)
+
+        # Like a cursor that returned these documents and was exhausted.
+        self.started = True
+        delegate._Cursor__killed = True
+        to_list_future.set_result(docs)
+        return None
+
     def _query_flags(self):
         return self.delegate._Cursor__query_flags
 
@@ -1101,10 +2277,1455 @@ class AgnosticLatentCommandCursor(AgnosticCommandCursor):
         except Exception as exc:
             original_future.set_exception(exc)
         else:
+            self._track()
+
             # _get_more is complete.
             original_future.set_result(len(self.delegate._CommandCursor__data))
 
 
+class AgnosticPartitionedCursor(object):
+    """Iterate several range-partitioned MotorCursors as one result set.
+
+    Don't construct this yourself, use :meth:`MotorCollection.find_partitioned`.
+    """
+    __motor_class_name__ = 'MotorPartitionedCursor'
+    __delegate_class__ = None
+
+    def __init__(self, collection, num_partitions, filter, projection, key,
+                 ordered, split, kwargs):
+        self.collection = collection
+        self.num_partitions = num_partitions
+        self.filter = filter
+        self.projection = projection
+        self.key = key
+        self.ordered = ordered
+        self.split = split
+        self.kwargs = kwargs
+        self.started = False
+        self.closed = False
+
+        # MotorCursors, one per partition, once the split points are known.
+        self.cursors = None
+        self._index = 0
+        self._in_flight = set()
+        self._waiter = None
+        self._error = None
+
+    # python.org/dev/peps/pep-0492/#api-design-and-implementation-revisions
+    if PY352:
+        exec(textwrap.dedent("""
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if await self.fetch_next:
+                return self.next_object()
+            raise StopAsyncIteration()
+        """), globals(), locals())
+
+    elif PY35:
+        # In Python 3.5.0 and 3.5.1, __aiter__ is a coroutine.
+        exec(textwrap.dedent("""
+        async def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if await self.fetch_next:
+                return self.next_object()
+            raise StopAsyncIteration()
+        """), globals(), locals())
+
+    @property
+    @coroutine_annotation
+    def fetch_next(self):
+        """A Future that resolves to ``True`` once :meth:`next_object` is
+        guaranteed to return a document, or ``False`` when all partitions are
+        exhausted. See :attr:`MotorCursor.fetch_next`.
+        """
+        if self._waiter is None:
+            self._waiter = self._framework.get_future(self.get_io_loop())
+            if not self.started:
+                self._start()
+            else:
+                self._wake()
+
+        return self._waiter
+
+    def next_object(self):
+        """Get a document from the fetched batches, or ``None``."""
+        if not self.cursors:
+            return None
+
+        if self.ordered:
+            while self._index < len(self.cursors):
+                cursor = self.cursors[self._index]
+                if cursor._buffer_size():
+                    return cursor.next_object()
+                elif cursor.alive:
+                    return None
+
+                self._index += 1
+
+            return None
+
+        for cursor in self.cursors:
+            if cursor._buffer_size():
+                return cursor.next_object()
+
+        return None
+
+    @motor_coroutine
+    def close(self):
+        """Kill all partitions' cursors on the server."""
+        if not self.closed:
+            self.closed = True
+            self._wake()
+            for cursor in self.cursors or []:
+                yield self._framework.yieldable(cursor.close())
+
+    def get_io_loop(self):
+        return self.collection.get_io_loop()
+
+    def _start(self):
+        self.started = True
+        loop = self.get_io_loop()
+        future = self._framework.run_on_executor(loop,
+                                                 _partition_bounds,
+                                                 self.collection.delegate,
+                                                 self.filter,
+                                                 self.key,
+                                                 self.num_partitions,
+                                                 self.split)
+
+        self._framework.add_future(loop, future, self._on_bounds)
+
+    def _on_bounds(self, future):
+        try:
+            bounds = future.result()
+        except Exception as exc:
+            self._error = exc
+            self._wake()
+            return
+
+        if self.closed:
+            # Closed while choosing split points: open no server cursors.
+            return
+
+        self.cursors = []
+        for partition_filter in _partition_filters(self.filter, self.key,
+                                                   bounds):
+            cursor = self.collection.find(partition_filter,
+                                          self.projection,
+                                          **self.kwargs)
+            if self.ordered:
+                cursor.sort(self.key, pymongo.ASCENDING)
+
+            self.cursors.append(cursor)
+
+        # Send every partition's initial query at once.
+        for i in range(len(self.cursors)):
+            self._refresh(i)
+
+        self._wake()
+
+    def _refresh(self, i):
+        cursor = self.cursors[i]
+        if i in self._in_flight or cursor._buffer_size() or not cursor.alive:
+            return
+
+        self._in_flight.add(i)
+        self._framework.add_future(self.get_io_loop(),
+                                   cursor._get_more(),
+                                   self._on_refresh, i)
+
+    def _on_refresh(self, i, future):
+        self._in_flight.discard(i)
+        try:
+            future.result()
+        except Exception as exc:
+            if self._error is None:
+                self._error = exc
+
+        self._wake()
+
+    def _wake(self):
+        # Resolve the pending fetch_next Future, if we can.
+        waiter = self._waiter
+        if waiter is None:
+            return
+
+        if self._error is not None:
+            self._waiter, error, self._error = None, self._error, None
+            waiter.set_exception(error)
+            return
+
+        if self.closed:
+            self._waiter = None
+            waiter.set_result(False)
+            return
+
+        if self.cursors is None:
+            # Still choosing split points.
+            return
+
+        if self.ordered:
+            while self._index < len(self.cursors):
+                cursor = self.cursors[self._index]
+                if cursor._buffer_size():
+                    break
+                elif cursor.alive:
+                    self._refresh(self._index)
+                    return
+
+                self._index += 1
+            has_next = self._index < len(self.cursors)
+        else:
+            # Keep a getMore in flight for every drained partition.
+            has_next = False
+            any_alive = False
+            for i, cursor in enumerate(self.cursors):
+                if cursor._buffer_size():
+                    has_next = True
+                elif cursor.alive:
+                    any_alive = True
+                    self._refresh(i)
+
+            if not has_next and any_alive:
+                return
+
+        self._waiter = None
+        waiter.set_result(has_next)
+
+
+class AgnosticMergedCursor(object):
+    __motor_class_name__ = 'MotorMergedCursor'
+    __delegate_class__ = None
+
+    def __init__(self, cursors, key_or_list, direction=None):
+        """Merge cursors that are sorted the same way into one sorted stream.
+
+        Each cursor must already be sorted by the same specification passed
+        here, as for :meth:`MotorCursor.sort`. For example, to read two
+        collections, perhaps on different clusters, in ``_id`` order::
+
+          merged = MotorMergedCursor([c1.find().sort('_id'),
+                                      c2.find().sort('_id')], '_id')
+
+          while (yield merged.fetch_next):
+              print(merged.next_object())
+
+        The merge keeps a heap of each cursor's next document. When a cursor's
+        batch is used up its next batch is fetched while the merge continues
+        with the other cursors, so at most about one batch per cursor is held
+        in memory.
+
+        Documents are compared the way MongoDB sorts them: by BSON type
+        order, then by value. For an array, its smallest element is used when
+        sorting ascending and its largest descending, and an empty array
+        comes before null. Collations aren't supported, and if a sort key
+        isn't a BSON value :attr:`fetch_next` fails with :exc:`TypeError`.
+
+        :Parameters:
+          - `cursors`: a list of :class:`MotorCursor` or
+            :class:`MotorCommandCursor` instances
+          - `key_or_list`: a single key or a list of (key, direction)
+            pairs, each direction :data:`~pymongo.ASCENDING` or
+            :data:`~pymongo.DESCENDING`
+          - `direction` (optional): only used if `key_or_list` is a single
+            key, if not given :data:`~pymongo.ASCENDING` is assumed
+        """
+        cursors = list(cursors)
+        if not cursors:
+            raise ValueError('cursors must not be empty')
+
+        for cursor in cursors:
+            if not isinstance(cursor, AgnosticBaseCursor):
+                raise TypeError("cursors must be Motor cursors, not %r" %
+                                (cursor, ))
+
+        sort_spec = list(_index_list(key_or_list, direction))
+        if not sort_spec:
+            raise ValueError('key_or_list must not be the empty list')
+
+        for key, key_direction in sort_spec:
+            if key_direction not in (pymongo.ASCENDING, pymongo.DESCENDING):
+                raise ValueError('direction must be ASCENDING or DESCENDING, '
+                                 'not %r' % (key_direction, ))
+
+        self.cursors = cursors
+        self.sort_spec = sort_spec
+        self.started = False
+        self.closed = False
+
+        # Entries are (_SortKey, cursor index, document), at most one entry
+        # per cursor. Cursors in _pending must supply their next document
+        # before the heap's minimum can be returned.
+        self._heap = []
+        self._pending = set()
+        self._in_flight = set()
+        self._waiter = None
+        self._error = None
+
+    # python.org/dev/peps/pep-0492/#api-design-and-implementation-revisions
+    if PY352:
+        exec(textwrap.dedent("""
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if await self.fetch_next:
+                return self.next_object()
+            raise StopAsyncIteration()
+        """), globals(), locals())
+
+    elif PY35:
+        # In Python 3.5.0 and 3.5.1, __aiter__ is a coroutine.
+        exec(textwrap.dedent("""
+        async def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if await self.fetch_next:
+                return self.next_object()
+            raise StopAsyncIteration()
+        """), globals(), locals())
+
+    @property
+    @coroutine_annotation
+    def fetch_next(self):
+        """A Future that resolves to ``True`` once :meth:`next_object` is
+        guaranteed to return the next document in sort order, or ``False``
+        when all cursors are exhausted. See :attr:`MotorCursor.fetch_next`.
+        """
+        if self._waiter is None:
+            self._waiter = self._framework.get_future(self.get_io_loop())
+            if not self.started:
+                self.started = True
+                for i in range(len(self.cursors)):
+                    self._fill(i)
+
+            self._wake()
+
+        return self._waiter
+
+    def next_object(self):
+        """Get the next document in sort order, or ``None``."""
+        if self._pending or not self._heap:
+            return None
+
+        _, i, doc = heapq.heappop(self._heap)
+        self._fill(i)
+        return doc
+
+    @motor_coroutine
+    def close(self):
+        """Kill all the merged cursors on the server."""
+        if not self.closed:
+            self.closed = True
+            self._wake()
+            for cursor in self.cursors:
+                yield self._framework.yieldable(cursor.close())
+
+    def get_io_loop(self):
+        return self.cursors[0].get_io_loop()
+
+    def _fill(self, i):
+        # Move cursor i's next document to the heap, or fetch it.
+        cursor = self.cursors[i]
+        if cursor._buffer_size():
+            doc = cursor.next_object()
+            self._pending.discard(i)
+            try:
+                key = _SortKey(doc, self.sort_spec)
+            except TypeError as exc:
+                # fetch_next fails, rather than merging out of order.
+                if self._error is None:
+                    self._error = exc
+                return
+
+            heapq.heappush(self._heap, (key, i, doc))
+            if not cursor._buffer_size():
+                # Prefetch the next batch while the heap drains.
+                self._refresh(i)
+        elif cursor.alive:
+            self._pending.add(i)
+            self._refresh(i)
+        else:
+            self._pending.discard(i)
+
+    def _refresh(self, i):
+        cursor = self.cursors[i]
+        if i in self._in_flight or not cursor.alive:
+            return
+
+        self._in_flight.add(i)
+        self._framework.add_future(self.get_io_loop(),
+                                   cursor._get_more(),
+                                   self._on_refresh, i)
+
+    def _on_refresh(self, i, future):
+        self._in_flight.discard(i)
+        try:
+            future.result()
+        except Exception as exc:
+            self._pending.discard(i)
+            if self._error is None:
+                self._error = exc
+        else:
+            if i in self._pending:
+                self._fill(i)
+
+        self._wake()
+
+    def _wake(self):
+        # Resolve the pending fetch_next Future, if we can.
+        waiter = self._waiter
+        if waiter is None:
+            return
+
+        if self._error is not None:
+            self._waiter, error, self._error = None, self._error, None
+            waiter.set_exception(error)
+        elif self.closed:
+            self._waiter = None
+            waiter.set_result(False)
+        elif not self._pending:
+            self._waiter = None
+            waiter.set_result(bool(self._heap))
+
+
+class AgnosticLoader(object):
+    """Batch and remember lookups of documents by a unique field.
+
+    Don't construct this yourself, use :meth:`MotorCollection.loader`.
+    """
+    __motor_class_name__ = 'MotorLoader'
+    __delegate_class__ = None
+
+    def __init__(self, collection, key, max_batch_size, projection):
+        self.collection = collection
+        self.key = key
+        self.max_batch_size = max_batch_size
+        self.projection = projection
+
+        # Map each value ever loaded to its Future.
+        self._futures = {}
+
+        # (value, Future) pairs to query for at the end of this loop iteration.
+        self._queue = []
+
+    def get_io_loop(self):
+        return self.collection.get_io_loop()
+
+    @coroutine_annotation
+    def load(self, value):
+        """Get the document whose `key` is `value`, or ``None``.
+
+        Returns a Future. Loading the same value again returns the same
+        Future, without querying the server. Values are compared as MongoDB
+        compares them: ``True`` is not ``1``, but ``1`` is ``1.0``. Raises
+        :exc:`TypeError` if `value` can't be hashed.
+        """
+        key = _loader_key(value)
+        future = self._futures.get(key)
+        if future is None:
+            loop = self.get_io_loop()
+            future = self._futures[key] = self._framework.get_future(loop)
+            if not self._queue:
+                self._framework.call_soon(loop, self._dispatch)
+
+            self._queue.append((value, future))
+
+        return future
+
+    @coroutine_annotation
+    def load_many(self, values):
+        """Get a list of documents, or ``None`` for those not found.
+
+        Returns a Future.
+        """
+        loop = self.get_io_loop()
+        result = self._framework.get_future(loop)
+        futures = [self.load(value) for value in values]
+        if not futures:
+            result.set_result([])
+            return result
+
+        remaining = [len(futures)]
+
+        def loaded(future):
+            if result.done():
+                return
+
+            try:
+                future.result()
+            except Exception as exc:
+                result.set_exception(exc)
+                return
+
+            remaining[0] -= 1
+            if not remaining[0]:
+                result.set_result([f.result() for f in futures])
+
+        for future in futures:
+            self._framework.add_future(loop, future, loaded)
+
+        return result
+
+    def clear(self, value=None):
+        """Forget one loaded value, or all of them, so it's queried again."""
+        if value is None:
+            self._futures.clear()
+        else:
+            self._futures.pop(_loader_key(value), None)
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        for i in range(0, len(queue), self.max_batch_size):
+            batch = queue[i:i + self.max_batch_size]
+            values = [value for value, _ in batch]
+            cursor = self.collection.find({self.key: {'$in': values}},
+                                          self.projection)
+
+            self._framework.add_future(self.get_io_loop(),
+                                       cursor.to_list(None),
+                                       self._on_batch, batch)
+
+    def _on_batch(self, batch, future):
+        try:
+            docs = future.result()
+        except Exception as exc:
+            for value, waiter in batch:
+                # Let the next load() retry.
+                key = _loader_key(value)
+                if self._futures.get(key) is waiter:
+                    del self._futures[key]
+
+                waiter.set_exception(exc)
+            return
+
+        found = {}
+        for doc in docs:
+            try:
+                found.setdefault(_loader_key(doc.get(self.key)), doc)
+            except TypeError:
+                # Unhashable, no load() asked for it.
+                pass
+
+        for value, waiter in batch:
+            waiter.set_result(found.get(_loader_key(value)))
+
+
+def _loader_key(value):
+    try:
+        return motor_cache.freeze(value, numbers_equal=True)
+    except TypeError:
+        raise TypeError('Cannot load %r, it is not hashable' % (value,))
+
+
+def _write_error(error):
+    """The exception insert_one would raise for a bulk write error."""
+    code = error.get('code')
+    message = error.get('errmsg', 'write error')
+    if code == 11000:
+        return pymongo.errors.DuplicateKeyError(message, code, error)
+
+    return pymongo.errors.WriteError(message, code, error)
+
+
+def _bulk_write_errors(exc, n):
+    """The exception, or None, for each of n requests in a BulkWriteError.
+
+    A request's own write error, otherwise the write concern error if any.
+    """
+    errors = dict((error['index'], _write_error(error))
+                  for error in exc.details.get('writeErrors', []))
+
+    wc_errors = exc.details.get('writeConcernErrors')
+    wc_error = None
+    if wc_errors:
+        wc_error = pymongo.errors.WriteConcernError(
+            wc_errors[-1].get('errmsg'),
+            wc_errors[-1].get('code'),
+            wc_errors[-1])
+
+    return [errors.get(i, wc_error) for i in range(n)]
+
+
+class AgnosticBufferedWriter(object):
+    """Send single-document inserts in batches.
+
+    Don't construct this yourself, use
+    :meth:`MotorCollection.buffered_writer`.
+    """
+    __motor_class_name__ = 'MotorBufferedWriter'
+    __delegate_class__ = None
+
+    def __init__(self, collection, max_docs, max_bytes, max_delay_ms):
+        self.collection = collection
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_delay_ms = max_delay_ms
+        self._docs = []
+        self._ids = []
+        self._futures = []
+        self._bytes = 0
+
+        # Identifies the current buffer, so a timer for a buffer that has
+        # already been sent does nothing.
+        self._batch = 0
+
+    def get_io_loop(self):
+        return self.collection.get_io_loop()
+
+    @coroutine_annotation
+    def insert_one(self, document):
+        """Buffer a document to insert.
+
+        Like :meth:`MotorCollection.insert_one`, adds an "_id" to the
+        document if it has none. Returns a Future that resolves to an
+        :class:`~pymongo.results.InsertOneResult` once the document's batch
+        is written.
+        """
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        try:
+            if isinstance(document, RawBSONDocument):
+                document, _id = motor_bulk.raw_with_id(
+                    document, self.collection.codec_options)
+            else:
+                if '_id' not in document:
+                    document['_id'] = ObjectId()
+
+                _id = document['_id']
+
+                # Encode now to measure the batch; it's not encoded again.
+                document = RawBSONDocument(BSON.encode(
+                    document, True, self.collection.codec_options))
+        except Exception as exc:
+            future.set_exception(exc)
+            return future
+
+        if not self._docs and self.max_delay_ms:
+            self._framework.call_later(loop,
+                                       self.max_delay_ms / 1000.0,
+                                       self._on_timer,
+                                       self._batch)
+
+        self._docs.append(document)
+        self._ids.append(_id)
+        self._futures.append(future)
+        self._bytes += len(document.raw)
+        if (len(self._docs) >= self.max_docs
+                or self._bytes >= self.max_bytes
+                or not self.max_delay_ms):
+            self._flush()
+
+        return future
+
+    @coroutine_annotation
+    def flush(self):
+        """Send the buffered documents now.
+
+        Returns a Future that resolves when they are written.
+        """
+        return self._flush()
+
+    def _on_timer(self, batch):
+        if batch == self._batch:
+            self._flush()
+
+    def _flush(self):
+        loop = self.get_io_loop()
+        done = self._framework.get_future(loop)
+        docs, ids, futures = self._docs, self._ids, self._futures
+        self._docs, self._ids, self._futures, self._bytes = [], [], [], 0
+        self._batch += 1
+        if not docs:
+            done.set_result(None)
+            return done
+
+        self._framework.add_future(
+            loop,
+            self.collection.insert_many(docs, ordered=False),
+            self._on_flush, ids, futures, done)
+
+        return done
+
+    def _on_flush(self, ids, futures, done, future):
+        acknowledged = self.collection.write_concern.acknowledged
+        try:
+            future.result()
+        except pymongo.errors.BulkWriteError as exc:
+            errors = _bulk_write_errors(exc, len(ids))
+            for _id, waiter, error in zip(ids, futures, errors):
+                if error is not None:
+                    waiter.set_exception(error)
+                else:
+                    waiter.set_result(InsertOneResult(_id, acknowledged))
+        except Exception as exc:
+            for waiter in futures:
+                waiter.set_exception(exc)
+        else:
+            for _id, waiter in zip(ids, futures):
+                waiter.set_result(InsertOneResult(_id, acknowledged))
+
+        done.set_result(None)
+
+
+class _MergedUpdate(object):
+    """Updates to one document, merged into one update document."""
+    def __init__(self):
+        self.inc = {}
+        self.set = {}
+        self.add_to_set = {}
+        self.futures = []
+
+        # Map $addToSet fields to the frozen values added, to dedupe them.
+        self._added = {}
+
+    def _conflicts(self, operator, field):
+        # MongoDB rejects one update that changes a field and its parent,
+        # or changes a field with two operators.
+        for op, fields in (('$inc', self.inc),
+                           ('$set', self.set),
+                           ('$addToSet', self.add_to_set)):
+            for other in fields:
+                if other == field:
+                    if op != operator:
+                        return True
+                elif (other.startswith(field + '.')
+                      or field.startswith(other + '.')):
+                    return True
+
+        return False
+
+    def merge(self, update):
+        """Merge an update document, or return False if it conflicts.
+
+        Raises TypeError for an invalid update, and leaves this one unchanged.
+        """
+        for operator, fields in update.items():
+            for field in fields:
+                if self._conflicts(operator, field):
+                    return False
+
+        # Merge into copies, so a bad update can't leave a partial merge.
+        inc = dict(self.inc)
+        for field, amount in update.get('$inc', {}).items():
+            if (not isinstance(amount, numbers.Number)
+                    or isinstance(amount, bool)):
+                raise TypeError('$inc amount for %r must be a number' % field)
+
+            inc[field] = inc.get(field, 0) + amount
+
+        set_ = dict(self.set)
+        set_.update(update.get('$set', {}))
+        add_to_set = dict((field, list(values))
+                          for field, values in self.add_to_set.items())
+        added_keys = dict((field, set(keys))
+                          for field, keys in self._added.items())
+        for field, value in update.get('$addToSet', {}).items():
+            if isinstance(value, dict) and '$each' in value:
+                values = value['$each']
+                if not isinstance(values, (list, tuple)):
+                    raise TypeError('$each for %r must be a list' % field)
+            else:
+                values = [value]
+
+            merged = add_to_set.setdefault(field, [])
+            added = added_keys.setdefault(field, set())
+            for v in values:
+                try:
+                    # Type-aware: True, 1 and 1.0 are distinct to MongoDB.
+                    key = motor_cache.freeze(v)
+                except TypeError:
+                    # Unhashable, let the server dedupe it.
+                    merged.append(v)
+                    continue
+
+                if key not in added:
+                    added.add(key)
+                    merged.append(v)
+
+        self.inc = inc
+        self.set = set_
+        self.add_to_set = add_to_set
+        self._added = added_keys
+        return True
+
+    def document(self):
+        document = {}
+        if self.inc:
+            document['$inc'] = self.inc
+        if self.set:
+            document['$set'] = self.set
+        if self.add_to_set:
+            document['$addToSet'] = dict(
+                (field, {'$each': values})
+                for field, values in self.add_to_set.items())
+
+        return document
+
+
+class AgnosticCoalescingUpdater(object):
+    """Merge updates to the same documents and send them in batches.
+
+    Don't construct this yourself, use
+    :meth:`MotorCollection.coalescing_updater`.
+    """
+    __motor_class_name__ = 'MotorCoalescingUpdater'
+    __delegate_class__ = None
+
+    _operators = frozenset(['$inc', '$set', '$addToSet'])
+
+    def __init__(self, collection, interval_ms, max_pending, upsert):
+        self.collection = collection
+        self.interval_ms = interval_ms
+        self.max_pending = max_pending
+        self.upsert = upsert
+
+        # Map _id to _MergedUpdate, in the order documents were first updated.
+        self._pending = collections.OrderedDict()
+
+        # (merged updates, Future) pairs waiting to be sent, and whether one
+        # is being sent now.
+        self._batches = []
+        self._sending = False
+        self._last_done = None
+
+        # Identifies the current batch, so a stale timer does nothing.
+        self._batch = 0
+
+    def get_io_loop(self):
+        return self.collection.get_io_loop()
+
+    @coroutine_annotation
+    def update_one(self, _id, update):
+        """Update the document with this ``_id``, merged with other updates.
+
+        `update` may only use ``$inc``, ``$set`` and ``$addToSet``. Returns
+        a Future that resolves once the merged update is acknowledged.
+        """
+        if not isinstance(update, dict) or not update:
+            raise TypeError('update must be a non-empty dict')
+
+        unsupported = set(update) - self._operators
+        if unsupported:
+            raise ValueError('Only $inc, $set and $addToSet can be coalesced,'
+                             ' not %s' % ', '.join(sorted(unsupported)))
+
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        merged = self._pending.get(_id)
+        if merged is not None and not merged.merge(update):
+            # Send what's merged first, then start again with this update.
+            self._flush()
+            merged = None
+
+        if merged is None:
+            # Merge before adding it, in case the update is invalid.
+            merged = _MergedUpdate()
+            merged.merge(update)
+            if not self._pending:
+                self._framework.call_later(loop,
+                                           self.interval_ms / 1000.0,
+                                           self._on_timer,
+                                           self._batch)
+
+            self._pending[_id] = merged
+
+        merged.futures.append(future)
+        if len(self._pending) >= self.max_pending:
+            self._flush()
+
+        return future
+
+    @coroutine_annotation
+    def flush(self):
+        """Send waiting updates now.
+
+        Returns a Future that resolves when all updates so far are sent.
+        """
+        if self._pending:
+            return self._flush()
+
+        if self._last_done is not None and not self._last_done.done():
+            return self._last_done
+
+        future = self._framework.get_future(self.get_io_loop())
+        future.set_result(None)
+        return future
+
+    def _on_timer(self, batch):
+        if batch == self._batch and self._pending:
+            self._flush()
+
+    def _flush(self):
+        done = self._framework.get_future(self.get_io_loop())
+        self._batches.append((self._pending, done))
+        self._pending = collections.OrderedDict()
+        self._batch += 1
+        self._last_done = done
+        if not self._sending:
+            self._send_next()
+
+        return done
+
+    def _send_next(self):
+        pending, done = self._batches.pop(0)
+        self._sending = True
+        requests = [
+            pymongo.UpdateOne({'_id': _id}, merged.document(),
+                              upsert=self.upsert)
+            for _id, merged in pending.items()]
+
+        self._framework.add_future(
+            self.get_io_loop(),
+            self.collection.bulk_write(requests, ordered=False),
+            self._on_sent, list(pending.values()), done)
+
+    def _on_sent(self, updates, done, future):
+        try:
+            future.result()
+        except pymongo.errors.BulkWriteError as exc:
+            errors = _bulk_write_errors(exc, len(updates))
+            for merged, error in zip(updates, errors):
+                for waiter in merged.futures:
+                    if error is not None:
+                        waiter.set_exception(error)
+                    else:
+                        waiter.set_result(None)
+        except Exception as exc:
+            for merged in updates:
+                for waiter in merged.futures:
+                    waiter.set_exception(exc)
+        else:
+            for merged in updates:
+                for waiter in merged.futures:
+                    waiter.set_result(None)
+
+        self._sending = False
+        done.set_result(None)
+        if self._batches:
+            self._send_next()
+
+
+class AgnosticBulkStream(object):
+    """Send write operations as they're produced, in batches.
+
+    Don't construct this yourself, use :meth:`MotorCollection.bulk_stream`.
+    """
+    __motor_class_name__ = 'MotorBulkStream'
+    __delegate_class__ = None
+
+    def __init__(self, collection, ordered, batch_size, max_in_flight,
+                 bypass_document_validation):
+        self.collection = collection
+        self.ordered = ordered
+        self.batch_size = batch_size
+
+        # Ordered batches are sent one at a time.
+        self.max_in_flight = 1 if ordered else max_in_flight
+        self.bypass_document_validation = bypass_document_validation
+
+        # The merged result, once the stream is closed.
+        self.result = None
+
+        self._batch = []
+        self._added = 0
+
+        # (offset, operations, Future) of full batches waiting to be sent.
+        self._waiting = []
+        self._in_flight = 0
+        self._results = []
+        self._error = None
+        self._closed = False
+        self._close_future = None
+
+    def get_io_loop(self):
+        return self.collection.get_io_loop()
+
+    @coroutine_annotation
+    def add(self, operation):
+        """Add a write operation, like :class:`~pymongo.operations.InsertOne`.
+
+        Returns a Future that resolves once the operation's batch can be
+        sent: wait for it to keep the number of buffered batches bounded.
+        """
+        if not isinstance(operation, _WriteOp):
+            raise TypeError("%r is not a valid request" % (operation,))
+
+        if self._closed:
+            raise pymongo.errors.InvalidOperation('Bulk stream is closed')
+
+        future = self._framework.get_future(self.get_io_loop())
+        self._batch.append(operation)
+        self._added += 1
+        if len(self._batch) < self.batch_size:
+            future.set_result(None)
+        else:
+            self._seal(future)
+
+        return future
+
+    @coroutine_annotation
+    def close(self):
+        """Send the operations added so far and wait for all batches.
+
+        Returns a Future that resolves with the totals for the stream, which
+        are also stored in :attr:`result`. Fails if a batch failed with an
+        error other than write errors, such as a network error.
+        """
+        if self._close_future is None:
+            self._closed = True
+            self._close_future = self._framework.get_future(
+                self.get_io_loop())
+
+            if self._batch:
+                self._seal(None)
+
+            self._maybe_finish()
+
+        return self._close_future
+
+    if PY35:
+        # Support "async with collection.bulk_stream() as stream:"
+        exec(textwrap.dedent("""
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            if exc_type is None:
+                await self.close()
+                return
+
+            # Wait for batches already sent, but don't send the others, nor
+            # replace the caller's exception with a write error.
+            self._abort()
+            try:
+                await self.close()
+            except Exception:
+                pass
+        """), globals(), locals())
+
+    def _abort(self):
+        self._batch = []
+        waiting, self._waiting = self._waiting, []
+        for _, _, future in waiting:
+            if future is not None and not future.done():
+                future.set_exception(pymongo.errors.InvalidOperation(
+                    'Bulk stream was aborted'))
+
+    def _seal(self, future):
+        offset = self._added - len(self._batch)
+        self._waiting.append((offset, self._batch, future))
+        self._batch = []
+        self._send_waiting()
+
+    def _send_waiting(self):
+        while self._waiting and self._in_flight < self.max_in_flight:
+            offset, operations, future = self._waiting.pop(0)
+            if self._error is not None:
+                # An ordered batch failed, don't send later ones.
+                if future is not None:
+                    future.set_exception(self._error)
+                continue
+
+            self._in_flight += 1
+            self._framework.add_future(
+                self.get_io_loop(),
+                self.collection.bulk_write(
+                    operations,
+                    ordered=self.ordered,
+                    bypass_document_validation=(
+                        self.bypass_document_validation)),
+                self._on_sent, offset)
+
+            if future is not None:
+                future.set_result(None)
+
+    def _on_sent(self, offset, future):
+        self._in_flight -= 1
+        try:
+            result = future.result()
+        except pymongo.errors.BulkWriteError as exc:
+            self._results.append((offset, exc.details))
+            if self.ordered and exc.details.get('writeErrors'):
+                self._error = exc
+        except Exception as exc:
+            if self._error is None:
+                self._error = exc
+        else:
+            if result.acknowledged:
+                self._results.append((offset, result.bulk_api_result))
+            else:
+                self._results.append((offset, None))
+
+        self._send_waiting()
+        self._maybe_finish()
+
+    def _maybe_finish(self):
+        if (self._close_future is None or self._close_future.done()
+                or self._in_flight or self._waiting):
+            return
+
+        if self._error is not None and not isinstance(
+                self._error, pymongo.errors.BulkWriteError):
+            self._close_future.set_exception(self._error)
+            return
+
+        if self._results:
+            self.result = motor_bulk.merge(self._results)
+        elif self.collection.write_concern.acknowledged:
+            self.result = motor_bulk.empty_result()
+
+        self._close_future.set_result(self.result)
+
+
+class AgnosticCursorReaper(object):
+    """Kill server cursors of abandoned or idle cursors, in batches.
+
+    Don't construct this yourself, use :meth:`MotorClient.start_cursor_reaper`.
+
+    The attributes ``leaked`` and ``timed_out`` count the cursors killed
+    because they were garbage collected or idle, ``batches`` counts the
+    rounds of killCursors messages sent, and :attr:`tracked` is the number of
+    cursors currently followed.
+    """
+    __motor_class_name__ = 'MotorCursorReaper'
+    __delegate_class__ = None
+
+    def __init__(self, client, interval, idle_timeout):
+        self.client = client
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.stopped = False
+        self.leaked = 0
+        self.timed_out = 0
+        self.batches = 0
+
+        # Map keys to [weakref to MotorCursor, PyMongo cursor, last used,
+        # Future of the query or getMore in flight or None]. Holding the
+        # PyMongo cursor keeps it from killing itself when the MotorCursor is
+        # collected; the reaper kills it instead.
+        self._entries = {}
+        self._keys = itertools.count()
+
+        # Keys of collected MotorCursors, appended during garbage collection.
+        self._collected = []
+        self._schedule()
+
+    @property
+    def tracked(self):
+        """The number of cursors this reaper follows."""
+        return len(self._entries)
+
+    def stop(self):
+        """Stop killing cursors. Cursors no longer followed are left to
+        PyMongo's garbage collection."""
+        self.stopped = True
+        self._entries.clear()
+
+    def track(self, cursor, future=None):
+        """Follow a cursor that is sending a query or getMore.
+
+        `future` resolves when the query or getMore completes; the cursor
+        isn't killed before then.
+        """
+        if self.stopped:
+            return
+
+        key = getattr(cursor, '_reaper_key', None)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1:] = [cursor.delegate, time.time(), future]
+            return
+
+        key = cursor._reaper_key = next(self._keys)
+        collected = self._collected
+        ref = weakref.ref(cursor, lambda _: collected.append(key))
+        self._entries[key] = [ref, cursor.delegate, time.time(), future]
+
+    def _schedule(self):
+        self._framework.call_later(self.client.get_io_loop(),
+                                   self.interval,
+                                   self._reap)
+
+    def _reap(self):
+        if self.stopped:
+            return
+
+        killed = False
+        busy = []
+        while self._collected:
+            key = self._collected.pop()
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            elif _in_flight(entry[3]):
+                # Killing it would race the getMore on the executor.
+                busy.append(key)
+                continue
+
+            del self._entries[key]
+            if self._kill(entry[1]):
+                self.leaked += 1
+                killed = True
+
+        self._collected.extend(busy)
+        now = time.time()
+        deadline = None
+        if self.idle_timeout is not None:
+            deadline = now - self.idle_timeout
+
+        for key, entry in list(self._entries.items()):
+            ref, delegate, last_used, future = entry
+            cursor = ref()
+            if cursor is None:
+                # Collected, its key is in self._collected for next time.
+                continue
+
+            if _in_flight(future):
+                # Waiting for the server isn't idling.
+                entry[2] = now
+            elif cursor.closed or _server_cursor_id(delegate) == 0:
+                del self._entries[key]
+            elif deadline is not None and last_used < deadline:
+                del self._entries[key]
+                if self._kill(delegate):
+                    # Its next fetch raises CursorNotFound.
+                    cursor._timed_out = True
+                    self.timed_out += 1
+                    killed = True
+
+        if killed:
+            # Each cursor queued a kill in PyMongo, send them now.
+            self.batches += 1
+            future = self._framework.run_on_executor(
+                self.client.get_io_loop(),
+                pymongo.mongo_client.MongoClient._process_periodic_tasks,
+                self.client.delegate)
+
+            self._framework.add_future(self.client.get_io_loop(),
+                                       future,
+                                       self._reaped)
+        else:
+            self._schedule()
+
+    def _reaped(self, future):
+        # Errors are ignored like in PyMongo's periodic task; retried later.
+        future.exception()
+        self._schedule()
+
+    def _kill(self, delegate):
+        if not _server_cursor_id(delegate):
+            return False
+
+        # Queues the id for the next killCursors to this server, no I/O.
+        if isinstance(delegate, Cursor):
+            delegate._Cursor__die()
+        else:
+            delegate._CommandCursor__die()
+
+        return True
+
+
+def _in_flight(future):
+    return future is not None and not future.done()
+
+
+def _bulk_write_result(full_result):
+    if full_result is None:
+        return BulkWriteResult({}, False)
+
+    return BulkWriteResult(full_result, True)
+
+
+class _ParallelBulkWrite(object):
+    """Send an unordered PyMongo _Bulk in chunks, several at once.
+
+    "future" resolves with make_result(merged raw result).
+    """
+    def __init__(self, framework, loop, bulk, write_concern, max_workers,
+                 make_result):
+        self.framework = framework
+        self.loop = loop
+        self.write_concern = write_concern
+        self.max_workers = max_workers
+        self.make_result = make_result
+        self.future = framework.get_future(loop)
+        self.chunks = []
+        self.results = []
+        self.running = 0
+
+        # Reading the max write batch size may wait for server selection.
+        framework.add_future(
+            loop,
+            framework.run_on_executor(loop, motor_bulk.split, bulk),
+            self._on_split)
+
+    def _on_split(self, future):
+        try:
+            self.chunks = future.result()
+        except Exception as exc:
+            self.future.set_exception(exc)
+            return
+
+        self.chunks.reverse()
+        while self.chunks and self.running < self.max_workers:
+            self._send()
+
+    def _send(self):
+        offset, chunk = self.chunks.pop()
+        self.running += 1
+        self.framework.add_future(
+            self.loop,
+            self.framework.run_on_executor(self.loop,
+                                           motor_bulk.execute_chunk,
+                                           chunk,
+                                           self.write_concern),
+            self._on_chunk, offset)
+
+    def _on_chunk(self, offset, future):
+        self.running -= 1
+        if self.future.done():
+            # An earlier chunk failed.
+            return
+
+        try:
+            self.results.append((offset, future.result()))
+        except Exception as exc:
+            self.chunks = []
+            self.future.set_exception(exc)
+            return
+
+        if self.chunks:
+            self._send()
+        elif not self.running:
+            full_result = motor_bulk.merge(self.results)
+            if full_result and (full_result['writeErrors']
+                                or full_result['writeConcernErrors']):
+                self.future.set_exception(
+                    pymongo.errors.BulkWriteError(full_result))
+            else:
+                self.future.set_result(self.make_result(full_result))
+
+
+class _PipelinedInsert(object):
+    """Insert batches of documents, encoding the next batch meanwhile.
+
+    At most one batch is encoded and one inserted at a time.
+    """
+    def __init__(self, collection, documents, ordered, batch_size,
+                 bypass_document_validation, executor):
+        self.collection = collection
+        self.framework = collection._framework
+        self.loop = collection.get_io_loop()
+        self.documents = documents
+        self.ordered = ordered
+        self.batch_size = batch_size
+        self.bypass_document_validation = bypass_document_validation
+        self.executor = executor
+        self.future = self.framework.get_future(self.loop)
+
+        self.next_offset = 0
+        self.encoding = False
+        self.inserting = False
+
+        # (offset, encoded documents) of the batch to insert next.
+        self.ready = None
+        self.ids = []
+        self.results = []
+        self.acknowledged = True
+        self.stopped = False
+        self.error = None
+        self._advance()
+
+    def _advance(self):
+        if self.future.done():
+            return
+
+        if not self.inserting and self.ready and not self.stopped:
+            offset, encoded = self.ready
+            self.ready = None
+            self.inserting = True
+            self.framework.add_future(
+                self.loop,
+                self.collection.insert_many(
+                    encoded,
+                    ordered=self.ordered,
+                    bypass_document_validation=(
+                        self.bypass_document_validation)),
+                self._on_inserted, offset, len(encoded))
+
+        if (not self.encoding and self.ready is None and not self.stopped
+                and self.next_offset < len(self.documents)):
+            offset = self.next_offset
+            self.next_offset += self.batch_size
+            self.encoding = True
+            batch = self.documents[offset:self.next_offset]
+            codec_options = self.collection.codec_options
+            if self.executor is None:
+                encoding = self.framework.run_on_executor(
+                    self.loop, motor_bulk.encode_batch, batch, codec_options)
+            else:
+                encoding = self.framework.run_on_executor(
+                    self.loop, motor_process.encode_batch, self.executor,
+                    batch, codec_options)
+
+            self.framework.add_future(self.loop, encoding,
+                                      self._on_encoded, offset)
+
+        if not self.encoding and not self.inserting and (
+                self.stopped or (self.ready is None and
+                                 self.next_offset >= len(self.documents))):
+            self._finish()
+
+    def _on_encoded(self, offset, future):
+        self.encoding = False
+        try:
+            encoded, ids = future.result()
+        except Exception as exc:
+            self.error = self.error or exc
+            self.stopped = True
+        else:
+            self.ids.extend(ids)
+            self.ready = (offset, encoded)
+
+        self._advance()
+
+    def _on_inserted(self, offset, n, future):
+        self.inserting = False
+        try:
+            result = future.result()
+        except pymongo.errors.BulkWriteError as exc:
+            self.results.append((offset, exc.details))
+            if self.ordered:
+                self.stopped = True
+        except Exception as exc:
+            self.error = self.error or exc
+            self.stopped = True
+        else:
+            self.acknowledged = result.acknowledged
+            self.results.append((offset, {'nInserted': n, 'nModified': 0}))
+
+        self._advance()
+
+    def _finish(self):
+        if self.error is not None:
+            self.future.set_exception(self.error)
+            return
+
+        full_result = motor_bulk.merge(self.results)
+        if full_result['writeErrors'] or full_result['writeConcernErrors']:
+            self.future.set_exception(
+                pymongo.errors.BulkWriteError(full_result))
+        else:
+            self.future.set_result(
+                InsertManyResult(self.ids, self.acknowledged))
+
+
 class AgnosticBulkOperationBuilder(AgnosticBase):
     __motor_class_name__ = 'MotorBulkOperationBuilder'
     __delegate_class__ = BulkOperationBuilder
@@ -1119,6 +3740,48 @@ class AgnosticBulkOperationBuilder(AgnosticBase):
                                         ordered,
                                         bypass_document_validation)
         super(self.__class__, self).__init__(delegate)
+        self.collection = collection
+        self.ordered = ordered
 
     def get_io_loop(self):
         return self.io_loop
+
+    @coroutine_annotation
+    def execute_parallel(self, write_concern=None, max_workers=4,
+                         callback=None):
+        """Like :meth:`execute`, but send chunks of operations concurrently.
+
+        Only for unordered bulk operations. The operations are split into
+        chunks of the server's maximum write batch size, and up to
+        `max_workers` chunks are sent at once on separate connections. The
+        chunks' results are merged into one result document, and write
+        errors are indexed by the order operations were added.
+
+        :Parameters:
+          - `write_concern` (optional): the write concern for this bulk
+            execution.
+          - `max_workers` (optional): The most chunks to send at once.
+          - `callback` (optional): function taking (result, error), executed
+            when operation completes
+        """
+        if self.ordered:
+            raise pymongo.errors.InvalidOperation(
+                'Ordered bulk operations cannot run in parallel')
+
+        if (not isinstance(max_workers, numbers.Integral)
+                or max_workers < 1):
+            raise ValueError('max_workers must be a positive int')
+
+        if write_concern is not None:
+            pymongo.common.validate_is_mapping("write_concern", write_concern)
+
+        loop = self.get_io_loop()
+        future = invalidate_reads(
+            self._framework, self.collection,
+            lambda: _ParallelBulkWrite(
+                self._framework, loop,
+                self.delegate._BulkOperationBuilder__bulk,
+                write_concern, max_workers,
+                lambda full_result: full_result).future)
+
+        return self._framework.future_or_callback(future, callback, loop)
@@ -53,6 +53,15 @@ def get_future(loop):
     return asyncio.Future(loop=loop)
 
 
+def get_queue(loop, maxsize=0):
+    return asyncio.Queue(maxsize=maxsize, loop=loop)
+
+
+def queue_put(loop, queue, item):
+    # Future that resolves once there's room for "item" in the queue.
+    return ensure_future(queue.put(item), loop=loop)
+
+
 if 'MOTOR_MAX_WORKERS' in os.environ:
     max_workers = int(os.environ['MOTOR_MAX_WORKERS'])
 else:
@@ -113,6 +122,14 @@ def call_soon(loop, callback, *args, **kwargs):
         loop.call_soon(callback, *args)
 
 
+def call_later(loop, delay, callback, *args):
+    return loop.call_later(delay, callback, *args)
+
+
+def call_soon_threadsafe(loop, callback, *args):
+    loop.call_soon_threadsafe(callback, *args)
+
+
 def add_future(loop, future, callback, *args):
     future.add_done_callback(
         functools.partial(loop.call_soon_threadsafe, callback, *args))
@@ -121,6 +138,11 @@ def add_future(loop, future, callback, *args):
 coroutine = asyncio.coroutine
 
 
+def schedule_coroutine(loop, coro):
+    """Run a coroutine in the background, returning a Future."""
+    return ensure_future(coro, loop=loop)
+
+
 def pymongo_class_wrapper(f, pymongo_class):
     """Executes the coroutine f and wraps its result in a Motor class.
 
@@ -24,7 +24,7 @@ import os
 from concurrent.futures import ThreadPoolExecutor
 
 import tornado.process
-from tornado import concurrent, gen, ioloop
+from tornado import concurrent, gen, ioloop, queues
 
 from motor.motor_common import callback_type_error
 
@@ -49,6 +49,15 @@ def get_future(loop):
     return concurrent.Future()
 
 
+def get_queue(loop, maxsize=0):
+    return queues.Queue(maxsize=maxsize)
+
+
+def queue_put(loop, queue, item):
+    # Future that resolves once there's room for "item" in the queue.
+    return queue.put(item)
+
+
 if 'MOTOR_MAX_WORKERS' in os.environ:
     max_workers = int(os.environ['MOTOR_MAX_WORKERS'])
 else:
@@ -131,6 +140,15 @@ def call_soon(loop, callback, *args, **kwargs):
         loop.add_callback(callback)
 
 
+def call_later(loop, delay, callback, *args):
+    return loop.call_later(delay, callback, *args)
+
+
+def call_soon_threadsafe(loop, callback, *args):
+    # IOLoop.add_callback is safe to call from any thread.
+    loop.add_callback(callback, *args)
+
+
 def add_future(loop, future, callback, *args):
     loop.add_future(future, functools.partial(callback, *args))
 
@@ -162,6 +180,12 @@ def coroutine(f):
     return wrapper
 
 
+def schedule_coroutine(loop, coro):
+    """Run a coroutine in the background, returning a Future."""
+    # Tornado coroutines start running as soon as they're called.
+    return gen.convert_yielded(coro)
+
+
 def pymongo_class_wrapper(f, pymongo_class):
     """Executes the coroutine f and wraps its result in a Motor class.
 
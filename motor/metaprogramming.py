@@ -16,12 +16,13 @@ from __future__ import unicode_literals, absolute_import
 
 """Dynamic class-creation for Motor."""
 
+import copy
 import inspect
 import functools
 
 from pymongo.cursor import Cursor
 
-from . import motor_py3_compat
+from . import motor_cache, motor_py3_compat
 
 _class_cache = {}
 
@@ -62,6 +63,130 @@ def asynchronize(framework, sync_method, doc=None):
     return method
 
 
+def cached_read(framework, async_method, name):
+    """Decorate an asynchronized read to use the owner's query cache and
+    share identical reads that are in flight, if the owner enables them.
+    """
+    @functools.wraps(async_method)
+    def method(self, *args, **kwargs):
+        cache = self._query_cache
+        flights = self._single_flight
+        if cache is None and flights is None:
+            return async_method(self, *args, **kwargs)
+
+        loop = self.get_io_loop()
+        callback = kwargs.pop('callback', None)
+        key = motor_cache.query_key(self.delegate.full_name, name, args,
+                                    kwargs, self.delegate.read_preference,
+                                    self.delegate.codec_options)
+
+        future = framework.get_future(loop)
+        retval = framework.future_or_callback(future, callback, loop)
+        if key is None:
+            framework.add_future(loop,
+                                 async_method(self, *args, **kwargs),
+                                 _copy_future, future)
+            return retval
+
+        if cache is not None:
+            found, result = cache.get(key)
+            if found:
+                future.set_result(result)
+                return retval
+
+            future = cache.remember(framework, loop, key, future)
+
+        if flights is None:
+            framework.add_future(loop,
+                                 async_method(self, *args, **kwargs),
+                                 _copy_future, future)
+        elif key in flights:
+            # Wait for the identical read that's already running.
+            flights[key].append(future)
+        else:
+            waiters = flights[key] = [future]
+            framework.add_future(loop,
+                                 async_method(self, *args, **kwargs),
+                                 _land, flights, key, waiters)
+
+        return retval
+
+    return method
+
+
+def invalidating_write(framework, async_method):
+    """Decorate an asynchronized write to invalidate the owner's cache, and
+    keep later reads from joining reads that began before the write.
+    """
+    @functools.wraps(async_method)
+    def method(self, *args, **kwargs):
+        if self._query_cache is None:
+            invalidate_reads(framework, self)
+            return async_method(self, *args, **kwargs)
+
+        callback = kwargs.pop('callback', None)
+        future = invalidate_reads(
+            framework, self,
+            functools.partial(async_method, self, *args, **kwargs))
+
+        return framework.future_or_callback(future, callback,
+                                            self.get_io_loop())
+
+    return method
+
+
+def invalidate_reads(framework, collection, start_write=None):
+    """Invalidate a MotorCollection's query cache and in-flight reads for a
+    write.
+
+    If given, "start_write" starts the write and returns its Future, which
+    is returned; the cache is invalidated again when it resolves, since
+    results of reads that ran during the write are stale, too.
+    """
+    if collection._single_flight:
+        collection._single_flight.clear()
+
+    cache = collection._query_cache
+    namespace = collection.delegate.full_name
+    if cache is not None:
+        cache.invalidate(namespace)
+
+    if start_write is None:
+        return None
+
+    future = start_write()
+    if cache is not None:
+        framework.add_future(collection.get_io_loop(), future,
+                             lambda _: cache.invalidate(namespace))
+
+    return future
+
+
+def _land(flights, key, waiters, source):
+    # A write may have cleared "flights" and a new read taken our place.
+    if flights.get(key) is waiters:
+        del flights[key]
+
+    try:
+        result = source.result()
+    except Exception as exc:
+        for future in waiters:
+            future.set_exception(exc)
+    else:
+        # Each caller gets its own copy, the first gets the original.
+        for future in waiters[1:]:
+            future.set_result(copy.deepcopy(result))
+
+        waiters[0].set_result(result)
+
+
+def _copy_future(destination, source):
+    try:
+        destination.set_result(source.result())
+    except Exception as exc:
+        destination.set_exception(exc)
+
+
 _coro_token = object()
 
 
@@ -244,20 +369,39 @@ class Unwrap(WrapBase):
 
 
 class AsyncRead(Async):
-    def __init__(self, attr_name=None, doc=None):
+    def __init__(self, attr_name=None, doc=None, cached=False):
         """A descriptor that wraps a PyMongo read method like find_one() that
         returns a Future.
+
+        :Parameters:
+         - `cached`: If True, results may be served from the owner's
+           query cache, see MotorCollection.enable_cache
         """
         Async.__init__(self, attr_name=attr_name, doc=doc)
+        self.cached = cached
+
+    def create_attribute(self, cls, attr_name):
+        method = Async.create_attribute(self, cls, attr_name)
+        if self.cached:
+            return cached_read(cls._framework, method, attr_name)
+
+        return method
 
 
 class AsyncWrite(Async):
     def __init__(self, attr_name=None, doc=None):
         """A descriptor that wraps a PyMongo write method like update() that
         accepts getLastError options and returns a Future.
+
+        The write invalidates the owner's query cache, if any, when it starts
+        and when it completes.
         """
         Async.__init__(self, attr_name=attr_name, doc=doc)
 
+    def create_attribute(self, cls, attr_name):
+        method = Async.create_attribute(self, cls, attr_name)
+        return invalidating_write(cls._framework, method)
+
 
 class AsyncCommand(Async):
     def __init__(self, attr_name=None, doc=None):
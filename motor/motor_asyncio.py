@@ -48,6 +48,33 @@ AsyncIOMotorLatentCommandCursor = create_asyncio_class(
     core.AgnosticLatentCommandCursor)
 
 
+AsyncIOMotorPartitionedCursor = create_asyncio_class(
+    core.AgnosticPartitionedCursor)
+
+
+AsyncIOMotorMergedCursor = create_asyncio_class(
+    core.AgnosticMergedCursor)
+
+
+AsyncIOMotorLoader = create_asyncio_class(
+    core.AgnosticLoader)
+
+
+AsyncIOMotorBufferedWriter = create_asyncio_class(
+    core.AgnosticBufferedWriter)
+
+
+AsyncIOMotorCoalescingUpdater = create_asyncio_class(
+    core.AgnosticCoalescingUpdater)
+
+
+AsyncIOMotorBulkStream = create_asyncio_class(core.AgnosticBulkStream)
+
+
+AsyncIOMotorCursorReaper = create_asyncio_class(
+    core.AgnosticCursorReaper)
+
+
 AsyncIOMotorBulkOperationBuilder = create_asyncio_class(
     core.AgnosticBulkOperationBuilder)
 
@@ -0,0 +1,161 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, absolute_import
+
+"""Split bulk writes into chunks, encode them, and merge their results.
+
+split(), execute_chunk() and encode_batch() block; Motor runs them on its
+thread pool.
+"""
+
+import struct
+
+from bson import BSON
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo.bulk import _Bulk
+from pymongo.errors import BulkWriteError, InvalidOperation
+
+_COUNTS = ('nInserted', 'nUpserted', 'nMatched', 'nModified', 'nRemoved')
+
+
+def split(bulk, chunk_size=None):
+    """Split a PyMongo _Bulk into (offset, _Bulk) pairs.
+
+    Each chunk holds at most `chunk_size` operations, by default the
+    server's maximum write batch size, and `offset` is the index of its
+    first operation in `bulk`.
+    """
+    if not bulk.ops:
+        raise InvalidOperation('No operations to execute')
+
+    if bulk.executed:
+        raise InvalidOperation('Bulk operations can only be executed once.')
+
+    bulk.executed = True
+    if chunk_size is None:
+        chunk_size = bulk.collection.database.client.max_write_batch_size
+
+    chunks = []
+    for offset in range(0, len(bulk.ops), chunk_size):
+        chunk = _Bulk(bulk.collection, False, bulk.bypass_doc_val)
+        chunk.ops = bulk.ops[offset:offset + chunk_size]
+        chunk.uses_collation = bulk.uses_collation
+        chunks.append((offset, chunk))
+
+    return chunks
+
+
+def execute_chunk(chunk, write_concern):
+    """Execute a chunk, returning its raw result even if some writes failed.
+
+    Returns None if the write concern is unacknowledged.
+    """
+    try:
+        return chunk.execute(write_concern)
+    except BulkWriteError as exc:
+        return exc.details
+
+
+def encode_batch(documents, codec_options):
+    """Encode documents to RawBSONDocuments, which insert without re-encoding.
+
+    Like insert_many, adds an "_id" to documents that have none. Returns
+    (RawBSONDocuments, _ids).
+    """
+    encoded = []
+    ids = []
+    for document in documents:
+        if isinstance(document, RawBSONDocument):
+            document, _id = raw_with_id(document, codec_options)
+            ids.append(_id)
+            encoded.append(document)
+            continue
+
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+
+        ids.append(document['_id'])
+        encoded.append(RawBSONDocument(
+            BSON.encode(document, True, codec_options)))
+
+    return encoded, ids
+
+
+def empty_result():
+    """The raw bulk write result of no writes."""
+    full_result = {
+        'writeErrors': [],
+        'writeConcernErrors': [],
+        'upserted': [],
+    }
+
+    for key in _COUNTS:
+        full_result[key] = 0
+
+    return full_result
+
+
+def raw_with_id(document, codec_options):
+    """Return (RawBSONDocument, its _id), adding an ObjectId "_id" first if
+    the document has none, as insert_one does for a dict.
+    """
+    if '_id' in document:
+        return document, document['_id']
+
+    _id = ObjectId()
+    elements = BSON.encode({'_id': _id})[4:-1] + document.raw[4:-1]
+    raw = struct.pack('<i', len(elements) + 5) + elements + b'\x00'
+    return RawBSONDocument(raw, codec_options), _id
+
+
+def merge(results):
+    """Merge (offset, raw result) pairs into one raw bulk write result.
+
+    Indexes in write errors and upserted ids are made relative to the whole
+    bulk. Unacknowledged results are None, and are skipped. Returns None if
+    all the writes were unacknowledged.
+    """
+    if all(raw is None for _, raw in results):
+        return None
+
+    full_result = empty_result()
+    modified_reported = True
+    for offset, raw in results:
+        if raw is None:
+            continue
+
+        for key in _COUNTS:
+            full_result[key] += raw.get(key, 0)
+
+        # Legacy servers don't report nModified, so neither do we.
+        if 'nModified' not in raw:
+            modified_reported = False
+
+        for key in ('writeErrors', 'upserted'):
+            for doc in raw.get(key, []):
+                doc = dict(doc)
+                doc['index'] += offset
+                full_result[key].append(doc)
+
+        full_result['writeConcernErrors'].extend(
+            raw.get('writeConcernErrors', []))
+
+    if not modified_reported:
+        del full_result['nModified']
+
+    full_result['writeErrors'].sort(key=lambda error: error['index'])
+    full_result['upserted'].sort(key=lambda doc: doc['index'])
+    return full_result
@@ -0,0 +1,347 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, absolute_import
+
+"""Query result cache for Motor collections, and GridFS caches."""
+
+import collections
+import copy
+import numbers
+import time
+
+
+def freeze(value, numbers_equal=False):
+    """A hashable stand-in for a query, projection, sort, document key, etc.
+
+    Scalars are tagged with their types: True, 1 and 1.0 are equal in
+    Python but not in MongoDB, so they must have different keys. If
+    `numbers_equal` is True, numbers of any type but bool share a tag, so
+    1, 1.0 and Int64(1) have one key, as MongoDB compares them. Raises
+    TypeError if `value` contains an unhashable scalar.
+    """
+    if isinstance(value, dict):
+        return ('d', tuple((k, freeze(v, numbers_equal))
+                           for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return ('l', tuple(freeze(v, numbers_equal) for v in value))
+
+    hash(value)
+    if (numbers_equal and isinstance(value, numbers.Number)
+            and not isinstance(value, bool)):
+        return 'n', value
+
+    return type(value), value
+
+
+def query_key(namespace, name, args, kwargs, read_preference,
+              codec_options):
+    """Key for a read, or None if its arguments can't be hashed.
+
+    Reads with the same key return the same results, decoded the same way.
+    """
+    try:
+        return (namespace,
+                name,
+                freeze(args),
+                freeze(kwargs),
+                freeze(read_preference.document),
+                freeze(codec_options))
+    except TypeError:
+        # Unhashable: the query isn't cached.
+        return None
+
+
+class QueryCache(object):
+    """An LRU cache of query results with a time-to-live.
+
+    Create one with :meth:`MotorCollection.enable_cache`. Results are
+    copied in and out of the cache, so callers may modify them.
+
+    The attributes ``hits``, ``misses``, ``evictions`` and ``invalidations``
+    count cache activity since the cache was created.
+    """
+    def __init__(self, ttl=5, max_size=1000):
+        if ttl <= 0:
+            raise ValueError('ttl must be positive')
+
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        # Map key to (expiration time, result), least recently used first.
+        self._entries = collections.OrderedDict()
+
+        # Incremented by each write, so reads that began before a write
+        # don't store their results after it.
+        self._generations = collections.defaultdict(int)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return (True, copy of result) or (False, None)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            expires, result = entry
+            if expires > time.time():
+                # Most recently used.
+                self._entries[key] = entry
+                self.hits += 1
+                return True, copy.deepcopy(result)
+
+        self.misses += 1
+        return False, None
+
+    def remember(self, framework, loop, key, future):
+        """Cache the result that will resolve `future`.
+
+        Returns a Future for the caller to resolve instead of `future`.
+        """
+        generation = self._generations[key[0]]
+        pending = framework.get_future(loop)
+        framework.add_future(loop, pending, self._store, key, generation,
+                             future)
+
+        return pending
+
+    def _store(self, key, generation, future, pending):
+        try:
+            result = pending.result()
+        except Exception as exc:
+            future.set_exception(exc)
+            return
+
+        if self._generations[key[0]] == generation:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl,
+                                  copy.deepcopy(result))
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        future.set_result(result)
+
+    def invalidate(self, namespace):
+        """Discard the results for a namespace, like "db.collection"."""
+        self._generations[namespace] += 1
+        self.invalidations += 1
+        for key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[key]
+
+    def clear(self):
+        """Discard all results."""
+        for namespace in list(self._generations):
+            self._generations[namespace] += 1
+
+        self._entries.clear()
+
+
+class FileCache(object):
+    """A byte-bounded LRU cache of small GridFS files for the web handlers.
+
+    Pass one to :class:`~motor.web.GridFSHandler` or
+    :class:`~motor.aiohttp.AIOHTTPGridFS`. Files no larger than
+    `max_file_size` bytes are kept whole, keyed by the requested path, and
+    the least recently used are discarded when the cached contents exceed
+    `max_size` bytes.
+
+    A cached file is served without querying MongoDB for `revalidate_after`
+    seconds. After that the handler looks the file up again, and keeps
+    serving the cached contents if the file's ``upload_date`` and ``md5``
+    are unchanged, without reading its chunks.
+
+    The attributes ``hits``, ``misses``, ``revalidations`` and
+    ``evictions`` count cache activity, and ``size`` is the number of bytes
+    cached.
+    """
+    def __init__(self,
+                 max_size=64 * 1024 * 1024,
+                 max_file_size=256 * 1024,
+                 revalidate_after=60):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        if max_file_size < 0 or max_file_size > max_size:
+            raise ValueError('max_file_size must be between 0 and max_size')
+
+        if revalidate_after < 0:
+            raise ValueError('revalidate_after must be non-negative')
+
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+        self.revalidate_after = revalidate_after
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+        # Map key to (time validated, grid out, contents), least recently
+        # used first.
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return (grid out, contents, fresh), or None if key isn't cached.
+
+        If fresh is False, look up the file and pass it to :meth:`validate`
+        before serving the contents.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        # Most recently used.
+        self._entries[key] = entry
+        validated, gridout, data = entry
+        fresh = time.time() - validated < self.revalidate_after
+        if fresh:
+            self.hits += 1
+
+        return gridout, data, fresh
+
+    def validate(self, key, gridout):
+        """Return the cached contents if `gridout` is the version cached.
+
+        The entry is fresh again. If the file changed its entry is discarded
+        and None is returned.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        _, cached, data = entry
+        if (cached.upload_date == gridout.upload_date
+                and cached.md5 == gridout.md5):
+            self._entries[key] = (time.time(), gridout, data)
+            self.revalidations += 1
+            return data
+
+        self.discard(key)
+        return None
+
+    def cacheable(self, gridout):
+        """True if the file is small enough to cache."""
+        return gridout.length <= self.max_file_size
+
+    def put(self, key, gridout, data):
+        """Cache a file's contents, discarding old entries if needed."""
+        self.discard(key)
+        if len(data) > self.max_file_size:
+            return
+
+        self._entries[key] = (time.time(), gridout, data)
+        self.size += len(data)
+        while self.size > self.max_size:
+            _, (_, _, old) = self._entries.popitem(last=False)
+            self.size -= len(old)
+            self.evictions += 1
+
+    def discard(self, key):
+        """Remove key from the cache, if it is cached."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+    def clear(self):
+        """Discard all files."""
+        self._entries.clear()
+        self.size = 0
+
+
+class MetadataCache(object):
+    """An LRU cache of GridFS file documents with a time-to-live.
+
+    Pass one to :class:`~motor.web.GridFSHandler` or
+    :class:`~motor.aiohttp.AIOHTTPGridFS`. A file's document, with its
+    ``_id``, length, chunk size, content type, upload date and MD5, is kept
+    for `ttl` seconds, keyed by the requested path, so conditional requests
+    and HEAD requests are answered without querying MongoDB. Paths with no
+    file are remembered for `negative_ttl` seconds, so repeated requests for
+    a missing file don't each query MongoDB; pass 0 to disable this.
+
+    A file replaced or deleted in GridFS may be served from its old
+    document until its entry expires. The attributes ``hits``, ``misses``
+    and ``evictions`` count cache activity.
+    """
+    def __init__(self, ttl=10, negative_ttl=1, max_size=10000):
+        if ttl <= 0:
+            raise ValueError('ttl must be positive')
+
+        if negative_ttl < 0:
+            raise ValueError('negative_ttl must be non-negative')
+
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Map key to (expiration time, file document or None), least
+        # recently used first.
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return (True, file document), (True, None) if the file is known
+        to be missing, or (False, None).
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            expires, document = entry
+            if expires > time.time():
+                # Most recently used.
+                self._entries[key] = entry
+                self.hits += 1
+                return True, document
+
+        self.misses += 1
+        return False, None
+
+    def put(self, key, document):
+        """Cache a file document, or None if there is no file for key."""
+        self._entries.pop(key, None)
+        ttl = self.ttl if document is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.time() + ttl, document)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key):
+        """Remove key from the cache, if it is cached."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Discard all entries."""
+        self._entries.clear()
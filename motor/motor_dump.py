@@ -0,0 +1,280 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, absolute_import
+
+"""Copy collections to and from BSON or JSON Lines files.
+
+These functions block; Motor runs them on its thread pool.
+"""
+
+import mmap
+import struct
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bson import BSON, json_util
+from bson.raw_bson import RawBSONDocument
+
+from .motor_py3_compat import string_types
+
+FORMATS = ('bson', 'jsonl')
+
+# Documents per write() and per progress report.
+_CHUNK_DOCUMENTS = 1000
+
+
+def _encode_bson(doc):
+    # A RawBSONDocument is never decoded, its bytes are written as-is.
+    return doc.raw
+
+
+def _encode_jsonl(doc):
+    return (json_util.dumps(doc) + '\n').encode('utf-8')
+
+
+class _Progress(object):
+    """Totals shared by the threads writing one file."""
+    def __init__(self, report):
+        self.report = report
+        self.documents = 0
+        self.bytes = 0
+        self.start = time.time()
+        self.lock = threading.Lock()
+
+    def write(self, fileobj, chunk):
+        data = b''.join(chunk)
+        with self.lock:
+            fileobj.write(data)
+            self.documents += len(chunk)
+            self.bytes += len(data)
+            if self.report:
+                elapsed = time.time() - self.start
+                rate = self.bytes / elapsed if elapsed else 0.0
+                self.report(self.documents, self.bytes, rate)
+
+
+def _copy(cursor, fileobj, encode, progress):
+    chunk = []
+    for doc in cursor:
+        chunk.append(encode(doc))
+        if len(chunk) == _CHUNK_DOCUMENTS:
+            progress.write(fileobj, chunk)
+            chunk = []
+
+    if chunk:
+        progress.write(fileobj, chunk)
+
+
+def _copy_parallel(cursors, fileobj, encode, progress):
+    errors = []
+
+    def run(cursor):
+        try:
+            _copy(cursor, fileobj, encode, progress)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(cursor, ))
+               for cursor in cursors]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def export_collection(collection, file, format, filter, projection,
+                      batch_size, parallel, report):
+    """Write a PyMongo Collection's documents to a path or binary file object.
+
+    Returns the number of documents written. ``report``, if not None, is
+    called on this thread with (documents, bytes, bytes per second) after
+    each chunk is written.
+    """
+    if format == 'bson':
+        codec_options = collection.codec_options._replace(
+            document_class=RawBSONDocument)
+
+        collection = collection.with_options(codec_options=codec_options)
+        encode = _encode_bson
+    else:
+        encode = _encode_jsonl
+
+    if isinstance(file, string_types):
+        fileobj = open(file, 'wb')
+    else:
+        fileobj = file
+
+    progress = _Progress(report)
+    try:
+        if parallel:
+            cursors = collection.parallel_scan(parallel)
+            if batch_size:
+                for cursor in cursors:
+                    cursor.batch_size(batch_size)
+
+            # One thread per server cursor, each writes whole chunks.
+            _copy_parallel(cursors, fileobj, encode, progress)
+        else:
+            cursor = collection.find(filter, projection)
+            if batch_size:
+                cursor.batch_size(batch_size)
+
+            _copy(cursor, fileobj, encode, progress)
+    finally:
+        if fileobj is not file:
+            fileobj.close()
+
+    return progress.documents
+
+
+def _bson_documents(data):
+    """Yield (RawBSONDocument, size) for each document in a buffer."""
+    position = 0
+    end = len(data)
+    while position < end:
+        size = struct.unpack_from('<i', data, position)[0]
+        if size < 5 or position + size > end:
+            raise ValueError('Invalid BSON document at offset %d' % position)
+
+        yield RawBSONDocument(data[position:position + size]), size
+        position += size
+
+
+def _jsonl_documents(data):
+    """Yield (document, BSON size) for each line of a buffer."""
+    for line in iter(data.readline, b''):
+        if line.strip():
+            # The JSON text's length can be far from the size sent, e.g. for
+            # dates or binary, so batches are limited by the encoded size.
+            doc = json_util.loads(line.decode('utf-8'))
+            yield doc, len(BSON.encode(doc))
+
+
+def _batches(documents, max_bytes, max_count):
+    batch = []
+    batch_bytes = 0
+    for doc, size in documents:
+        if batch and (batch_bytes + size > max_bytes
+                      or len(batch) == max_count):
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append(doc)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def import_collection(collection, file, format, batch_bytes, concurrency,
+                      report):
+    """Insert the documents from a file into a PyMongo Collection.
+
+    The file is memory-mapped and split into batches no larger than the
+    server's maximum message size and write batch size. Up to
+    ``concurrency`` unordered insert_many calls run at once; a failed batch
+    is recorded and the rest of the file is still loaded.
+    """
+    client = collection.database.client
+    max_bytes = client.max_message_size
+    if batch_bytes:
+        max_bytes = min(batch_bytes, max_bytes)
+
+    max_count = client.max_write_batch_size
+    progress = _ImportProgress(report)
+
+    with open(file, 'rb') as fileobj:
+        fileobj.seek(0, 2)
+        if not fileobj.tell():
+            return progress.result()
+
+        data = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if format == 'bson':
+                documents = _bson_documents(data)
+            else:
+                documents = _jsonl_documents(data)
+
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+            try:
+                _insert_batches(collection, executor, concurrency, progress,
+                                _batches(documents, max_bytes, max_count))
+            finally:
+                executor.shutdown()
+        finally:
+            data.close()
+
+    return progress.result()
+
+
+def _insert_batches(collection, executor, concurrency, progress, batches):
+    pending = set()
+    offset = 0
+    for i, batch in enumerate(batches):
+        if len(pending) == concurrency:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        pending.add(executor.submit(
+            _insert_batch, collection, i, offset, batch, progress))
+
+        offset += len(batch)
+
+    wait(pending)
+
+
+def _insert_batch(collection, index, offset, batch, progress):
+    try:
+        collection.insert_many(batch, ordered=False)
+    except Exception as exc:
+        # With ordered=False every document but the failed ones is inserted.
+        details = getattr(exc, 'details', None) or {}
+        inserted = details.get('nInserted', 0)
+        progress.add(inserted, {'batch': index,
+                                'offset': offset,
+                                'error': exc})
+    else:
+        progress.add(len(batch), None)
+
+
+class _ImportProgress(object):
+    def __init__(self, report):
+        self.report = report
+        self.inserted = 0
+        self.batches = 0
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def add(self, inserted, error):
+        with self.lock:
+            self.inserted += inserted
+            self.batches += 1
+            if error:
+                self.errors.append(error)
+
+            if self.report:
+                self.report(self.inserted, self.batches, len(self.errors))
+
+    def result(self):
+        return {'nInserted': self.inserted,
+                'nBatches': self.batches,
+                'errors': self.errors}
@@ -16,12 +16,17 @@ from __future__ import unicode_literals, absolute_import
 
 """GridFS implementation for Motor, an asynchronous driver for MongoDB."""
 
+import collections
+import functools
+import numbers
 import textwrap
 
 import gridfs
 import pymongo
 import pymongo.errors
+from bson.binary import Binary
 from gridfs import grid_file
+from gridfs.errors import CorruptGridFile, FileExists
 
 from motor.core import (AgnosticBaseCursor,
                         AgnosticCollection,
@@ -29,6 +34,7 @@ from motor.core import (AgnosticBaseCursor,
                         PY35,
                         PY352)
 from motor.docstrings import *
+from motor.motor_py3_compat import PY3, text_type
 from motor.metaprogramming import (AsyncCommand,
                                    AsyncRead,
                                    coroutine_annotation,
@@ -39,6 +45,19 @@ from motor.metaprogramming import (AsyncCommand,
                                    ReadOnlyProperty)
 
 
+# A batch of chunks from MotorGridOut.stream_chunks fills a server reply.
+_STREAM_BATCH_BYTES = 16 * 1024 * 1024
+
+
+if PY3:
+    def _view(data, start, stop):
+        # bytes.join copies from memoryviews without slicing first.
+        return memoryview(data)[start:stop]
+else:
+    def _view(data, start, stop):
+        return data[start:stop]
+
+
 class AgnosticGridOutCursor(AgnosticBaseCursor):
     __motor_class_name__ = 'MotorGridOutCursor'
     __delegate_class__ = gridfs.GridOutCursor
@@ -111,6 +130,91 @@ class AgnosticGridOutCursor(AgnosticBaseCursor):
         yield self._framework.yieldable(self._Cursor__die())
 
 
+class _ReadAhead(object):
+    """Fetch a GridFS file's chunks with up to `depth` queries in flight.
+
+    get(n) returns a Future resolving to chunk n's document, or None if it's
+    missing. Chunks are requested in order, starting over after a seek.
+    """
+    def __init__(self, chunks, files_id, n_chunks, depth):
+        self.chunks = chunks
+        self.files_id = files_id
+        self.n_chunks = n_chunks
+        self.depth = depth
+
+        # Map chunk number to a Future for its document.
+        self.pending = {}
+        self.next_n = None
+        self.next_request = 0
+
+    def get(self, n):
+        if n != self.next_n:
+            # Abandon chunks fetched for the old position.
+            self.pending.clear()
+            self.next_request = n
+
+        self.next_n = n + 1
+        self._fill()
+        future = self.pending.pop(n)
+        self._fill()
+        return future
+
+    def _fill(self):
+        while (len(self.pending) < self.depth
+               and self.next_request < self.n_chunks):
+            self.pending[self.next_request] = self.chunks.find_one(
+                {'files_id': self.files_id, 'n': self.next_request})
+
+            self.next_request += 1
+
+
+class _ChunkCursor(object):
+    """Fetch a GridFS file's chunks in order with one cursor.
+
+    get(n) returns a Future resolving to chunk n's document, or None if it's
+    missing. A new cursor is opened after a seek.
+    """
+    def __init__(self, framework, loop, chunks, files_id, batch_size):
+        self.framework = framework
+        self.loop = loop
+        self.chunks = chunks
+        self.files_id = files_id
+        self.batch_size = batch_size
+        self.cursor = None
+        self.next_n = None
+
+    def get(self, n):
+        if n != self.next_n:
+            if self.cursor is not None:
+                self.cursor.close()
+
+            self.cursor = self.chunks.find(
+                {'files_id': self.files_id, 'n': {'$gte': n}}
+            ).sort('n').batch_size(self.batch_size)
+
+        self.next_n = n + 1
+        future = self.framework.get_future(self.loop)
+        self.framework.add_future(self.loop, self.cursor.fetch_next,
+                                  self._on_fetch, n, future)
+
+        return future
+
+    def _on_fetch(self, n, future, fetch_future):
+        try:
+            chunk = None
+            if fetch_future.result():
+                chunk = self.cursor.next_object()
+        except Exception as exc:
+            future.set_exception(exc)
+            return
+
+        if chunk is not None and chunk['n'] != n:
+            # Chunk n is missing.
+            chunk = None
+
+        future.set_result(chunk)
+
+
 class MotorGridOutProperty(ReadOnlyProperty):
     """Creates a readonly attribute on the wrapped PyMongo GridOut."""
     def create_attribute(self, cls, attr_name):
@@ -152,13 +256,19 @@ class AgnosticGridOut(object):
     md5          = MotorGridOutProperty()
     metadata     = MotorGridOutProperty()
     name         = MotorGridOutProperty()
-    read         = AsyncRead()
-    readchunk    = AsyncRead()
+    _read        = AsyncRead(attr_name='read')
+    _readchunk   = AsyncRead(attr_name='readchunk')
     readline     = AsyncRead()
     seek         = DelegateMethod()
     tell         = DelegateMethod()
     upload_date  = MotorGridOutProperty()
 
+    # Makes the chunk source on the first read, see read_ahead.
+    _source_factory = None
+
+    #: How many recently read chunks :meth:`read_range` keeps.
+    chunk_cache_size = 8
+
     def __init__(
         self,
         root_collection,
@@ -183,6 +293,16 @@ class AgnosticGridOut(object):
                 file_document)
 
         self.io_loop = root_collection.get_io_loop()
+        self.root_collection = root_collection
+
+        # Fetches chunks ahead of the position, see read_ahead.
+        self._chunk_source = None
+
+        # (chunk number, data) of the last chunk the source returned.
+        self._current_chunk = None
+
+        # Map chunk number to data, least recently used first.
+        self._chunk_cache = collections.OrderedDict()
 
     # python.org/dev/peps/pep-0492/#api-design-and-implementation-revisions
     if PY352:
@@ -239,6 +359,326 @@ class AgnosticGridOut(object):
     def get_io_loop(self):
         return self.io_loop
 
+    def read_ahead(self, depth=4, max_buffer_size=None):
+        """Fetch chunks concurrently ahead of the read position.
+
+        Normally each :meth:`read` or :meth:`readchunk` fetches the chunks
+        it needs one query at a time. After calling this method, up to
+        `depth` chunk queries are in flight at once, ahead of the position,
+        and chunks are returned in order. This applies to :meth:`read`,
+        :meth:`readchunk`, ``async for`` and :meth:`stream_to_handler`::
+
+          gridout = yield fs.open_download_stream(file_id)
+          gridout.read_ahead(8)
+          yield gridout.stream_to_handler(self)
+
+        At most `depth` chunks are buffered. Pass `max_buffer_size` to bound
+        the buffered bytes instead; `depth` is reduced to fit, but is at
+        least one. After :meth:`seek`, chunks are fetched from the new
+        position. Replaces :meth:`stream_chunks`, if it was called.
+
+        Returns this MotorGridOut.
+        """
+        if not isinstance(depth, numbers.Integral) or depth < 1:
+            raise ValueError('depth must be a positive int')
+
+        if max_buffer_size is not None and max_buffer_size < 1:
+            raise ValueError('max_buffer_size must be positive')
+
+        self._source_factory = functools.partial(
+            self._make_read_ahead, depth, max_buffer_size)
+        self._chunk_source = None
+        self._current_chunk = None
+        return self
+
+    def stream_chunks(self, batch_size=None):
+        """Read chunks with one cursor instead of one query per chunk.
+
+        After calling this method, :meth:`read`, :meth:`readchunk`, ``async
+        for`` and :meth:`stream_to_handler` are fed by a single cursor over
+        the chunks from the read position on, sorted by chunk number, so a
+        sequential download costs a few getMores instead of a round trip
+        per chunk. After :meth:`seek`, a new cursor is opened.
+
+        `batch_size` is the number of chunks per batch; by default as many
+        as fit in 16MB. Replaces :meth:`read_ahead`, if it was called.
+
+        Returns this MotorGridOut.
+        """
+        if batch_size is not None and (
+                not isinstance(batch_size, numbers.Integral)
+                or batch_size < 1):
+            raise ValueError('batch_size must be a positive int')
+
+        self._source_factory = functools.partial(self._make_chunk_cursor,
+                                                 batch_size)
+        self._chunk_source = None
+        self._current_chunk = None
+        return self
+
+    def _make_chunk_cursor(self, batch_size):
+        if batch_size is None:
+            batch_size = max(1, _STREAM_BATCH_BYTES //
+                             int(self.delegate.chunk_size))
+
+        return _ChunkCursor(self._framework, self.get_io_loop(),
+                            self.root_collection.chunks, self.delegate._id,
+                            batch_size)
+
+    def _make_read_ahead(self, depth, max_buffer_size):
+        chunk_size = int(self.delegate.chunk_size)
+        if max_buffer_size is not None:
+            depth = max(1, min(depth, max_buffer_size // chunk_size))
+
+        n_chunks = -(-int(self.delegate.length) // chunk_size)
+        return _ReadAhead(self.root_collection.chunks, self.delegate._id,
+                          n_chunks, depth)
+
+    @coroutine_annotation
+    def read(self, size=-1, callback=None):
+        """Read at most `size` bytes from the file (less if there
+        isn't enough data).
+
+        The bytes are returned as an instance of :class:`str` (:class:`bytes`
+        in python 3). If `size` is negative or omitted all data is read.
+
+        :Parameters:
+          - `size` (optional): the number of bytes to read
+          - `callback` (optional): function taking (data, error)
+        """
+        if self._source_factory is None:
+            return self._read(size, callback=callback)
+
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        retval = self._framework.future_or_callback(future, callback, loop)
+        self._with_file(self._read_pieces, size, [], 0, future)
+        return retval
+
+    @coroutine_annotation
+    def readchunk(self, callback=None):
+        """Reads a chunk at a time. If the current position is within a
+        chunk the remainder of the chunk is returned.
+
+        :Parameters:
+          - `callback` (optional): function taking (data, error)
+        """
+        if self._source_factory is None:
+            return self._readchunk(callback=callback)
+
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        retval = self._framework.future_or_callback(future, callback, loop)
+        self._with_file(self._read_piece, None, future)
+        return retval
+
+    def _with_file(self, fn, *args):
+        # Call fn(*args) once the file document is loaded.
+        future = args[-1]
+        if self.delegate._file:
+            fn(*args)
+            return
+
+        def opened(ensure_future):
+            try:
+                ensure_future.result()
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                fn(*args)
+
+        self._framework.add_future(self.get_io_loop(),
+                                   self._ensure_file(),
+                                   opened)
+
+    def _read_pieces(self, size, pieces, received, future):
+        # Read "size" bytes, or to the end, one chunk at a time. The pieces
+        # are joined once at the end, and "received" is their total length.
+        remainder = int(self.delegate.length) - self.delegate.tell()
+        if size < 0 or size - received > remainder:
+            size = received + remainder
+
+        if received >= size:
+            future.set_result(b''.join(pieces))
+            return
+
+        piece_future = self._framework.get_future(self.get_io_loop())
+
+        def got_piece(_):
+            try:
+                piece = piece_future.result()
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                pieces.append(piece)
+                self._read_pieces(size, pieces, received + len(piece),
+                                  future)
+
+        self._framework.add_future(self.get_io_loop(), piece_future, got_piece)
+        self._read_piece(size - received, piece_future)
+
+    def _read_piece(self, max_size, future):
+        # Read from the position to the end of its chunk, or max_size bytes.
+        delegate = self.delegate
+        position = delegate.tell()
+        buffered = delegate._GridOut__buffer
+        if buffered:
+            # Left over from a read before read-ahead was enabled.
+            delegate._GridOut__buffer = b''
+            if max_size is not None and len(buffered) > max_size:
+                delegate._GridOut__buffer = buffered[max_size:]
+                buffered = buffered[:max_size]
+
+            delegate._GridOut__position = position + len(buffered)
+            future.set_result(buffered)
+            return
+
+        if position >= int(delegate.length):
+            future.set_result(b'')
+            return
+
+        chunk_size = int(delegate.chunk_size)
+        n = position // chunk_size
+        if self._current_chunk and self._current_chunk[0] == n:
+            self._slice_chunk(self._current_chunk[1], max_size, future)
+            return
+
+        if self._chunk_source is None:
+            self._chunk_source = self._source_factory()
+
+        def got_chunk(chunk_future):
+            try:
+                chunk = chunk_future.result()
+            except Exception as exc:
+                future.set_exception(exc)
+                return
+
+            if not chunk:
+                future.set_exception(CorruptGridFile("no chunk #%d" % n))
+                return
+
+            self._current_chunk = (n, chunk['data'])
+            self._slice_chunk(chunk['data'], max_size, future)
+
+        self._framework.add_future(self.get_io_loop(),
+                                   self._chunk_source.get(n),
+                                   got_chunk)
+
+    def _slice_chunk(self, data, max_size, future):
+        delegate = self.delegate
+        position = delegate.tell()
+        start = position % int(delegate.chunk_size)
+        end = len(data) if max_size is None else start + max_size
+        piece = bytes(data[start:end])
+        if not piece:
+            future.set_exception(CorruptGridFile("truncated chunk"))
+            return
+
+        delegate._GridOut__position = position + len(piece)
+        future.set_result(piece)
+
+    @coroutine_annotation
+    def read_range(self, offset, length, callback=None):
+        """Read `length` bytes starting at `offset`, or fewer at the end.
+
+        Unlike :meth:`seek` and :meth:`read`, doesn't change the position,
+        and fetches exactly the chunks that cover the range with one query.
+        The last :attr:`chunk_cache_size` chunks read are kept, so small
+        reads near each other, such as reading a file's index, are served
+        without a query.
+
+        :Parameters:
+          - `offset`: the position of the first byte to read
+          - `length`: the number of bytes to read
+          - `callback` (optional): function taking (data, error)
+        """
+        if offset < 0 or length < 0:
+            raise ValueError('offset and length must be non-negative')
+
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        retval = self._framework.future_or_callback(future, callback, loop)
+        self._with_file(self._read_range, offset, length, future)
+        return retval
+
+    def _read_range(self, offset, length, future):
+        end = min(offset + length, int(self.delegate.length))
+        if offset >= end:
+            future.set_result(b'')
+            return
+
+        chunk_size = int(self.delegate.chunk_size)
+        numbers = range(offset // chunk_size, (end - 1) // chunk_size + 1)
+        chunks = {}
+        missing = []
+        for n in numbers:
+            data = self._chunk_cache.pop(n, None)
+            if data is None:
+                missing.append(n)
+            else:
+                # Most recently used.
+                self._chunk_cache[n] = chunks[n] = data
+
+        self._trim_chunk_cache()
+        if not missing:
+            self._join_range(offset, end, numbers, chunks, future)
+            return
+
+        if missing[-1] - missing[0] + 1 == len(missing):
+            n_filter = {'$gte': missing[0], '$lte': missing[-1]}
+        else:
+            n_filter = {'$in': missing}
+
+        cursor = self.root_collection.chunks.find(
+            {'files_id': self.delegate._id, 'n': n_filter})
+
+        def got_chunks(to_list_future):
+            try:
+                docs = to_list_future.result()
+            except Exception as exc:
+                future.set_exception(exc)
+                return
+
+            for doc in docs:
+                chunks[doc['n']] = doc['data']
+
+            for n in missing:
+                if n not in chunks:
+                    future.set_exception(CorruptGridFile("no chunk #%d" % n))
+                    return
+
+                self._cache_chunk(n, chunks[n])
+
+            self._join_range(offset, end, numbers, chunks, future)
+
+        self._framework.add_future(self.get_io_loop(),
+                                   cursor.to_list(None),
+                                   got_chunks)
+
+    def _cache_chunk(self, n, data):
+        self._chunk_cache.pop(n, None)
+        self._chunk_cache[n] = data
+        self._trim_chunk_cache()
+
+    def _trim_chunk_cache(self):
+        while len(self._chunk_cache) > self.chunk_cache_size:
+            self._chunk_cache.popitem(last=False)
+
+    def _join_range(self, offset, end, numbers, chunks, future):
+        chunk_size = int(self.delegate.chunk_size)
+        views = []
+        for n in numbers:
+            data = chunks[n]
+            start = max(offset - n * chunk_size, 0)
+            stop = min(end - n * chunk_size, len(data))
+            views.append(_view(data, start, stop))
+
+        data = b''.join(views)
+        if len(data) != end - offset:
+            future.set_exception(CorruptGridFile("truncated chunk"))
+        else:
+            future.set_result(data)
+
     @motor_coroutine
     def stream_to_handler(self, request_handler):
         """Write the contents of this file to a
@@ -282,16 +722,164 @@ class AgnosticGridOut(object):
             written += len(chunk)
 
 
+def _ensure_indexes(grid_in):
+    # Runs on Motor's thread pool, like GridIn's first write.
+    grid_in._GridIn__ensure_indexes()
+
+
+def _read_source(source, size):
+    # Runs on Motor's thread pool.
+    return source.read(size)
+
+
+class _ParallelUpload(object):
+    """Insert a GridIn's chunks in batches, with several batches in flight.
+
+    Whole chunks are inserted with insert_many. The last, partial chunk is
+    left in the PyMongo GridIn's buffer, and the GridIn's own close() writes
+    it and then the files document, once all batches are inserted.
+    """
+    def __init__(self, framework, loop, grid_in, batch_chunks, max_in_flight):
+        self.framework = framework
+        self.loop = loop
+        self.delegate = grid_in.delegate
+        self.chunks = grid_in.root_collection.chunks
+        self.chunk_size = int(self.delegate.chunk_size)
+        self.batch_bytes = self.chunk_size * batch_chunks
+        self.max_in_flight = max_in_flight
+        self.buffer = bytearray()
+        self.in_flight = 0
+        self.error = None
+        self.closed = False
+
+        # Writers waiting for a batch to finish, and futures resolved when
+        # none are in flight: close() and abort() may both be waiting.
+        self.waiters = collections.deque()
+        self.drained = []
+
+        # GridIn creates the files and chunks indexes before its first chunk.
+        self.indexes = framework.run_on_executor(
+            loop, _ensure_indexes, self.delegate)
+
+    def write(self, data, future):
+        if self.closed:
+            future.set_exception(ValueError("cannot write to a closed file"))
+            return
+
+        if self.error is not None:
+            future.set_exception(self.error)
+            return
+
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.batch_bytes:
+            self._send(self.buffer[:self.batch_bytes])
+            del self.buffer[:self.batch_bytes]
+
+        if self.in_flight < self.max_in_flight:
+            future.set_result(None)
+        else:
+            self.waiters.append(future)
+
+    def drain(self, future, flush=True):
+        """Wait for all batches, after sending data left in the buffer."""
+        self.closed = True
+        if not flush:
+            self.buffer = bytearray()
+
+        whole = len(self.buffer) - len(self.buffer) % self.chunk_size
+        if whole:
+            self._send(self.buffer[:whole])
+            del self.buffer[:whole]
+
+        if self.buffer:
+            # GridIn.close() updates the MD5 and inserts the last chunk.
+            self.delegate._buffer.write(bytes(self.buffer))
+            self.buffer = bytearray()
+
+        self.drained.append(future)
+        self._check_drained()
+
+    def _send(self, data):
+        delegate = self.delegate
+        delegate._file['md5'].update(bytes(data))
+        docs = []
+        for start in range(0, len(data), self.chunk_size):
+            piece = bytes(data[start:start + self.chunk_size])
+            docs.append({'files_id': delegate._file['_id'],
+                         'n': delegate._chunk_number,
+                         'data': Binary(piece)})
+
+            delegate._chunk_number += 1
+            delegate._position += len(piece)
+
+        self.in_flight += 1
+        self.framework.add_future(self.loop, self.indexes, self._insert, docs)
+
+    def _insert(self, docs, indexes_future):
+        if self.error is not None:
+            self._on_inserted(None)
+            return
+
+        try:
+            indexes_future.result()
+        except Exception as exc:
+            self._on_inserted(None, exc)
+            return
+
+        self.framework.add_future(self.loop,
+                                  self.chunks.insert_many(docs,
+                                                          ordered=False),
+                                  self._on_inserted)
+
+    def _on_inserted(self, insert_future, error=None):
+        self.in_flight -= 1
+        if error is None and insert_future is not None:
+            try:
+                insert_future.result()
+            except pymongo.errors.BulkWriteError as exc:
+                error = exc
+                if any(e.get('code') == 11000
+                       for e in exc.details.get('writeErrors', [])):
+                    error = FileExists("file with _id %r already exists" %
+                                       self.delegate._file['_id'])
+            except Exception as exc:
+                error = exc
+
+        if error is not None and self.error is None:
+            self.error = error
+
+        while self.waiters and (self.in_flight < self.max_in_flight
+                                or self.error is not None):
+            waiter = self.waiters.popleft()
+            if self.error is not None:
+                waiter.set_exception(self.error)
+            else:
+                waiter.set_result(None)
+
+        self._check_drained()
+
+    def _check_drained(self):
+        if not self.drained or self.in_flight:
+            return
+
+        drained, self.drained = self.drained, []
+        for future in drained:
+            if self.error is not None:
+                future.set_exception(self.error)
+            else:
+                future.set_result(None)
+
+
 class AgnosticGridIn(object):
     __motor_class_name__ = 'MotorGridIn'
     __delegate_class__ = gridfs.GridIn
 
     __getattr__  = DelegateMethod()
-    abort        = AsyncCommand()
+    _abort       = AsyncCommand(attr_name='abort')
     closed       = ReadOnlyProperty()
-    close        = AsyncCommand()
-    write        = AsyncCommand().unwrap('MotorGridOut')
-    writelines   = AsyncCommand().unwrap('MotorGridOut')
+    _close       = AsyncCommand(attr_name='close')
+    _write       = AsyncCommand(attr_name='write').unwrap('MotorGridOut')
+    _writelines  = AsyncCommand(attr_name='writelines').unwrap('MotorGridOut')
     _id          = ReadOnlyProperty()
     md5          = ReadOnlyProperty()
     filename     = ReadOnlyProperty()
@@ -362,6 +950,7 @@ Metadata set on the file appears as attributes on a
                 "MotorCollection, not %r" % root_collection)
 
         self.io_loop = root_collection.get_io_loop()
+        self.root_collection = root_collection
         if delegate:
             # Short cut.
             self.delegate = delegate
@@ -370,6 +959,11 @@ Metadata set on the file appears as attributes on a
                 root_collection.delegate,
                 **kwargs)
 
+        # Inserts batches of chunks concurrently, see parallel_upload, and
+        # the Future of a close() waiting for it.
+        self._uploader = None
+        self._closing = None
+
     if PY35:
         # Support "async with fs.new_file() as f:"
         exec(textwrap.dedent("""
@@ -383,6 +977,155 @@ Metadata set on the file appears as attributes on a
     def get_io_loop(self):
         return self.io_loop
 
+    def parallel_upload(self, batch_chunks=8, max_in_flight=4):
+        """Insert chunks in batches, with several batches in flight.
+
+        Call before the first write. Each batch of `batch_chunks` chunks is
+        inserted with one ``insert_many``, and up to `max_in_flight` batches
+        are inserted at once; :meth:`write` waits while that many are in
+        flight. :meth:`close` inserts the files document after all chunks.
+        If a write fails, call :meth:`abort` to delete the chunks inserted.
+
+        In this mode :meth:`write` accepts bytes, or text if the file has an
+        ``encoding``, but not file-like objects. Returns this MotorGridIn.
+
+        :Parameters:
+          - `batch_chunks` (optional): chunks per ``insert_many``
+          - `max_in_flight` (optional): batches inserted concurrently
+        """
+        if batch_chunks < 1 or max_in_flight < 1:
+            raise ValueError('batch_chunks and max_in_flight must be '
+                             'at least 1')
+
+        delegate = self.delegate
+        if delegate.closed or delegate._position or delegate._buffer.tell():
+            raise pymongo.errors.InvalidOperation(
+                'parallel_upload must be called before the first write')
+
+        self._uploader = _ParallelUpload(self._framework,
+                                         self.get_io_loop(),
+                                         self,
+                                         batch_chunks,
+                                         max_in_flight)
+        return self
+
+    @coroutine_annotation
+    def write(self, data, callback=None):
+        """Write data to the file.
+
+        `data` can be bytes, a file-like object, or text if the file has an
+        ``encoding``. Data is buffered, and may not be inserted until
+        :meth:`close`. See :meth:`parallel_upload`.
+
+        :Parameters:
+          - `data`: bytes, text or a file-like object to write
+          - `callback` (optional): function taking (None, error)
+        """
+        if self._uploader is None:
+            return self._write(data, callback=callback)
+
+        return self._write_parallel([data], callback)
+
+    @coroutine_annotation
+    def writelines(self, sequence, callback=None):
+        """Write a sequence of strings to the file, without separators.
+
+        :Parameters:
+          - `sequence`: an iterable of bytes or text
+          - `callback` (optional): function taking (None, error)
+        """
+        if self._uploader is None:
+            return self._writelines(sequence, callback=callback)
+
+        return self._write_parallel(sequence, callback)
+
+    @coroutine_annotation
+    def close(self, callback=None):
+        """Flush the file and close it.
+
+        A closed file cannot be written any more. Calling :meth:`close` more
+        than once is allowed.
+
+        :Parameters:
+          - `callback` (optional): function taking (None, error)
+        """
+        if self._uploader is None or self.delegate.closed:
+            return self._close(callback=callback)
+
+        if self._closing is None:
+            # Later calls share this close, rather than closing twice.
+            self._closing = self._after_drain(self._close, None)
+
+        return self._framework.future_or_callback(self._closing, callback,
+                                                  self.get_io_loop())
+
+    @coroutine_annotation
+    def abort(self, callback=None):
+        """Remove all chunks and the files document, and close the file.
+
+        After :meth:`parallel_upload`, waits for batches in flight first, so
+        no chunk is inserted after the others are removed.
+
+        :Parameters:
+          - `callback` (optional): function taking (None, error)
+        """
+        if self._uploader is None:
+            return self._abort(callback=callback)
+
+        return self._after_drain(self._abort, callback, abort=True)
+
+    def _write_parallel(self, pieces, callback):
+        loop = self.get_io_loop()
+        future = self._framework.get_future(loop)
+        retval = self._framework.future_or_callback(future, callback, loop)
+        try:
+            data = b''.join(self._encode(piece) for piece in pieces)
+        except TypeError as exc:
+            future.set_exception(exc)
+        else:
+            self._uploader.write(data, future)
+
+        return retval
+
+    def _encode(self, data):
+        if isinstance(data, text_type):
+            encoding = self.delegate._file.get('encoding')
+            if encoding is None:
+                raise TypeError("must specify an encoding for file in "
+                                "order to write %s" % text_type.__name__)
+
+            return data.encode(encoding)
+
+        if not isinstance(data, bytes):
+            raise TypeError("parallel_upload can only write strings")
+
+        return data
+
+    def _after_drain(self, method, callback, abort=False):
+        # Wait for all batches, then call the delegate's close or abort.
+        loop = self.get_io_loop()
+        framework = self._framework
+        future = framework.get_future(loop)
+        retval = framework.future_or_callback(future, callback, loop)
+        drained = framework.get_future(loop)
+
+        def on_drained(_):
+            if not abort and drained.exception() is not None:
+                future.set_exception(drained.exception())
+                return
+
+            framework.add_future(loop, method(), copy_result)
+
+        def copy_result(method_future):
+            if method_future.exception() is not None:
+                future.set_exception(method_future.exception())
+            else:
+                future.set_result(None)
+
+        framework.add_future(loop, drained, on_drained)
+        self._uploader.drain(drained, flush=not abort)
+        return retval
+
 
 class _GFSBase(object):
     __delegate_class__ = None
@@ -617,3 +1360,85 @@ class AgnosticGridFSBucket(_GFSBase):
             AgnosticGridOutCursor, self._framework, self.__module__)
 
         return grid_out_cursor(cursor, self.collection)
+
+    @coroutine_annotation
+    def parallel_upload_from_stream(self, filename, source,
+                                    chunk_size_bytes=None, metadata=None,
+                                    batch_chunks=8, max_in_flight=4,
+                                    file_id=None, callback=None):
+        """Upload a file-like object, inserting several chunks at a time.
+
+        Like :meth:`upload_from_stream`, but `source` is read in Motor's
+        thread pool a batch of chunks at a time, while earlier batches are
+        inserted, see :meth:`MotorGridIn.parallel_upload`. The files
+        document is inserted last. If the upload fails, the chunks inserted
+        are removed.
+
+        Returns a Future that resolves to the new file's ``_id``.
+
+        :Parameters:
+          - `filename`: The name of the file to upload.
+          - `source`: The source stream of the content to be uploaded. Must
+            implement :meth:`read` and return bytes.
+          - `chunk_size_bytes` (optional): The number of bytes per chunk of
+            this file. Defaults to the chunk_size_bytes of the bucket.
+          - `metadata` (optional): User data for the 'metadata' field of the
+            files collection document.
+          - `batch_chunks` (optional): chunks per ``insert_many``
+          - `max_in_flight` (optional): batches inserted concurrently
+          - `file_id` (optional): The id to use for this file, by default an
+            ObjectId is generated.
+          - `callback` (optional): function taking (file_id, error)
+        """
+        loop = self.get_io_loop()
+        framework = self._framework
+        future = framework.get_future(loop)
+        retval = framework.future_or_callback(future, callback, loop)
+        if file_id is None:
+            grid_in = self.open_upload_stream(filename, chunk_size_bytes,
+                                              metadata)
+        else:
+            grid_in = self.open_upload_stream_with_id(file_id, filename,
+                                                      chunk_size_bytes,
+                                                      metadata)
+
+        grid_in.parallel_upload(batch_chunks, max_in_flight)
+        batch_bytes = int(grid_in.chunk_size) * batch_chunks
+
+        def read_next():
+            framework.add_future(
+                loop,
+                framework.run_on_executor(loop, _read_source, source,
+                                          batch_bytes),
+                on_read)
+
+        def on_read(read_future):
+            try:
+                data = read_future.result()
+            except Exception as exc:
+                fail(exc)
+                return
+
+            if data:
+                framework.add_future(loop, grid_in.write(data), on_written)
+            else:
+                framework.add_future(loop, grid_in.close(), on_closed)
+
+        def on_written(write_future):
+            if write_future.exception() is not None:
+                fail(write_future.exception())
+            else:
+                read_next()
+
+        def on_closed(close_future):
+            if close_future.exception() is not None:
+                fail(close_future.exception())
+            else:
+                future.set_result(grid_in._id)
+
+        def fail(exc):
+            framework.add_future(loop, grid_in.abort(),
+                                 lambda _: future.set_exception(exc))
+
+        read_next()
+        return retval
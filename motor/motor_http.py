@@ -0,0 +1,151 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, absolute_import
+
+"""HTTP helpers shared by motor.web and motor.aiohttp."""
+
+import email.utils
+import uuid
+
+# Ignore Range headers asking for more pieces than this, and send the whole
+# file instead, as RFC 7233 permits.
+MAX_RANGES = 16
+
+
+def parse_range(header, length):
+    """Parse a Range header into a list of (start, end) byte ranges.
+
+    `end` is exclusive. Returns None if there is no header or it should be
+    ignored, in which case the whole file is sent, or an empty list if no
+    range is satisfiable. Overlapping ranges are coalesced.
+    """
+    if not header:
+        return None
+
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+
+        first, sep, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if (not sep
+                or (first and not first.isdigit())
+                or (last and not last.isdigit())
+                or not (first or last)):
+            return None
+
+        if not first:
+            # Suffix range: the last N bytes.
+            suffix = int(last)
+            if suffix > 0 and length > 0:
+                ranges.append((max(length - suffix, 0), length))
+
+            continue
+
+        start = int(first)
+        if last and int(last) < start:
+            return None
+
+        if start < length:
+            end = min(int(last) + 1, length) if last else length
+            ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def if_range_matches(header, etag, modified):
+    """True if a Range request with this If-Range header should be honored.
+
+    `etag` is the quoted entity tag, and `modified` is the datetime sent in
+    Last-Modified. Weak entity tags never match.
+    """
+    if header is None:
+        return True
+
+    header = header.strip()
+    if header.startswith('"') or header.startswith('W/'):
+        return header == etag
+
+    date_tuple = email.utils.parsedate(header)
+    if date_tuple is None:
+        return False
+
+    return tuple(date_tuple[:6]) == tuple(modified.utctimetuple()[:6])
+
+
+def content_range(start, end, length):
+    return 'bytes %d-%d/%d' % (start, end - 1, length)
+
+
+def multipart_parts(ranges, length, content_type):
+    """Framing for a multipart/byteranges response.
+
+    Returns (boundary, headers, trailer): `headers` holds each range's part
+    header bytes, to be sent before the range's data, and `trailer` is sent
+    after the last range.
+    """
+    boundary = uuid.uuid4().hex
+    headers = []
+    for i, (start, end) in enumerate(ranges):
+        lines = ['--' + boundary]
+        if content_type:
+            lines.append('Content-Type: ' + content_type)
+
+        lines.append('Content-Range: ' + content_range(start, end, length))
+        text = '\r\n'.join(lines) + '\r\n\r\n'
+        if i:
+            text = '\r\n' + text
+
+        headers.append(text.encode('latin-1'))
+
+    trailer = ('\r\n--%s--\r\n' % boundary).encode('latin-1')
+    return boundary, headers, trailer
+
+
+def multipart_length(ranges, headers, trailer):
+    """The Content-Length of a multipart/byteranges response."""
+    return (sum(end - start for start, end in ranges) +
+            sum(len(header) for header in headers) +
+            len(trailer))
+
+
+def range_reads(gridout, start, end):
+    """Sizes of the reads after seeking to `start` to get bytes up to `end`.
+
+    Each read stops at a chunk boundary, so it fetches one chunk and leaves
+    nothing buffered in the GridOut.
+    """
+    chunk_size = int(gridout.chunk_size)
+    position = start
+    while position < end:
+        size = min(chunk_size - position % chunk_size, end - position)
+        yield size
+        position += size
@@ -0,0 +1,79 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, absolute_import
+
+"""Decode and encode BSON in a process pool.
+
+decode() and encode() run in worker processes; decode_batch() and
+encode_batch() block a Motor thread while they wait for a worker.
+"""
+
+import bson
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from . import motor_bulk
+
+
+def decode(data, codec_options):
+    """Decode concatenated BSON documents. Runs in a worker process."""
+    return bson.decode_all(data, codec_options)
+
+
+def encode(documents, check_keys, codec_options):
+    """Encode documents to a list of BSON bytes. Runs in a worker process."""
+    return [bson.BSON.encode(document, check_keys, codec_options)
+            for document in documents]
+
+
+def decode_batch(executor, raw_documents, codec_options):
+    """Decode RawBSONDocuments in `executor`, a ProcessPoolExecutor.
+
+    The documents' bytes are joined and sent to the worker once.
+    """
+    data = b''.join(document.raw for document in raw_documents)
+    return executor.submit(decode, data, codec_options).result()
+
+
+def encode_batch(executor, documents, codec_options):
+    """Encode documents to RawBSONDocuments in a ProcessPoolExecutor.
+
+    Like insert_many, adds an "_id" to documents that have none, before they
+    are copied to the worker. Returns (RawBSONDocuments, _ids).
+    """
+    encoded = []
+    ids = []
+    indexes = []
+    plain = []
+    for i, document in enumerate(documents):
+        if isinstance(document, RawBSONDocument):
+            document, _id = motor_bulk.raw_with_id(document, codec_options)
+        else:
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+
+            _id = document['_id']
+            indexes.append(i)
+            plain.append(document)
+
+        encoded.append(document)
+        ids.append(_id)
+
+    if plain:
+        future = executor.submit(encode, plain, True, codec_options)
+        for i, data in zip(indexes, future.result()):
+            encoded[i] = RawBSONDocument(data)
+
+    return encoded, ids
@@ -45,6 +45,28 @@ MotorCommandCursor = create_motor_class(core.AgnosticCommandCursor)
 MotorLatentCommandCursor = create_motor_class(core.AgnosticLatentCommandCursor)
 
 
+MotorPartitionedCursor = create_motor_class(core.AgnosticPartitionedCursor)
+
+
+MotorMergedCursor = create_motor_class(core.AgnosticMergedCursor)
+
+
+MotorLoader = create_motor_class(core.AgnosticLoader)
+
+
+MotorBufferedWriter = create_motor_class(core.AgnosticBufferedWriter)
+
+
+MotorCoalescingUpdater = create_motor_class(
+    core.AgnosticCoalescingUpdater)
+
+
+MotorBulkStream = create_motor_class(core.AgnosticBulkStream)
+
+
+MotorCursorReaper = create_motor_class(core.AgnosticCursorReaper)
+
+
 MotorBulkOperationBuilder = create_motor_class(core.AgnosticBulkOperationBuilder)
 
 
@@ -21,20 +21,96 @@ import email.utils
 import mimetypes
 import time
 
+import tornado.ioloop
 import tornado.web
 from tornado import gen
 
 import gridfs
 import motor
+from motor import motor_http
 
 
-# TODO: this class is not a drop-in replacement for StaticFileHandler.
-#   StaticFileHandler provides class method make_static_url, which appends
-#   an MD5 of the static file's contents. Templates thus can do
-#   {{ static_url('image.png') }} and get "/static/image.png?v=1234abcdef",
-#   which is cached forever. Problem is, it calculates the MD5 synchronously.
-#   Two options: keep a synchronous GridFS available to get each grid file's
-#   MD5 synchronously for every static_url call, or find some other idiom.
+# Cache time for versioned URLs, one year.
+VERSIONED_CACHE_TIME = 365 * 24 * 60 * 60
+
+
+class GridFSVersions(object):
+    """A map of GridFS filenames to MD5s, for versioned static URLs.
+
+    :meth:`start` reads every file's MD5 from the files collection, then
+    every `refresh_interval` seconds reads the files uploaded since, so
+    :meth:`GridFSHandler.make_static_url` can add versions synchronously.
+
+    .. code-block:: python
+
+        versions = motor.web.GridFSVersions(db)
+        IOLoop.current().run_sync(versions.start)
+
+    When many files are stored, create an index on ``uploadDate`` in the
+    files collection to make refreshes cheap. Deleted files are not removed
+    from the map; their URLs keep their last version.
+
+    :Parameters:
+      - `database`: A :class:`~motor.motor_tornado.MotorDatabase`
+      - `root_collection` (optional): The GridFS bucket name
+      - `refresh_interval` (optional): Seconds between refreshes
+    """
+    def __init__(self, database, root_collection='fs', refresh_interval=60):
+        if refresh_interval <= 0:
+            raise ValueError('refresh_interval must be positive')
+
+        self.files = database[root_collection].files
+        self.refresh_interval = refresh_interval
+        self.stopped = True
+        self._versions = {}
+        self._last_upload_date = None
+
+    def get_version(self, filename):
+        """The MD5 of the latest file named `filename`, or None."""
+        return self._versions.get(filename)
+
+    def start(self):
+        """Read all versions and start refreshing. Returns a Future."""
+        self.stopped = False
+        future = self.refresh()
+        self.files.get_io_loop().add_future(future, self._schedule)
+        return future
+
+    def stop(self):
+        """Stop refreshing."""
+        self.stopped = True
+
+    @gen.coroutine
+    def refresh(self):
+        """Read files uploaded since the last refresh. Returns a Future."""
+        query = {}
+        if self._last_upload_date is not None:
+            # Files uploaded in the same millisecond may not all have been
+            # seen yet, re-read them.
+            query = {'uploadDate': {'$gte': self._last_upload_date}}
+
+        cursor = self.files.find(
+            query, {'filename': True, 'md5': True, 'uploadDate': True}
+        ).sort('uploadDate')
+
+        while (yield cursor.fetch_next):
+            doc = cursor.next_object()
+            if doc.get('filename') is not None and doc.get('md5'):
+                # Sorted by upload date, so the latest revision wins.
+                self._versions[doc['filename']] = doc['md5']
+
+            self._last_upload_date = doc['uploadDate']
+
+    def _schedule(self, future=None):
+        if not self.stopped:
+            self.files.get_io_loop().call_later(self.refresh_interval,
+                                                self._refresh_later)
+
+    def _refresh_later(self):
+        if not self.stopped:
+            # Keep refreshing, even if this refresh fails.
+            self.files.get_io_loop().add_future(self.refresh(),
+                                                self._schedule)
 
 
 class GridFSHandler(tornado.web.RequestHandler):
@@ -52,10 +128,55 @@ class GridFSHandler(tornado.web.RequestHandler):
     specific cache-control timeout is sent to clients. Thus each request for
     a GridFS file requires a quick check of the file's ``uploadDate`` in
     MongoDB. Override :meth:`get_cache_time` in a subclass to customize this.
+
+    Range requests are answered with 206 Partial Content, reading only the
+    chunks that hold the requested bytes, so clients can seek in videos and
+    resume downloads. Single, suffix and multiple ranges are supported, and
+    an If-Range header is checked against the Etag or Last-Modified date.
+
+    To serve small, popular files from memory, pass a
+    :class:`~motor.motor_cache.FileCache`:
+
+    .. code-block:: python
+
+        cache = motor.motor_cache.FileCache(max_size=64 * 1024 * 1024)
+        application = web.Application([
+            (r"/static/(.*)", web.GridFSHandler,
+             {"database": db, "cache": cache}),
+        ])
+
+    For templates' ``static_url`` to add each file's MD5 to its URL, and for
+    those URLs to be cached by clients for a year, make GridFSHandler the
+    application's static handler and pass a started :class:`GridFSVersions`
+    in the ``gridfs_versions`` setting:
+
+    .. code-block:: python
+
+        versions = motor.web.GridFSVersions(db)
+        IOLoop.current().run_sync(versions.start)
+        application = web.Application(
+            handlers,
+            static_path='unused',
+            static_handler_class=web.GridFSHandler,
+            static_handler_args={"database": db},
+            gridfs_versions=versions)
+
+    Tornado requires a ``static_path`` setting to route static URLs and
+    enable ``static_url``, but GridFSHandler ignores it.
+
+    Files are cached by path, so the same cache must not be shared by
+    handlers that map a path to different files. Similarly, pass a
+    :class:`~motor.motor_cache.MetadataCache` as ``metadata_cache`` to answer
+    conditional and HEAD requests, and 404s, without querying MongoDB.
     """
-    def initialize(self, database, root_collection='fs'):
+    def initialize(self, database, root_collection='fs', cache=None,
+                   metadata_cache=None, path=None):
+        # "path" is the static_path setting, passed by the Application if
+        # this is its static handler class. Files come from GridFS instead.
         self.database = database
         self.root_collection = root_collection
+        self.cache = cache
+        self.metadata_cache = metadata_cache
 
     def get_gridfs_file(self, bucket, filename, request):
         """Overridable method to choose a GridFS file to serve at a URL.
@@ -95,19 +216,16 @@ class GridFSHandler(tornado.web.RequestHandler):
 
     @gen.coroutine
     def get(self, path, include_body=True):
-        fs = motor.MotorGridFSBucket(self.database, self.root_collection)
-
-        try:
-            gridout = yield self.get_gridfs_file(fs, path, self.request)
-        except gridfs.NoFile:
-            raise tornado.web.HTTPError(404)
+        gridout, data = yield self._get_file(path)
 
         # If-Modified-Since header is only good to the second.
         modified = gridout.upload_date.replace(microsecond=0)
         self.set_header("Last-Modified", modified)
 
         # MD5 is calculated on the MongoDB server when GridFS file is created
-        self.set_header("Etag", '"%s"' % gridout.md5)
+        etag = '"%s"' % gridout.md5
+        self.set_header("Etag", etag)
+        self.set_header("Accept-Ranges", "bytes")
 
         mime_type = gridout.content_type
 
@@ -121,7 +239,13 @@ class GridFSHandler(tornado.web.RequestHandler):
 
         cache_time = self.get_cache_time(path, modified, mime_type)
 
-        if cache_time > 0:
+        if self.get_query_argument("v", None) == gridout.md5:
+            # A versioned URL from make_static_url never changes.
+            self.set_header("Expires", datetime.datetime.utcnow() +
+                            datetime.timedelta(seconds=VERSIONED_CACHE_TIME))
+            self.set_header("Cache-Control",
+                            "max-age=%d, immutable" % VERSIONED_CACHE_TIME)
+        elif cache_time > 0:
             self.set_header("Expires", datetime.datetime.utcnow() +
                                        datetime.timedelta(seconds=cache_time))
             self.set_header("Cache-Control", "max-age=" + str(cache_time))
@@ -147,20 +271,135 @@ class GridFSHandler(tornado.web.RequestHandler):
                 return
 
         # Same for Etag
-        etag = self.request.headers.get("If-None-Match")
-        if etag is not None and etag.strip('"') == gridout.md5:
+        inm = self.request.headers.get("If-None-Match")
+        if inm is not None and inm.strip('"') == gridout.md5:
             self.set_status(304)
             return
 
-        self.set_header("Content-Length", gridout.length)
+        length = gridout.length
+        ranges = motor_http.parse_range(self.request.headers.get("Range"),
+                                        length)
+        if ranges is not None and not motor_http.if_range_matches(
+                self.request.headers.get("If-Range"), etag, modified):
+            # The file changed since the client cached part of it.
+            ranges = None
+
+        if ranges == []:
+            self.set_status(416)
+            self.set_header("Content-Type", "text/plain")
+            self.set_header("Content-Range", "bytes */%d" % length)
+            return
+
+        trailer = b''
+        if ranges is None:
+            parts = [(b'', 0, length)]
+            self.set_header("Content-Length", length)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            parts = [(b'', start, end)]
+            self.set_status(206)
+            self.set_header("Content-Range",
+                            motor_http.content_range(start, end, length))
+            self.set_header("Content-Length", end - start)
+        else:
+            boundary, headers, trailer = motor_http.multipart_parts(
+                ranges, length, mime_type)
+            parts = [(header, start, end)
+                     for header, (start, end) in zip(headers, ranges)]
+            self.set_status(206)
+            self.set_header("Content-Type",
+                            "multipart/byteranges; boundary=" + boundary)
+            self.set_header("Content-Length", motor_http.multipart_length(
+                ranges, headers, trailer))
+
         if include_body:
-            yield gridout.stream_to_handler(self)
+            if (data is None and self.cache is not None
+                    and self.cache.cacheable(gridout)):
+                data = yield gridout.read()
+                self.cache.put(path, gridout, data)
+
+            for header, start, end in parts:
+                if header:
+                    self.write(header)
+
+                yield self._write_range(gridout, start, end, data)
+
+            if trailer:
+                self.write(trailer)
 
         # Needed until fix for Tornado bug 751 is released, see
         # https://github.com/facebook/tornado/issues/751 and
         # https://github.com/facebook/tornado/commit/5491685
         self.finish()
 
+    @gen.coroutine
+    def _get_file(self, path):
+        # Returns (gridout, contents if cached or None).
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(path)
+            if cached is not None and cached[2]:
+                raise gen.Return(cached[:2])
+
+        try:
+            gridout = yield self._open(path)
+        except gridfs.NoFile:
+            if cached is not None:
+                self.cache.discard(path)
+
+            raise tornado.web.HTTPError(404)
+
+        data = None
+        if cached is not None:
+            data = self.cache.validate(path, gridout)
+
+        raise gen.Return((gridout, data))
+
+    @gen.coroutine
+    def _open(self, path):
+        # Returns a gridout, made from a cached file document if possible.
+        metadata_cache = self.metadata_cache
+        if metadata_cache is not None:
+            found, document = metadata_cache.get(path)
+            if found:
+                if document is None:
+                    raise gridfs.NoFile(path)
+
+                raise gen.Return(motor.MotorGridOut(
+                    self.database[self.root_collection],
+                    file_document=document))
+
+        fs = motor.MotorGridFSBucket(self.database, self.root_collection)
+
+        try:
+            gridout = yield self.get_gridfs_file(fs, path, self.request)
+
+            # An overridden get_gridfs_file may return an unopened gridout.
+            yield gridout.open()
+        except gridfs.NoFile:
+            if metadata_cache is not None:
+                metadata_cache.put(path, None)
+
+            raise
+
+        if metadata_cache is not None:
+            metadata_cache.put(path, gridout.delegate._file)
+
+        raise gen.Return(gridout)
+
+    @gen.coroutine
+    def _write_range(self, gridout, start, end, data=None):
+        if data is not None:
+            self.write(data[start:end])
+            self.flush()
+            return
+
+        gridout.seek(start)
+        for size in motor_http.range_reads(gridout, start, end):
+            chunk = yield gridout.read(size)
+            self.write(chunk)
+            self.flush()
+
     def head(self, path):
         # get() is a coroutine. Return its Future.
         return self.get(path, include_body=False)
@@ -176,3 +415,138 @@ class GridFSHandler(tornado.web.RequestHandler):
     def set_extra_headers(self, path, gridout):
         """For subclass to add extra headers to the response"""
         pass
+
+    @classmethod
+    def make_static_url(cls, settings, path, include_version=True):
+        """Construct a versioned URL for the file at `path`.
+
+        Called by :meth:`~tornado.web.RequestHandler.static_url` when this is
+        the application's ``static_handler_class``. The version is the file's
+        MD5 from the :class:`GridFSVersions` in the ``gridfs_versions``
+        setting, and is omitted if the file isn't known yet.
+        """
+        url = settings.get('static_url_prefix', '/static/') + path
+        if not include_version:
+            return url
+
+        version = cls.get_version(settings, path)
+        if not version:
+            return url
+
+        return '%s?v=%s' % (url, version)
+
+    @classmethod
+    def get_version(cls, settings, path):
+        """The version of the file at `path`, or None."""
+        versions = settings.get('gridfs_versions')
+        if versions is None:
+            return None
+
+        return versions.get_version(path)
+
+
+@tornado.web.stream_request_body
+class GridFSUploadHandler(tornado.web.RequestHandler):
+    """A handler that streams request bodies into GridFS.
+
+    .. code-block:: python
+
+        db = motor.MotorClient().my_database
+        application = web.Application([
+            (r"/upload/(.*)", web.GridFSUploadHandler, {"database": db}),
+        ])
+
+    A POST or PUT to "/upload/video.mp4" stores the raw request body as a new
+    GridFS file named "video.mp4", with the request's Content-Type. The body
+    is written to a :class:`~motor.MotorGridIn` as it arrives, and Tornado
+    reads no more of it until each piece is written, so memory use doesn't
+    grow with the size of the upload. The response has status 201 and a
+    JSON body like ``{"_id": "...", "length": 1234}``. If the upload fails or
+    the client disconnects, the chunks already written are removed.
+
+    Tornado limits request bodies to 100 MB by default; pass
+    ``max_body_size`` to accept larger uploads. Pass ``parallel_upload=True``
+    to insert chunks in concurrent batches, see
+    :meth:`MotorGridIn.parallel_upload`.
+    """
+    SUPPORTED_METHODS = ('POST', 'PUT')
+
+    def initialize(self, database, root_collection='fs', max_body_size=None,
+                   parallel_upload=False):
+        self.database = database
+        self.root_collection = root_collection
+        self.max_body_size = max_body_size
+        self.parallel_upload = parallel_upload
+        self.grid_in = None
+
+    def create_grid_in(self, root_collection, filename, request):
+        """Overridable method to create the file an upload is written to.
+
+        By default, the trailing portion of the URL is used as the filename,
+        and the request's Content-Type as the file's content type. Override
+        to choose the file's ``_id``, chunk size, or other fields, and return
+        a :class:`~motor.MotorGridIn`. For example::
+
+            class CustomUploadHandler(motor.web.GridFSUploadHandler):
+                def create_grid_in(self, root_collection, filename, request):
+                    return motor.MotorGridIn(
+                        root_collection,
+                        filename=filename,
+                        metadata={'user': request.headers['X-User']})
+
+        :Parameters:
+          - `root_collection`: A :class:`~motor.MotorCollection`, the
+            GridFS root collection
+          - `filename`: A string, the matched group of the URL pattern
+          - `request`: An :class:`tornado.httputil.HTTPServerRequest`
+        """
+        kwargs = {'filename': filename}
+        content_type = request.headers.get('Content-Type')
+        if content_type:
+            kwargs['contentType'] = content_type
+
+        return motor.MotorGridIn(root_collection, **kwargs)
+
+    def prepare(self):
+        if self.max_body_size is not None:
+            self.request.connection.set_max_body_size(self.max_body_size)
+
+        filename = self.path_args[0] if self.path_args else None
+        self.grid_in = self.create_grid_in(
+            self.database[self.root_collection], filename, self.request)
+
+        if self.parallel_upload:
+            self.grid_in.parallel_upload()
+
+    def data_received(self, chunk):
+        # Tornado reads no more of the body until the Future resolves.
+        return self.grid_in.write(chunk)
+
+    @gen.coroutine
+    def post(self, path=None):
+        # The body is read: keep the file even if the client disconnects.
+        grid_in, self.grid_in = self.grid_in, None
+        try:
+            yield grid_in.close()
+        except Exception:
+            yield grid_in.abort()
+            raise
+
+        self.set_status(201)
+        self.write({'_id': str(grid_in._id), 'length': grid_in.length})
+
+    put = post
+
+    def on_connection_close(self):
+        self._abort()
+
+    def on_finish(self):
+        self._abort()
+
+    def _abort(self):
+        grid_in, self.grid_in = self.grid_in, None
+        if grid_in is not None and not grid_in.closed:
+            # Nothing waits for the result; retrieve any error so it isn't
+            # logged as unhandled.
+            tornado.ioloop.IOLoop.current().add_future(
+                grid_in.abort(), lambda future: future.exception())
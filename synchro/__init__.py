@@ -550,6 +550,11 @@ class GridFSBucket(Synchro):
 class GridIn(Synchro):
     __delegate_class__ = motor.MotorGridIn
 
+    abort        = Sync('abort')
+    close        = Sync('close')
+    write        = Sync('write')
+    writelines   = Sync('writelines')
+
     def __init__(self, collection, **kwargs):
         """Can be created with collection and kwargs like a PyMongo GridIn,
         or with a 'delegate' keyword arg, where delegate is a MotorGridIn.
@@ -592,6 +597,10 @@ class GridOut(Synchro):
     name         = SynchroGridOutProperty('name')
     upload_date  = SynchroGridOutProperty('upload_date')
 
+    # Motor methods, not generated from PyMongo's.
+    read         = Sync('read')
+    readchunk    = Sync('readchunk')
+
     def __init__(
             self, root_collection, file_id=None, file_document=None,
             delegate=None):
@@ -25,7 +25,9 @@ import aiohttp
 import aiohttp.web
 import gridfs
 
-from motor.aiohttp import AIOHTTPGridFS
+from motor.aiohttp import AIOHTTPGridFS, AIOHTTPGridFSUpload
+from motor.motor_asyncio import AsyncIOMotorGridOut
+from motor.motor_cache import FileCache, MetadataCache
 
 import test
 from test.asyncio_tests import AsyncIOTestCase, asyncio_test
@@ -81,7 +83,8 @@ class AIOHTTPGridFSHandlerTestBase(AsyncIOTestCase):
         super().tearDownClass()
 
     @asyncio.coroutine
-    def start_app(self, http_gridfs=None, extra_routes=None):
+    def start_app(self, http_gridfs=None, extra_routes=None,
+                  upload_routes=None):
         self.app = aiohttp.web.Application()
         resource = self.app.router.add_resource('/fs/{filename}')
         handler = http_gridfs or AIOHTTPGridFS(self.db)
@@ -93,6 +96,12 @@ class AIOHTTPGridFSHandlerTestBase(AsyncIOTestCase):
                 resource = self.app.router.add_resource(route)
                 resource.add_route('GET', handler)
 
+        if upload_routes:
+            for route, handler in upload_routes.items():
+                resource = self.app.router.add_resource(route)
+                resource.add_route('POST', handler)
+                resource.add_route('PUT', handler)
+
         self.app_handler = self.app.make_handler()
         server = self.loop.create_server(self.app_handler,
                                          host='localhost',
@@ -103,7 +112,8 @@ class AIOHTTPGridFSHandlerTestBase(AsyncIOTestCase):
                                                 loop=self.loop)
 
     @asyncio.coroutine
-    def request(self, method, path, if_modified_since=None, headers=None):
+    def request(self, method, path, if_modified_since=None, headers=None,
+                data=None):
         headers = headers or {}
         if if_modified_since:
             headers['If-Modified-Since'] = format_date(if_modified_since)
@@ -114,7 +124,8 @@ class AIOHTTPGridFSHandlerTestBase(AsyncIOTestCase):
             method = getattr(session, method)
 
             resp = yield from method('http://localhost:8088%s' % path,
-                                     headers=headers)
+                                     headers=headers,
+                                     data=data)
             yield from resp.read()
             return resp
         finally:
@@ -185,6 +196,87 @@ class AIOHTTPGridFSHandlerTest(AIOHTTPGridFSHandlerTestBase):
         self.assertEqual(200, response.status)
         self.assertEqual(self.contents, (yield from response.read()))
 
+    @asyncio_test
+    def test_range(self):
+        yield from self.start_app()
+        length = len(self.contents)
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'bytes=10-19'})
+        self.assertEqual(206, response.status)
+        self.assertEqual(self.contents[10:20], (yield from response.read()))
+        self.assertEqual('bytes 10-19/%d' % length,
+                         response.headers['Content-Range'])
+        self.assertEqual('bytes', response.headers['Accept-Ranges'])
+
+        # Spans a chunk boundary.
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'bytes=261000-'})
+        self.assertEqual(206, response.status)
+        self.assertEqual(self.contents[261000:], (yield from response.read()))
+
+        # Suffix range.
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'bytes=-5'})
+        self.assertEqual(206, response.status)
+        self.assertEqual(self.contents[-5:], (yield from response.read()))
+
+        response = yield from self.head('/fs/foo',
+                                        headers={'Range': 'bytes=0-99'})
+        self.assertEqual(206, response.status)
+        self.assertEqual(100, int(response.headers['Content-Length']))
+
+        response = yield from self.get(
+            '/fs/foo', headers={'Range': 'bytes=%d-' % length})
+        self.assertEqual(416, response.status)
+        self.assertEqual('bytes */%d' % length,
+                         response.headers['Content-Range'])
+
+        # Unknown units are ignored.
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'items=0-1'})
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.contents, (yield from response.read()))
+
+    @asyncio_test
+    def test_if_range(self):
+        yield from self.start_app()
+        response = yield from self.head('/fs/foo')
+        etag = response.headers['Etag']
+        last_modified = response.headers['Last-Modified']
+
+        for if_range in etag, last_modified:
+            response = yield from self.get('/fs/foo',
+                                           headers={'Range': 'bytes=0-9',
+                                                    'If-Range': if_range})
+            self.assertEqual(206, response.status)
+            self.assertEqual(self.contents[:10], (yield from response.read()))
+
+        # The file changed, send all of it.
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'bytes=0-9',
+                                                'If-Range': '"other"'})
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.contents, (yield from response.read()))
+
+    @asyncio_test
+    def test_multipart_range(self):
+        yield from self.start_app()
+        response = yield from self.get('/fs/foo',
+                                       headers={'Range': 'bytes=0-4,-5'})
+        self.assertEqual(206, response.status)
+        content_type = response.headers['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/byteranges'))
+        boundary = content_type.split('boundary=')[1].encode('ascii')
+        body = yield from response.read()
+        parts = body.split(b'--' + boundary)
+        self.assertEqual(4, len(parts))
+        self.assertEqual(b'--\r\n', parts[-1])
+        for part, data in zip(parts[1:3],
+                              (self.contents[:5], self.contents[-5:])):
+            headers, part_body = part.split(b'\r\n\r\n', 1)
+            self.assertIn(b'Content-Type: my type', headers)
+            self.assertEqual(data, part_body.rstrip(b'\r\n'))
+
     @asyncio_test
     def test_404(self):
         yield from self.start_app()
@@ -250,6 +342,175 @@ class AIOHTTPGridFSHandlerTest(AIOHTTPGridFSHandlerTestBase):
         self.assertEqual(405, result.status)
 
 
+class AIOHTTPCachedGridFSHandlerTest(AIOHTTPGridFSHandlerTestBase):
+    @asyncio.coroutine
+    def start_cached_app(self):
+        cache = FileCache(max_size=768 * 1024, max_file_size=768 * 1024)
+        yield from self.start_app(AIOHTTPGridFS(self.db, cache=cache))
+        return cache
+
+    @asyncio_test
+    def test_cache(self):
+        cache = yield from self.start_cached_app()
+        _id = self.fs.put(self.contents, filename='cached')
+        self.addCleanup(self.fs.delete, _id)
+
+        response = yield from self.get('/fs/cached')
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.contents, (yield from response.read()))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(len(self.contents), cache.size)
+
+        # Stale entries are checked against the file, and still served.
+        cache.revalidate_after = 0
+        response = yield from self.get('/fs/cached')
+        self.assertEqual(self.contents, (yield from response.read()))
+        self.assertEqual(1, cache.revalidations)
+
+        # Fresh entries are served without querying MongoDB.
+        cache.revalidate_after = 60
+        self.fs.delete(_id)
+        response = yield from self.get('/fs/cached',
+                                       headers={'Range': 'bytes=0-4'})
+        self.assertEqual(206, response.status)
+        self.assertEqual(self.contents[:5], (yield from response.read()))
+        self.assertEqual(1, cache.hits)
+
+        cache.revalidate_after = 0
+        response = yield from self.get('/fs/cached')
+        self.assertEqual(404, response.status)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+    @asyncio_test
+    def test_cache_eviction(self):
+        cache = yield from self.start_cached_app()
+        _id = self.fs.put(self.contents, filename='bar')
+        self.addCleanup(self.fs.delete, _id)
+        yield from self.get('/fs/foo')
+        yield from self.get('/fs/bar')
+
+        # The cache holds only one copy of contents.
+        self.assertEqual(1, len(cache))
+        self.assertEqual(1, cache.evictions)
+        response = yield from self.get('/fs/foo')
+        self.assertEqual(self.contents, (yield from response.read()))
+        self.assertEqual(2, cache.evictions)
+
+
+class AIOHTTPMetadataCachedGridFSHandlerTest(AIOHTTPGridFSHandlerTestBase):
+    @asyncio.coroutine
+    def start_cached_app(self):
+        cache = MetadataCache(ttl=60, negative_ttl=60)
+        yield from self.start_app(AIOHTTPGridFS(self.db,
+                                                metadata_cache=cache))
+        return cache
+
+    @asyncio_test
+    def test_metadata_cache(self):
+        cache = yield from self.start_cached_app()
+        _id = self.fs.put(self.contents,
+                          filename='cached',
+                          content_type='my type')
+        self.addCleanup(self.fs.delete, _id)
+
+        response = yield from self.get('/fs/cached')
+        self.assertEqual(200, response.status)
+        self.assertEqual(1, len(cache))
+        etag = response.headers['Etag']
+
+        # Conditional and HEAD requests are answered from the cache.
+        self.fs.delete(_id)
+        response = yield from self.get('/fs/cached',
+                                       headers={'If-None-Match': etag})
+        self.assertEqual(304, response.status)
+        response = yield from self.head('/fs/cached')
+        self.assertEqual(200, response.status)
+        self.assertEqual(etag, response.headers['Etag'])
+        self.assertEqual(
+            len(self.contents), int(response.headers['Content-Length']))
+        self.assertEqual('my type', response.headers['Content-Type'])
+        self.assertEqual(2, cache.hits)
+
+    @asyncio_test
+    def test_negative_cache(self):
+        cache = yield from self.start_cached_app()
+        response = yield from self.get('/fs/bar')
+        self.assertEqual(404, response.status)
+        _id = self.fs.put(b'bar', filename='bar')
+        self.addCleanup(self.fs.delete, _id)
+
+        # Still missing until the entry expires.
+        response = yield from self.get('/fs/bar')
+        self.assertEqual(404, response.status)
+        cache.discard('bar')
+        response = yield from self.get('/fs/bar')
+        self.assertEqual(200, response.status)
+        self.assertEqual(b'bar', (yield from response.read()))
+
+    @asyncio_test
+    def test_unopened_gridout(self):
+        @asyncio.coroutine
+        def getter(bucket, filename, request):
+            # Look up by file_id, without opening the gridout.
+            return AsyncIOMotorGridOut(self.db.fs, file_id=filename)
+
+        cache = MetadataCache(ttl=60, negative_ttl=60)
+        yield from self.start_app(AIOHTTPGridFS(self.db,
+                                                get_gridfs_file=getter,
+                                                metadata_cache=cache))
+
+        # The file document is cached, not the unopened gridout's None.
+        for _ in range(2):
+            response = yield from self.get('/fs/' + self.file_id)
+            self.assertEqual(200, response.status)
+            self.assertEqual(self.contents, (yield from response.read()))
+
+        self.assertEqual(1, cache.hits)
+        found, document = cache.get(self.file_id)
+        self.assertTrue(found)
+        self.assertEqual('foo', document['filename'])
+
+
+class AIOHTTPGridFSUploadTest(AIOHTTPGridFSHandlerTestBase):
+    @asyncio_test
+    def test_upload(self):
+        yield from self.start_app(upload_routes={
+            '/upload/{filename}': AIOHTTPGridFSUpload(self.db),
+            '/parallel/{filename}': AIOHTTPGridFSUpload(
+                self.db, parallel_upload=True)})
+
+        for method, prefix in ('post', 'upload'), ('put', 'parallel'):
+            response = yield from self.request(
+                method,
+                '/%s/uploaded' % prefix,
+                headers={'Content-Type': 'my type'},
+                data=self.contents)
+
+            self.assertEqual(201, response.status)
+            result = yield from response.json()
+            self.assertEqual(len(self.contents), result['length'])
+            _id = self.fs.get_last_version('uploaded')._id
+            self.addCleanup(self.fs.delete, _id)
+            self.assertEqual(str(_id), result['_id'])
+
+            response = yield from self.get('/fs/uploaded')
+            self.assertEqual(200, response.status)
+            self.assertEqual(self.contents, (yield from response.read()))
+            self.assertEqual('my type', response.headers['Content-Type'])
+            self.assertEqual(self.contents_hash,
+                             response.headers['Etag'].strip('"'))
+
+    @asyncio_test
+    def test_upload_bad_route(self):
+        handler = AIOHTTPGridFSUpload(self.db)
+        yield from self.start_app(upload_routes={'/x/{wrongname}': handler})
+        response = yield from self.request('post', '/x/foo', data=b'data')
+        self.assertEqual(500, response.status)
+        msg = 'Bad AIOHTTPGridFSUpload route "/x/{wrongname}"'
+        self.assertIn(msg, (yield from response.text()))
+
+
 class AIOHTTPTZAwareGridFSHandlerTest(AIOHTTPGridFSHandlerTestBase):
     @asyncio_test
     def test_tz_aware(self):
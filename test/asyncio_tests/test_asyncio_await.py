@@ -16,6 +16,9 @@ from __future__ import unicode_literals, absolute_import
 
 import warnings
 
+from pymongo import InsertOne
+from pymongo.errors import InvalidOperation
+
 from motor.motor_asyncio import AsyncIOMotorGridFS
 import test
 from test import SkipTest
@@ -127,6 +130,49 @@ class TestAsyncIOAwait(AsyncIOTestCase):
         self.assertEqual(len(chunks), len(data))
         self.assertEqual(b''.join(chunks), data)
 
+    @asyncio_test
+    async def test_bulk_stream(self):
+        await self.collection.delete_many({})
+        async with self.collection.bulk_stream(batch_size=3) as stream:
+            for i in range(10):
+                await stream.add(InsertOne({'_id': i}))
+
+        self.assertEqual(10, stream.result['nInserted'])
+        self.assertEqual(10, await self.collection.count())
+
+    @asyncio_test
+    async def test_bulk_stream_error(self):
+        await self.collection.delete_many({})
+        with self.assertRaises(ZeroDivisionError):
+            async with self.collection.bulk_stream(batch_size=3) as stream:
+                for i in range(10):
+                    await stream.add(InsertOne({'_id': i}))
+
+                1 / 0
+
+        # Full batches were sent, the last one was discarded.
+        self.assertEqual(9, stream.result['nInserted'])
+        self.assertEqual(9, await self.collection.count())
+
+    @asyncio_test
+    async def test_bulk_stream_error_waiting(self):
+        await self.collection.delete_many({})
+        futures = []
+        with self.assertRaises(ZeroDivisionError):
+            async with self.collection.bulk_stream(
+                    batch_size=3, max_in_flight=1) as stream:
+                for i in range(9):
+                    futures.append(stream.add(InsertOne({'_id': i})))
+
+                1 / 0
+
+        # The first batch was sent, the two waiting for it were dropped.
+        self.assertEqual(3, stream.result['nInserted'])
+        self.assertEqual(3, await self.collection.count())
+        for future in futures[5], futures[8]:
+            with self.assertRaises(InvalidOperation):
+                await future
+
     @asyncio_test
     async def test_stream_to_handler(self):
         # Sort of Tornado-specific, but it does work with asyncio.
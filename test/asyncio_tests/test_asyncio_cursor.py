@@ -20,8 +20,10 @@ import sys
 import traceback
 import unittest
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from unittest import SkipTest
 
+import pymongo
 from pymongo import CursorType
 from pymongo.errors import InvalidOperation, ExecutionTimeout
 from pymongo.errors import OperationFailure
@@ -156,6 +158,72 @@ class TestAsyncIOCursor(AsyncIOMockServerTestCase):
         expected = [{'_id': i} for i in range(200)]
         self.assertEqual(expected, results)
 
+    @asyncio_test
+    def test_each_batch(self):
+        yield from self.make_test_data()
+        cursor = self.collection.find({}, {'_id': 1}).sort('_id')
+        cursor.batch_size(50)
+        future = asyncio.Future(loop=self.loop)
+        batches = []
+
+        def callback(batch, error):
+            if error:
+                raise error
+
+            if batch is not None:
+                batches.append(batch)
+            else:
+                # Done iterating.
+                future.set_result(True)
+
+        cursor.each_batch(callback)
+        yield from future
+        self.assertTrue(all(batches))
+        expected = [{'_id': i} for i in range(200)]
+        self.assertEqual(expected, sum(batches, []))
+
+    @asyncio_test
+    def test_each_batch_cancel(self):
+        yield from self.make_test_data()
+        cursor = self.collection.find().batch_size(10)
+        future = asyncio.Future(loop=self.loop)
+        batches = []
+
+        def callback(batch, error):
+            batches.append(batch)
+            self.loop.call_soon(future.set_result, True)
+            return False  # Cancel iteration.
+
+        cursor.each_batch(callback)
+        yield from future
+        self.assertEqual(1, len(batches))
+        self.assertTrue(cursor.alive)
+        yield from cursor.close()
+
+    @asyncio_test
+    def test_decode_in_processes(self):
+        yield from self.make_test_data()
+        executor = ProcessPoolExecutor(max_workers=2)
+        try:
+            cursor = self.collection.find().sort('_id').batch_size(50)
+            self.assertIs(cursor, cursor.decode_in_processes(executor))
+
+            # Part of the first batch, then the rest of it and later batches.
+            docs = yield from cursor.to_list(10)
+            docs += yield from cursor.to_list(None)
+            self.assertEqual([{'_id': i} for i in range(200)], docs)
+
+            cursor = self.collection.find().decode_in_processes(executor)
+            ids = []
+            while (yield from cursor.fetch_next):
+                ids.append(cursor.next_object()['_id'])
+
+            self.assertEqual(200, len(ids))
+            self.assertRaises(InvalidOperation,
+                              cursor.decode_in_processes, executor)
+        finally:
+            executor.shutdown()
+
     @asyncio_test
     def test_to_list_argument_checking(self):
         # We need more than 10 documents so the cursor stays alive.
@@ -438,6 +506,141 @@ class TestAsyncIOCursor(AsyncIOMockServerTestCase):
 
         self.assertEqual(0, len(w))
 
+    @asyncio_test
+    def test_to_queue(self):
+        yield from self.make_test_data()
+        cursor = self.collection.find().sort('_id').batch_size(10)
+        queue = cursor.to_queue(5)
+        self.assertIsInstance(queue, asyncio.Queue)
+        self.assertEqual(5, queue.maxsize)
+
+        ids = []
+        while True:
+            doc = yield from queue.get()
+            if doc is None:
+                break
+
+            ids.append(doc['_id'])
+
+        self.assertEqual(list(range(200)), ids)
+
+    @asyncio_test
+    def test_stream_into_error(self):
+        queue = asyncio.Queue(loop=self.loop)
+        n = yield from self.collection.find({'$foo': 1}).stream_into(queue)
+        self.assertEqual(0, n)
+        self.assertIsInstance((yield from queue.get()), OperationFailure)
+
+    @asyncio_test
+    def test_stream_into_cancel(self):
+        yield from self.make_test_data()
+        queue = asyncio.Queue(maxsize=1, loop=self.loop)
+        cursor = self.collection.find().batch_size(10)
+        future = cursor.stream_into(queue)
+        yield from queue.get()
+
+        # The producer waits for room in the full queue, but doesn't need
+        # the consumer to make room before it stops.
+        yield from asyncio.sleep(0.1, loop=self.loop)
+        self.assertTrue(queue.full())
+        future.cancel()
+        yield from asyncio.sleep(0.1, loop=self.loop)
+        self.assertTrue(cursor.closed)
+        self.assertEqual(1, queue.qsize())
+
+    @asyncio_test
+    def test_stream_into_close(self):
+        yield from self.make_test_data()
+        queue = asyncio.Queue(maxsize=1, loop=self.loop)
+        cursor = self.collection.find().batch_size(10)
+        future = cursor.stream_into(queue)
+        yield from queue.get()
+        yield from cursor.close()
+
+        # The producer ends the stream with None, even though it's closed.
+        docs = 1
+        while (yield from queue.get()) is not None:
+            docs += 1
+
+        n = yield from future
+        self.assertLess(n, 200)
+        self.assertEqual(n, docs)
+
+    def test_stream_into_tailable(self):
+        cursor = self.collection.find(cursor_type=CursorType.TAILABLE)
+        with self.assertRaises(InvalidOperation):
+            cursor.stream_into(asyncio.Queue(loop=self.loop))
+
+    @asyncio_test
+    def test_merged_cursor(self):
+        yield from self.make_test_data()
+        coll = self.collection
+
+        def cursors(direction):
+            return [
+                coll.find({'_id': {'$mod': [3, r]}}).sort(
+                    '_id', direction).batch_size(10)
+                for r in range(3)]
+
+        merged = motor_asyncio.AsyncIOMotorMergedCursor(
+            cursors(pymongo.ASCENDING), '_id')
+
+        self.assertEqual(None, merged.next_object())  # Haven't fetched yet.
+        ids = []
+        while (yield from merged.fetch_next):
+            ids.append(merged.next_object()['_id'])
+
+        self.assertEqual(list(range(200)), ids)
+        self.assertEqual(False, (yield from merged.fetch_next))
+
+        merged = motor_asyncio.AsyncIOMotorMergedCursor(
+            cursors(pymongo.DESCENDING), [('_id', pymongo.DESCENDING)])
+
+        ids = []
+        while (yield from merged.fetch_next):
+            ids.append(merged.next_object()['_id'])
+
+        self.assertEqual(list(reversed(range(200))), ids)
+
+    @asyncio_test
+    def test_merged_cursor_arrays(self):
+        coll = self.db.test_merged_arrays
+        yield from coll.drop()
+        yield from coll.insert_many([
+            {'_id': 0, 'a': [5, 1]},
+            {'_id': 1, 'a': 3},
+            {'_id': 2, 'a': [2, 9]},
+            {'_id': 3, 'a': []},
+            {'_id': 4},
+            {'_id': 5, 'a': 'x'},
+            {'_id': 6, 'a': [0, 's']},
+            {'_id': 7, 'a': [{'b': 4}]}])
+
+        # Merge the same order the server sorts in, arrays included.
+        for direction in pymongo.ASCENDING, pymongo.DESCENDING:
+            expected = yield from coll.find().sort('a', direction).to_list(
+                None)
+            merged = motor_asyncio.AsyncIOMotorMergedCursor(
+                [coll.find({'_id': {'$mod': [2, r]}}).sort('a', direction)
+                 for r in range(2)],
+                'a', direction)
+
+            ids = []
+            while (yield from merged.fetch_next):
+                ids.append(merged.next_object()['_id'])
+
+            self.assertEqual([doc['_id'] for doc in expected], ids)
+
+        yield from coll.drop()
+
+    def test_merged_cursor_args(self):
+        MergedCursor = motor_asyncio.AsyncIOMotorMergedCursor
+        cursor = self.collection.find()
+        self.assertRaises(ValueError, MergedCursor, [], '_id')
+        self.assertRaises(TypeError, MergedCursor, [{}], '_id')
+        self.assertRaises(ValueError,
+                          MergedCursor, [cursor], [('_id', 'text')])
+
 
 class TestAsyncIOCursorMaxTimeMS(AsyncIOTestCase):
     def setUp(self):
@@ -17,6 +17,7 @@
 
 import asyncio
 import datetime
+import hashlib
 import sys
 import traceback
 import unittest
@@ -24,7 +25,7 @@ import unittest
 from pymongo.errors import InvalidOperation, ConfigurationError
 
 import test
-from gridfs.errors import FileExists, NoFile
+from gridfs.errors import CorruptGridFile, FileExists, NoFile
 from motor.motor_asyncio import (AsyncIOMotorGridFS,
                                  AsyncIOMotorGridIn,
                                  AsyncIOMotorGridOut)
@@ -242,6 +243,138 @@ class TestAsyncIOGridFile(AsyncIOTestCase):
         self.assertEqual("a", g.bar)
         self.assertEqual("b", g.baz)
 
+    @asyncio_test
+    def test_read_ahead(self):
+        in_data = b'0123456789'
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3)
+        yield from f.write(in_data)
+        yield from f.close()
+
+        g = AsyncIOMotorGridOut(self.db.fs, f._id)
+        self.assertIs(g, g.read_ahead(2))
+        self.assertEqual(b'012', (yield from g.readchunk()))
+        self.assertEqual(b'34', (yield from g.read(2)))
+        self.assertEqual(b'5', (yield from g.readchunk()))
+        self.assertEqual(b'6789', (yield from g.read()))
+        self.assertEqual(b'', (yield from g.readchunk()))
+
+        g.seek(4)
+        self.assertEqual(b'45678', (yield from g.read(5)))
+        g.seek(1)
+        self.assertEqual(b'12', (yield from g.readchunk()))
+        self.assertEqual(b'3456789', (yield from g.read()))
+
+        g = AsyncIOMotorGridOut(self.db.fs, f._id).read_ahead(
+            8, max_buffer_size=3)
+
+        handler = test.MockRequestHandler()
+        yield from g.stream_to_handler(handler)
+        self.assertEqual(10, handler.n_written)
+
+        yield from self.db.fs.chunks.delete_one({'files_id': f._id, 'n': 2})
+        g = AsyncIOMotorGridOut(self.db.fs, f._id).read_ahead()
+        with self.assertRaises(CorruptGridFile):
+            yield from g.read()
+
+        self.assertRaises(ValueError, g.read_ahead, 0)
+        self.assertRaises(ValueError, g.read_ahead, max_buffer_size=0)
+
+    @asyncio_test
+    def test_stream_chunks(self):
+        in_data = b'0123456789'
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3)
+        yield from f.write(in_data)
+        yield from f.close()
+
+        g = AsyncIOMotorGridOut(self.db.fs, f._id)
+        self.assertIs(g, g.stream_chunks(batch_size=2))
+        self.assertEqual(b'012', (yield from g.readchunk()))
+        self.assertEqual(b'34', (yield from g.read(2)))
+        self.assertEqual(b'56789', (yield from g.read()))
+        self.assertEqual(b'', (yield from g.readchunk()))
+
+        g.seek(4)
+        self.assertEqual(b'45678', (yield from g.read(5)))
+
+        handler = test.MockRequestHandler()
+        g = AsyncIOMotorGridOut(self.db.fs, f._id).stream_chunks()
+        yield from g.stream_to_handler(handler)
+        self.assertEqual(10, handler.n_written)
+
+        yield from self.db.fs.chunks.delete_one({'files_id': f._id, 'n': 2})
+        g = AsyncIOMotorGridOut(self.db.fs, f._id).stream_chunks()
+        with self.assertRaises(CorruptGridFile):
+            yield from g.read()
+
+        self.assertRaises(ValueError, g.stream_chunks, 0)
+
+    @asyncio_test
+    def test_read_range(self):
+        in_data = b'0123456789'
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3)
+        yield from f.write(in_data)
+        yield from f.close()
+
+        g = AsyncIOMotorGridOut(self.db.fs, f._id)
+        self.assertEqual(b'2345', (yield from g.read_range(2, 4)))
+        self.assertEqual(b'789', (yield from g.read_range(7, 100)))
+        self.assertEqual(b'', (yield from g.read_range(10, 1)))
+        self.assertEqual(b'', (yield from g.read_range(0, 0)))
+        self.assertEqual(0, g.tell())
+
+        # Chunks 0 to 3 are cached now.
+        yield from self.db.fs.chunks.delete_many({'files_id': f._id})
+        self.assertEqual(in_data, (yield from g.read_range(0, 10)))
+
+        g.chunk_cache_size = 1
+        self.assertEqual(b'4', (yield from g.read_range(4, 1)))
+        with self.assertRaises(CorruptGridFile):
+            yield from g.read_range(0, 1)
+
+        self.assertRaises(ValueError, g.read_range, -1, 1)
+        self.assertRaises(ValueError, g.read_range, 0, -1)
+
+    @asyncio_test
+    def test_parallel_upload(self):
+        in_data = b'0123456789' * 10
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3)
+        self.assertIs(f, f.parallel_upload(batch_chunks=2, max_in_flight=2))
+        for i in range(0, len(in_data), 7):
+            yield from f.write(in_data[i:i + 7])
+
+        yield from f.close()
+        self.assertTrue(f.closed)
+        self.assertEqual(34, (yield from self.db.fs.chunks.count(
+            {'files_id': f._id})))
+
+        g = AsyncIOMotorGridOut(self.db.fs, f._id)
+        self.assertEqual(in_data, (yield from g.read()))
+        self.assertEqual(hashlib.md5(in_data).hexdigest(), g.md5)
+        self.assertRaises(InvalidOperation, f.parallel_upload)
+
+        # Closing twice at once waits for the batches and closes once.
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3).parallel_upload()
+        yield from f.write(in_data)
+        yield from asyncio.gather(f.close(), f.close(), loop=self.loop)
+        self.assertTrue(f.closed)
+        g = AsyncIOMotorGridOut(self.db.fs, f._id)
+        self.assertEqual(in_data, (yield from g.read()))
+
+        # Abort removes the chunks inserted.
+        f = AsyncIOMotorGridIn(self.db.fs, chunkSize=3).parallel_upload()
+        yield from f.write(in_data)
+        yield from f.abort()
+        self.assertTrue(f.closed)
+        self.assertEqual(0, (yield from self.db.fs.chunks.count(
+            {'files_id': f._id})))
+
+        f = AsyncIOMotorGridIn(self.db.fs).parallel_upload()
+        with self.assertRaises(TypeError):
+            yield from f.write(1)
+
+        with self.assertRaises(TypeError):
+            yield from f.write('text, but no encoding')
+
     @asyncio_test
     def test_stream_to_handler(self):
         fs = AsyncIOMotorGridFS(self.db)
@@ -0,0 +1,89 @@
+# Copyright 2017 MongoDB, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import print_function, unicode_literals
+
+"""Compare insert_many with pipelined_insert_many.
+
+Run from the repository root with a mongod listening:
+
+  python test/performance/insert_many_benchmark.py --documents 100000
+
+Each method inserts the same documents into an empty collection several
+times; the best time of each is reported. The gain is largest on multi-core
+hosts with a network round trip to the server, where BSON encoding of the
+next batch overlaps the insert of the previous one.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+import motor
+
+
+def make_documents(n, fields):
+    return [dict(('field%d' % j, 'value %d %d' % (i, j))
+                 for j in range(fields))
+            for i in range(n)]
+
+
+@gen.coroutine
+def run(options):
+    client = motor.MotorClient(options.uri)
+    collection = client.motor_benchmark.insert_many
+    best = {}
+    methods = [
+        ('insert_many', lambda docs: collection.insert_many(docs)),
+        ('pipelined_insert_many',
+         lambda docs: collection.pipelined_insert_many(
+             docs, batch_size=options.batch_size))]
+
+    for _ in range(options.repeat):
+        for name, method in methods:
+            yield collection.drop()
+            documents = make_documents(options.documents, options.fields)
+            start = time.time()
+            yield method(documents)
+            duration = time.time() - start
+            best[name] = min(duration, best.get(name, duration))
+
+    yield collection.drop()
+    for name, _ in methods:
+        print('%-22s %8.3f s %12.0f docs/s' % (
+            name, best[name], options.documents / best[name]))
+
+    print('speedup %.2fx' % (best['insert_many'] /
+                             best['pipelined_insert_many']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--uri', default='mongodb://localhost:27017')
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--fields', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+    IOLoop.current().run_sync(lambda: run(options))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,8 @@ import warnings
 
 """Test Motor, an asynchronous driver for MongoDB and Tornado."""
 
+from pymongo import InsertOne
+from pymongo.errors import InvalidOperation
 from tornado.testing import gen_test
 
 from motor import MotorGridFS
@@ -131,6 +133,49 @@ class MotorTestAwait(MotorTest):
         self.assertEqual(len(chunks), len(data))
         self.assertEqual(b''.join(chunks), data)
 
+    @gen_test
+    async def test_bulk_stream(self):
+        await self.collection.delete_many({})
+        async with self.collection.bulk_stream(batch_size=3) as stream:
+            for i in range(10):
+                await stream.add(InsertOne({'_id': i}))
+
+        self.assertEqual(10, stream.result['nInserted'])
+        self.assertEqual(10, await self.collection.count())
+
+    @gen_test
+    async def test_bulk_stream_error(self):
+        await self.collection.delete_many({})
+        with self.assertRaises(ZeroDivisionError):
+            async with self.collection.bulk_stream(batch_size=3) as stream:
+                for i in range(10):
+                    await stream.add(InsertOne({'_id': i}))
+
+                1 / 0
+
+        # Full batches were sent, the last one was discarded.
+        self.assertEqual(9, stream.result['nInserted'])
+        self.assertEqual(9, await self.collection.count())
+
+    @gen_test
+    async def test_bulk_stream_error_waiting(self):
+        await self.collection.delete_many({})
+        futures = []
+        with self.assertRaises(ZeroDivisionError):
+            async with self.collection.bulk_stream(
+                    batch_size=3, max_in_flight=1) as stream:
+                for i in range(9):
+                    futures.append(stream.add(InsertOne({'_id': i})))
+
+                1 / 0
+
+        # The first batch was sent, the two waiting for it were dropped.
+        self.assertEqual(3, stream.result['nInserted'])
+        self.assertEqual(3, await self.collection.count())
+        for future in futures[5], futures[8]:
+            with self.assertRaises(InvalidOperation):
+                await future
+
     @gen_test
     async def test_stream_to_handler(self):
         fs = MotorGridFS(self.db)
@@ -18,11 +18,14 @@ from __future__ import unicode_literals
 
 import unittest
 
-from pymongo.errors import BulkWriteError
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, InvalidOperation
+from pymongo.results import BulkWriteResult
 from tornado.testing import gen_test
 
 import motor
 import motor.motor_tornado
+from motor import motor_bulk
 from test.tornado_tests import MotorTest
 
 
@@ -99,5 +102,135 @@ class MotorBulkTest(MotorTest):
             set([1, 2]),
             set(a_values))
 
+    @gen_test(timeout=30)
+    def test_parallel_bulk_write(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_many([{'_id': 1500}, {'_id': 2200}])
+
+        # Several chunks of the server's max write batch size.
+        requests = [InsertOne({'_id': i}) for i in range(2500)]
+        requests.append(UpdateOne({'_id': 'x'}, {'$set': {'a': 1}},
+                                  upsert=True))
+
+        with self.assertRaises(BulkWriteError) as context:
+            yield self.collection.parallel_bulk_write(
+                requests, max_workers=2)
+
+        result = context.exception.details
+        self.assertEqual(2498, result['nInserted'])
+        self.assertEqual(1, result['nUpserted'])
+        self.assertEqual([1500, 2200],
+                         [error['index'] for error in result['writeErrors']])
+
+        self.assertEqual([{'index': 2500, '_id': 'x'}], result['upserted'])
+        self.assertEqual(2501, (yield self.collection.count()))
+
+        result = yield self.collection.parallel_bulk_write(
+            [DeleteMany({}), InsertOne({})])
+
+        self.assertIsInstance(result, BulkWriteResult)
+        self.assertEqual(2501, result.deleted_count)
+        self.assertEqual(1, result.inserted_count)
+
+    @gen_test
+    def test_execute_parallel(self):
+        yield self.collection.delete_many({})
+        bulk = self.collection.initialize_unordered_bulk_op()
+        for i in range(2500):
+            bulk.insert({'_id': i})
+
+        bulk.find({'_id': 5}).update_one({'$set': {'a': 1}})
+        result = yield bulk.execute_parallel(max_workers=3)
+        self.assertEqual(2500, result['nInserted'])
+        self.assertEqual(1, result['nMatched'])
+        self.assertEqual([], result['writeErrors'])
+        self.assertEqual(2500, (yield self.collection.count()))
+
+        with self.assertRaises(InvalidOperation):
+            yield bulk.execute_parallel()
+
+        bulk = self.collection.initialize_ordered_bulk_op()
+        bulk.insert({})
+        self.assertRaises(InvalidOperation, bulk.execute_parallel)
+
+    @gen_test
+    def test_parallel_writes_invalidate_cache(self):
+        collection = self.collection
+        yield collection.delete_many({})
+        collection.enable_cache(ttl=60)
+        try:
+            self.assertEqual(0, (yield collection.count()))
+            yield collection.parallel_bulk_write([InsertOne({})])
+            self.assertEqual(1, (yield collection.count()))
+
+            bulk = collection.initialize_unordered_bulk_op()
+            bulk.insert({})
+            yield bulk.execute_parallel()
+            self.assertEqual(2, (yield collection.count()))
+        finally:
+            collection.disable_cache()
+
+    @gen_test
+    def test_bulk_stream(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_one({'_id': 15})
+        stream = self.collection.bulk_stream(batch_size=10, max_in_flight=1)
+        for i in range(10):
+            future = stream.add(InsertOne({'_id': i}))
+            self.assertTrue(future.done())
+
+        # The first batch is in flight, so the second must wait.
+        for i in range(10, 20):
+            future = stream.add(InsertOne({'_id': i}))
+
+        self.assertFalse(future.done())
+        yield future
+        stream.add(UpdateOne({'_id': 'x'}, {'$set': {'a': 1}}, upsert=True))
+        stream.add(DeleteOne({'_id': 0}))
+        result = yield stream.close()
+        self.assertIs(result, stream.result)
+        self.assertEqual(19, result['nInserted'])
+        self.assertEqual(1, result['nUpserted'])
+        self.assertEqual(1, result['nRemoved'])
+        self.assertEqual([15],
+                         [error['index'] for error in result['writeErrors']])
+
+        self.assertEqual([{'index': 20, '_id': 'x'}], result['upserted'])
+        self.assertEqual(20, (yield self.collection.count()))
+        self.assertRaises(InvalidOperation, stream.add, InsertOne({}))
+
+    @gen_test
+    def test_bulk_stream_ordered(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_one({'_id': 5})
+        stream = self.collection.bulk_stream(ordered=True, batch_size=10)
+        for i in range(30):
+            stream.add(InsertOne({'_id': i}))
+
+        result = yield stream.close()
+
+        # The first batch stopped at the error and later ones weren't sent.
+        self.assertEqual(5, result['nInserted'])
+        self.assertEqual([5],
+                         [error['index'] for error in result['writeErrors']])
+
+        self.assertEqual(6, (yield self.collection.count()))
+        self.assertEqual({'nInserted': 0, 'nUpserted': 0, 'nMatched': 0,
+                          'nModified': 0, 'nRemoved': 0, 'upserted': [],
+                          'writeErrors': [], 'writeConcernErrors': []},
+                         (yield self.collection.bulk_stream().close()))
+
+        self.assertRaises(ValueError, self.collection.bulk_stream,
+                          batch_size=0)
+        self.assertRaises(ValueError, self.collection.bulk_stream,
+                          max_in_flight=0)
+        self.assertRaises(TypeError, stream.add, {'_id': 1})
+
+    def test_merge_unacknowledged(self):
+        self.assertIsNone(motor_bulk.merge([(0, None), (5, None)]))
+        result = motor_bulk.merge([(0, None), (5, {'nInserted': 2})])
+        self.assertEqual(2, result['nInserted'])
+        self.assertNotIn('nModified', result)
+
 if __name__ == '__main__':
     unittest.main()
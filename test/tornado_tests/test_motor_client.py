@@ -16,6 +16,7 @@ from __future__ import unicode_literals
 
 """Test Motor, an asynchronous driver for MongoDB and Tornado."""
 
+import gc
 import os
 import unittest
 
@@ -215,6 +216,90 @@ class MotorClientTest(MotorTest):
         finally:
             yield db.remove_user('mike')
 
+    @gen_test
+    def test_cursor_reaper(self):
+        yield self.make_test_data()
+        client = self.motor_client()
+        reaper = client.start_cursor_reaper(interval=0.1)
+        self.assertIs(reaper, client.start_cursor_reaper())
+        collection = client[self.db.name][self.collection.name]
+
+        # Abandoned before it's exhausted.
+        cursor = collection.find().batch_size(2)
+        yield cursor.fetch_next
+        self.assertEqual(1, reaper.tracked)
+        del cursor
+        gc.collect()
+        yield gen.sleep(0.5)
+        self.assertEqual(1, reaper.leaked)
+        self.assertEqual(1, reaper.batches)
+        self.assertEqual(0, reaper.tracked)
+
+        # Exhausted cursors are forgotten without a kill.
+        yield collection.find().to_list(None)
+        yield gen.sleep(0.5)
+        self.assertEqual(0, reaper.tracked)
+        self.assertEqual(1, reaper.batches)
+
+        reaper.stop()
+        client.close()
+
+    @gen_test
+    def test_cursor_reaper_idle_timeout(self):
+        yield self.make_test_data()
+        client = self.motor_client()
+        reaper = client.start_cursor_reaper(interval=0.1, idle_timeout=0.2)
+        collection = client[self.db.name][self.collection.name]
+        cursor = collection.find().batch_size(2)
+        yield cursor.fetch_next
+        yield gen.sleep(0.6)
+        self.assertTrue(cursor._timed_out)
+        self.assertEqual(1, reaper.timed_out)
+
+        # The rest of the first batch is still available.
+        for _ in range(2):
+            self.assertTrue((yield cursor.fetch_next))
+            cursor.next_object()
+
+        # Then the results don't silently end.
+        with self.assertRaises(pymongo.errors.CursorNotFound):
+            yield cursor.fetch_next
+
+        with self.assertRaises(pymongo.errors.CursorNotFound):
+            yield cursor.to_list(None)
+
+        reaper.stop()
+        client.close()
+
+    @gen_test
+    def test_cursor_reaper_in_flight(self):
+        yield self.make_test_data()
+        client = self.motor_client()
+        reaper = client.start_cursor_reaper(interval=60, idle_timeout=1)
+        collection = client[self.db.name][self.collection.name]
+        cursor = collection.find().batch_size(2)
+        yield cursor.fetch_next
+        for _ in range(2):
+            cursor.next_object()
+
+        # A cursor long past the idle timeout, but waiting for a getMore.
+        future = cursor.fetch_next
+        for entry in reaper._entries.values():
+            entry[2] = 0
+
+        reaper._reap()
+        self.assertEqual(0, reaper.timed_out)
+        self.assertEqual(1, reaper.tracked)
+        self.assertTrue((yield future))
+        self.assertFalse(cursor._timed_out)
+        reaper.stop()
+        client.close()
+
+    def test_cursor_reaper_args(self):
+        self.assertRaises(ValueError, self.cx.start_cursor_reaper, 0)
+        self.assertRaises(ValueError, self.cx.start_cursor_reaper,
+                          idle_timeout=-1)
+
     def test_get_database(self):
         codec_options = CodecOptions(tz_aware=True)
         write_concern = WriteConcern(w=2, j=True)
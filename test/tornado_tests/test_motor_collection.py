@@ -16,17 +16,24 @@ from __future__ import unicode_literals
 
 """Test Motor, an asynchronous driver for MongoDB and Tornado."""
 
+import io
+import os
 import sys
+import tempfile
 import traceback
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 
 import bson
-from bson import CodecOptions
+from bson import CodecOptions, json_util
 from bson.binary import JAVA_LEGACY
+from bson.errors import InvalidDocument
 from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 from pymongo import ReadPreference, WriteConcern
 from pymongo.read_preferences import Secondary
-from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.errors import (BulkWriteError, DuplicateKeyError,
+                            InvalidOperation, OperationFailure, WriteError)
 from tornado import gen
 from tornado.concurrent import Future
 from tornado.testing import gen_test
@@ -444,6 +451,583 @@ class MotorCollectionTest(MotorTest):
         yield [f(cursor) for cursor in cursors]
         self.assertEqual(len(docs), (yield collection.count()))
 
+    @gen_test(timeout=30)
+    def test_find_partitioned(self):
+        if not (yield at_least(self.cx, (3, 2))):
+            raise SkipTest("$sample requires MongoDB >= 3.2")
+
+        yield self.collection.delete_many({})
+        yield self.collection.insert_many({'_id': i} for i in range(1000))
+
+        cursor = self.collection.find_partitioned(4, batch_size=50)
+        self.assertTrue(isinstance(cursor,
+                                   motor.motor_tornado.MotorPartitionedCursor))
+        self.assertFalse(cursor.started)
+
+        ids = []
+        while (yield cursor.fetch_next):
+            ids.append(cursor.next_object()['_id'])
+
+        self.assertEqual(list(range(1000)), sorted(ids))
+        self.assertTrue(1 < len(cursor.cursors) <= 4)
+
+        # Ordered, with a filter.
+        cursor = self.collection.find_partitioned(
+            4, {'_id': {'$gte': 500}}, ordered=True, batch_size=50)
+
+        ids = []
+        while (yield cursor.fetch_next):
+            ids.append(cursor.next_object()['_id'])
+
+        self.assertEqual(list(range(500, 1000)), ids)
+
+        # Closed before the split points are chosen: no partitions start.
+        cursor = self.collection.find_partitioned(4)
+        future = cursor.fetch_next
+        yield cursor.close()
+        self.assertFalse((yield future))
+        yield gen.sleep(0.5)
+        self.assertIsNone(cursor.cursors)
+
+    @gen_test(timeout=30)
+    def test_find_partitioned_split_vector(self):
+        yield skip_if_mongos(self.cx)
+        yield self.collection.delete_many({})
+        yield self.collection.insert_many(
+            {'_id': i, 's': 'x' * 1000} for i in range(1000))
+
+        cursor = self.collection.find_partitioned(
+            4, split='splitVector', ordered=True)
+
+        ids = []
+        while (yield cursor.fetch_next):
+            ids.append(cursor.next_object()['_id'])
+
+        self.assertEqual(list(range(1000)), ids)
+        self.assertTrue(1 < len(cursor.cursors) <= 4)
+
+        # Split on a dotted key.
+        collection = self.db.test_partitioned
+        try:
+            yield collection.create_index('a.b')
+            yield collection.insert_many(
+                {'_id': i, 'a': {'b': i}, 's': 'x' * 1000}
+                for i in range(1000))
+
+            cursor = collection.find_partitioned(
+                4, key='a.b', split='splitVector', ordered=True)
+
+            ids = []
+            while (yield cursor.fetch_next):
+                ids.append(cursor.next_object()['_id'])
+
+            self.assertEqual(list(range(1000)), ids)
+            self.assertTrue(1 < len(cursor.cursors) <= 4)
+        finally:
+            yield collection.drop()
+
+    def test_find_partitioned_args(self):
+        find_partitioned = self.collection.find_partitioned
+        self.assertRaises(ValueError, find_partitioned, 0)
+        self.assertRaises(ValueError, find_partitioned, 2, split='foo')
+        self.assertRaises(InvalidOperation, find_partitioned, 2,
+                          ordered=True, sort=[('a', 1)])
+        self.assertRaises(InvalidOperation, find_partitioned, 2, limit=10)
+        self.assertRaises(InvalidOperation, find_partitioned, 2, skip=10)
+
+    @gen_test
+    def test_export(self):
+        yield self.make_test_data()
+        reports = []
+
+        def progress(documents, nbytes, rate):
+            reports.append((documents, nbytes))
+
+        fileobj = io.BytesIO()
+        n = yield self.collection.export(fileobj,
+                                         filter={'_id': {'$lt': 150}},
+                                         batch_size=10,
+                                         progress=progress)
+
+        # Progress reports are scheduled on the loop before export finishes.
+        yield gen.moment
+        self.assertEqual(150, n)
+        docs = bson.decode_all(fileobj.getvalue())
+        self.assertEqual(list(range(150)), sorted(d['_id'] for d in docs))
+        self.assertEqual((150, len(fileobj.getvalue())), reports[-1])
+
+    @gen_test
+    def test_export_jsonl(self):
+        yield self.make_test_data()
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            n = yield self.collection.export(path, format='jsonl',
+                                             projection={'_id': 1})
+            self.assertEqual(200, n)
+            with open(path) as f:
+                ids = [json_util.loads(line)['_id'] for line in f]
+        finally:
+            os.remove(path)
+
+        self.assertEqual(list(range(200)), sorted(ids))
+
+    @gen_test
+    def test_export_parallel(self):
+        yield skip_if_mongos(self.cx)
+        yield self.make_test_data()
+        fileobj = io.BytesIO()
+        n = yield self.collection.export(fileobj, parallel=3)
+        self.assertEqual(200, n)
+        docs = bson.decode_all(fileobj.getvalue())
+        self.assertEqual(list(range(200)), sorted(d['_id'] for d in docs))
+
+    def test_export_args(self):
+        export = self.collection.export
+        self.assertRaises(ValueError, export, io.BytesIO(), format='csv')
+        self.assertRaises(ValueError, export, io.BytesIO(), parallel=0)
+        self.assertRaises(InvalidOperation, export, io.BytesIO(),
+                          filter={'a': 1}, parallel=2)
+
+    @gen_test
+    def test_import_file(self):
+        yield self.make_test_data()
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        target = self.db.test_import
+        try:
+            yield self.collection.export(path)
+            yield target.delete_many({})
+
+            # Each document is 14 bytes, so this makes 20 batches of 10.
+            result = yield target.import_file(path, batch_bytes=140)
+            self.assertEqual(200, result['nInserted'])
+            self.assertEqual(20, result['nBatches'])
+            self.assertEqual([], result['errors'])
+            self.assertEqual(200, (yield target.count()))
+
+            # Every document is a duplicate now, but all batches are tried.
+            result = yield target.import_file(path, batch_bytes=140,
+                                              concurrency=2)
+            self.assertEqual(0, result['nInserted'])
+            self.assertEqual(20, len(result['errors']))
+            self.assertEqual(list(range(0, 200, 10)),
+                             sorted(e['offset'] for e in result['errors']))
+        finally:
+            os.remove(path)
+            yield target.drop()
+
+    @gen_test
+    def test_import_file_jsonl(self):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            for i in range(100):
+                f.write(json_util.dumps({'_id': i}) + '\n')
+
+        target = self.db.test_import
+        try:
+            yield target.delete_many({})
+            # Batches are limited by BSON size, 14 bytes per document, not
+            # by the length of each line.
+            result = yield target.import_file(path, format='jsonl',
+                                              batch_bytes=140)
+            self.assertEqual(100, result['nInserted'])
+            self.assertEqual(10, result['nBatches'])
+            docs = yield target.find().sort('_id').to_list(None)
+            self.assertEqual([{'_id': i} for i in range(100)], docs)
+        finally:
+            os.remove(path)
+            yield target.drop()
+
+    def test_import_file_args(self):
+        import_file = self.collection.import_file
+        self.assertRaises(ValueError, import_file, 'x', format='csv')
+        self.assertRaises(ValueError, import_file, 'x', concurrency=0)
+
+    @gen_test
+    def test_query_cache(self):
+        yield self.make_test_data()
+        collection = self.collection
+        cache = collection.enable_cache(ttl=60)
+        try:
+            doc = yield collection.find_one({'_id': 1})
+            self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+            # Callers get their own copies.
+            doc['x'] = 1
+            doc = yield collection.find_one({'_id': 1})
+            self.assertEqual({'_id': 1}, doc)
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+            cursor = collection.find({'_id': {'$lt': 5}}).sort('_id')
+            docs = yield cursor.to_list(10)
+            cursor = collection.find({'_id': {'$lt': 5}}).sort('_id')
+            self.assertEqual(docs, (yield cursor.to_list(10)))
+            self.assertEqual((2, 2), (cache.hits, cache.misses))
+            self.assertFalse(cursor.alive)
+
+            # A different sort is a different query.
+            cursor = collection.find({'_id': {'$lt': 5}}).sort('_id', -1)
+            self.assertEqual(docs[::-1], (yield cursor.to_list(10)))
+            self.assertEqual((2, 3), (cache.hits, cache.misses))
+
+            # Writes through this collection invalidate its results.
+            yield collection.delete_one({'_id': 1})
+            self.assertEqual(0, len(cache))
+            self.assertIsNone((yield collection.find_one({'_id': 1})))
+        finally:
+            collection.disable_cache()
+
+    @gen_test
+    def test_query_cache_types(self):
+        collection = self.collection
+        yield collection.delete_many({})
+        yield collection.insert_many([{'_id': 'bool', 'a': True},
+                                      {'_id': 'int', 'a': 1}])
+        cache = collection.enable_cache(ttl=60)
+        try:
+            # Equal in Python, but not in MongoDB.
+            doc = yield collection.find_one({'a': True})
+            self.assertEqual('bool', doc['_id'])
+            doc = yield collection.find_one({'a': 1})
+            self.assertEqual('int', doc['_id'])
+            self.assertEqual((0, 2), (cache.hits, cache.misses))
+        finally:
+            collection.disable_cache()
+
+    @gen_test
+    def test_query_cache_options(self):
+        yield self.make_test_data()
+        collection = self.collection
+        son_collection = collection.with_options(
+            codec_options=CodecOptions(document_class=bson.SON))
+
+        cache = collection.enable_cache(ttl=60)
+        son_collection.enable_cache(cache=cache)
+        try:
+            # Collections sharing a cache get results decoded their own way.
+            doc = yield collection.find_one({'_id': 1})
+            self.assertIs(dict, type(doc))
+            doc = yield son_collection.find_one({'_id': 1})
+            self.assertIs(bson.SON, type(doc))
+            docs = yield son_collection.find({'_id': 1}).to_list(None)
+            self.assertIs(bson.SON, type(docs[0]))
+            docs = yield collection.find({'_id': 1}).to_list(None)
+            self.assertIs(dict, type(docs[0]))
+            self.assertEqual((0, 4), (cache.hits, cache.misses))
+
+            # Cursor options are part of the key.
+            yield collection.find({'_id': 1}).hint('_id_').to_list(None)
+            yield collection.find({'_id': 1}).comment('c').to_list(None)
+            yield collection.find({'_id': 1}).max_time_ms(1000).to_list(None)
+            self.assertEqual((0, 7), (cache.hits, cache.misses))
+        finally:
+            collection.disable_cache()
+            son_collection.disable_cache()
+
+    @gen_test
+    def test_query_cache_expiration(self):
+        yield self.make_test_data()
+        collection = self.collection
+        cache = collection.enable_cache(ttl=0.1, max_size=2)
+        try:
+            for i in range(3):
+                yield collection.find_one({'_id': i})
+
+            self.assertEqual(2, len(cache))
+            self.assertEqual(1, cache.evictions)
+
+            yield collection.find_one({'_id': 2})
+            self.assertEqual(1, cache.hits)
+
+            yield gen.sleep(0.2)
+            yield collection.find_one({'_id': 2})
+            self.assertEqual(1, cache.hits)
+        finally:
+            collection.disable_cache()
+
+    @gen_test
+    def test_single_flight(self):
+        yield self.make_test_data()
+        collection = self.collection
+        collection.enable_single_flight()
+        futures = [collection.find_one({'_id': 1}) for _ in range(10)]
+        futures.append(collection.count())
+        self.assertEqual(2, len(collection._single_flight))
+        results = yield futures
+        self.assertEqual([{'_id': 1}] * 10 + [200], results)
+
+        # Each caller has its own copy.
+        self.assertEqual(10, len(set(id(doc) for doc in results[:10])))
+        self.assertEqual({}, collection._single_flight)
+
+        # Reads after a write don't share reads from before it.
+        future = collection.find_one({'_id': 2})
+        delete = collection.delete_one({'_id': 2})
+        self.assertEqual({}, collection._single_flight)
+        yield [future, delete]
+        collection.disable_single_flight()
+
+    @gen_test
+    def test_single_flight_types(self):
+        collection = self.collection
+        yield collection.delete_many({})
+        yield collection.insert_many([{'_id': 'bool', 'a': True},
+                                      {'_id': 'int', 'a': 1}])
+        collection.enable_single_flight()
+        try:
+            # Equal in Python, but not in MongoDB: the reads aren't shared.
+            futures = [collection.find_one({'a': True}),
+                       collection.find_one({'a': 1})]
+            self.assertEqual(2, len(collection._single_flight))
+            results = yield futures
+            self.assertEqual(['bool', 'int'],
+                             [doc['_id'] for doc in results])
+        finally:
+            collection.disable_single_flight()
+
+    def test_query_cache_args(self):
+        self.assertRaises(ValueError, self.collection.enable_cache, ttl=0)
+        self.assertRaises(ValueError, self.collection.enable_cache,
+                          max_size=0)
+
+    @gen_test
+    def test_loader(self):
+        yield self.make_test_data()
+        loader = self.collection.loader(max_batch_size=2)
+        futures = [loader.load(i) for i in (3, 1, 2, 1000, 0)]
+        self.assertIs(futures[1], loader.load(1))
+
+        # One queue of keys for this loop iteration, sent in three queries.
+        self.assertEqual(5, len(loader._queue))
+        docs = yield futures
+        self.assertEqual([{'_id': 3}, {'_id': 1}, {'_id': 2}, None,
+                          {'_id': 0}], docs)
+
+        docs = yield loader.load_many([0, 5])
+        self.assertEqual([{'_id': 0}, {'_id': 5}], docs)
+        self.assertEqual([], (yield loader.load_many([])))
+
+        # Loaded values are remembered until cleared.
+        yield self.collection.delete_one({'_id': 0})
+        self.assertEqual({'_id': 0}, (yield loader.load(0)))
+        loader.clear(0)
+        self.assertIsNone((yield loader.load(0)))
+
+    @gen_test
+    def test_loader_types(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_many([{'_id': 1, 'k': True},
+                                           {'_id': 2, 'k': 1},
+                                           {'_id': 3, 'k': {'a': 1}}])
+        loader = self.collection.loader(key='k')
+        futures = [loader.load(True), loader.load(1), loader.load({'a': 1})]
+
+        # Like MongoDB, 1 and 1.0 are equal, but True and 1 aren't.
+        self.assertIs(futures[1], loader.load(1.0))
+        docs = yield futures
+        self.assertEqual([1, 2, 3], [doc['_id'] for doc in docs])
+
+    def test_loader_args(self):
+        self.assertRaises(ValueError, self.collection.loader,
+                          max_batch_size=0)
+
+        loader = self.collection.loader()
+        self.assertRaises(TypeError, loader.load, {'a': bytearray()})
+
+    @gen_test
+    def test_buffered_writer(self):
+        yield self.collection.delete_many({})
+        writer = self.collection.buffered_writer(max_docs=3, max_delay_ms=50)
+        futures = [writer.insert_one({'_id': i}) for i in range(5)]
+
+        # The first three were sent, the last two wait for the timer.
+        self.assertEqual(2, len(writer._docs))
+        results = yield futures
+        self.assertEqual(list(range(5)), [r.inserted_id for r in results])
+        self.assertEqual(5, (yield self.collection.count()))
+
+        doc = {}
+        future = writer.insert_one(doc)
+        self.assertIn('_id', doc)
+        yield writer.flush()
+        self.assertEqual(doc['_id'], (yield future).inserted_id)
+
+        # A raw document without "_id" gets one before it's sent.
+        future = writer.insert_one(RawBSONDocument(bson.BSON.encode({'a': 1})))
+        yield writer.flush()
+        _id = (yield future).inserted_id
+        self.assertIsInstance(_id, ObjectId)
+        self.assertEqual({'_id': _id, 'a': 1},
+                         (yield self.collection.find_one(_id)))
+
+        # No delay: each document is sent immediately.
+        writer = self.collection.buffered_writer(max_delay_ms=0)
+        future = writer.insert_one({})
+        self.assertEqual(0, len(writer._docs))
+        yield future
+
+    @gen_test
+    def test_buffered_writer_errors(self):
+        yield self.collection.delete_many({})
+        writer = self.collection.buffered_writer()
+        first = writer.insert_one({'_id': 1})
+        second = writer.insert_one({'_id': 1})
+        third = writer.insert_one({'_id': 2})
+        yield writer.flush()
+        self.assertEqual(1, (yield first).inserted_id)
+        with self.assertRaises(DuplicateKeyError):
+            yield second
+
+        self.assertEqual(2, (yield third).inserted_id)
+
+        with self.assertRaises(InvalidDocument):
+            yield writer.insert_one({'$bad': 1})
+
+    def test_buffered_writer_args(self):
+        buffered_writer = self.collection.buffered_writer
+        self.assertRaises(ValueError, buffered_writer, max_docs=0)
+        self.assertRaises(ValueError, buffered_writer, max_bytes=0)
+        self.assertRaises(ValueError, buffered_writer, max_delay_ms=-1)
+
+    @gen_test
+    def test_coalescing_updater(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_many([{'_id': 1}, {'_id': 2}])
+        updater = self.collection.coalescing_updater(interval_ms=50)
+        futures = [
+            updater.update_one(1, {'$inc': {'n': 1}}),
+            updater.update_one(1, {'$inc': {'n': 2}, '$set': {'s': 'a'}}),
+            updater.update_one(1, {'$set': {'s': 'b'},
+                                   '$addToSet': {'tags': 'x'}}),
+            updater.update_one(1, {'$addToSet': {'tags': {'$each': ['x',
+                                                                    'y']}}}),
+            updater.update_one(2, {'$inc': {'n': 5}})]
+
+        # Conflicts with the pending $inc of "n", so it's sent separately.
+        futures.append(updater.update_one(1, {'$set': {'n': 10}}))
+        yield futures
+
+        self.assertEqual({'_id': 1, 'n': 10, 's': 'b', 'tags': ['x', 'y']},
+                         (yield self.collection.find_one(1)))
+
+        self.assertEqual({'_id': 2, 'n': 5},
+                         (yield self.collection.find_one(2)))
+
+        # Incrementing a string fails, both callers see the error.
+        futures = [updater.update_one(1, {'$inc': {'s': 1}}),
+                   updater.update_one(1, {'$inc': {'s': 1}}),
+                   updater.update_one(2, {'$inc': {'n': 1}})]
+
+        yield updater.flush()
+        for future in futures[:2]:
+            with self.assertRaises(WriteError):
+                future.result()
+
+        self.assertIsNone(futures[2].result())
+        self.assertEqual(6, (yield self.collection.find_one(2))['n'])
+
+    @gen_test
+    def test_coalescing_updater_types(self):
+        yield self.collection.delete_many({})
+        yield self.collection.insert_one({'_id': 1})
+        updater = self.collection.coalescing_updater(interval_ms=50)
+        futures = [updater.update_one(1, {'$addToSet': {'tags': True}}),
+                   updater.update_one(1, {'$addToSet': {'tags': 1}})]
+
+        # True and 1 are equal in Python, but both are added.
+        yield futures
+        doc = yield self.collection.find_one(1)
+        self.assertEqual([True, 1], doc['tags'])
+        self.assertIs(True, doc['tags'][0])
+
+    def test_coalescing_updater_args(self):
+        updater = self.collection.coalescing_updater()
+        self.assertRaises(ValueError, self.collection.coalescing_updater,
+                          interval_ms=0)
+        self.assertRaises(ValueError, self.collection.coalescing_updater,
+                          max_pending=0)
+        self.assertRaises(TypeError, updater.update_one, 1, {})
+        self.assertRaises(ValueError, updater.update_one, 1,
+                          {'$push': {'a': 1}})
+
+        # A bad update leaves the pending update for this document unchanged.
+        updater.update_one(2, {'$inc': {'n': 1}, '$set': {'s': 1}})
+        self.assertRaises(TypeError, updater.update_one, 2,
+                          {'$inc': {'n': 1, 'm': 'x'}})
+        self.assertRaises(TypeError, updater.update_one, 2,
+                          {'$set': {'t': 1}, '$addToSet': {'a': {'$each': 1}}})
+        self.assertRaises(TypeError, updater.update_one, 3,
+                          {'$inc': {'n': 'x'}})
+        self.assertEqual({'$inc': {'n': 1}, '$set': {'s': 1}},
+                         updater._pending[2].document())
+        self.assertNotIn(3, updater._pending)
+
+    @gen_test(timeout=30)
+    def test_pipelined_insert_many(self):
+        yield self.collection.delete_many({})
+        docs = [{'i': i} for i in range(2500)]
+        result = yield self.collection.pipelined_insert_many(
+            docs, batch_size=1000)
+
+        self.assertTrue(result.acknowledged)
+        self.assertEqual([doc['_id'] for doc in docs], result.inserted_ids)
+        self.assertEqual(2500, (yield self.collection.count()))
+
+        # Ordered: the second batch fails and the third isn't sent.
+        yield self.collection.delete_many({})
+        yield self.collection.insert_one({'_id': 1500})
+        with self.assertRaises(BulkWriteError) as context:
+            yield self.collection.pipelined_insert_many(
+                [{'_id': i} for i in range(2500)], batch_size=1000)
+
+        details = context.exception.details
+        self.assertEqual(1500, details['nInserted'])
+        self.assertEqual([1500],
+                         [error['index'] for error in details['writeErrors']])
+
+        yield self.collection.delete_many({'_id': {'$ne': 1500}})
+        with self.assertRaises(BulkWriteError) as context:
+            yield self.collection.pipelined_insert_many(
+                [{'_id': i} for i in range(2500)], ordered=False,
+                batch_size=1000)
+
+        self.assertEqual(2499, context.exception.details['nInserted'])
+        self.assertEqual(2500, (yield self.collection.count()))
+
+        with self.assertRaises(InvalidDocument):
+            yield self.collection.pipelined_insert_many([{'$a': 1}])
+
+        self.assertRaises(TypeError, self.collection.pipelined_insert_many, [])
+        self.assertRaises(ValueError, self.collection.pipelined_insert_many,
+                          [{}], batch_size=0)
+
+    @gen_test(timeout=30)
+    def test_pipelined_insert_many_processes(self):
+        yield self.collection.delete_many({})
+        docs = [{'i': i} for i in range(250)]
+
+        # A raw document without "_id" gets one before it's sent.
+        raw = RawBSONDocument(bson.BSON.encode({'i': 250}))
+        executor = ProcessPoolExecutor(max_workers=2)
+        try:
+            result = yield self.collection.pipelined_insert_many(
+                docs + [raw], batch_size=100, executor=executor)
+        finally:
+            executor.shutdown()
+
+        ids = [doc['_id'] for doc in docs]
+        self.assertEqual(ids, result.inserted_ids[:250])
+        raw_id = result.inserted_ids[250]
+        self.assertIsInstance(raw_id, ObjectId)
+        self.assertEqual({'_id': raw_id, 'i': 250},
+                         (yield self.collection.find_one({'i': 250})))
+
+        yield self.collection.delete_one({'i': 250})
+        cursor = self.collection.find({}, {'_id': 0}).sort('i')
+        self.assertEqual([{'i': i} for i in range(250)],
+                         (yield cursor.to_list(None)))
+
     def test_with_options(self):
         coll = self.db.test
         codec_options = CodecOptions(
@@ -20,12 +20,14 @@ import sys
 import traceback
 import unittest
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 import pymongo
 from mockupdb import OpQuery
 from mockupdb import OpKillCursors
 from tornado import gen
 from tornado.concurrent import Future
+from tornado.queues import Queue
 from tornado.testing import gen_test
 from pymongo import CursorType
 from pymongo.errors import InvalidOperation, ExecutionTimeout
@@ -184,6 +186,72 @@ class MotorCursorTest(MotorMockServerTest):
         expected = [{'_id': i} for i in range(200)]
         self.assertEqual(expected, results)
 
+    @gen_test
+    def test_each_batch(self):
+        yield self.make_test_data()
+        cursor = self.collection.find({}, {'_id': 1}).sort('_id')
+        cursor.batch_size(50)
+        future = Future()
+        batches = []
+
+        def callback(batch, error):
+            if error:
+                raise error
+
+            if batch is not None:
+                batches.append(batch)
+            else:
+                # Done iterating.
+                future.set_result(True)
+
+        cursor.each_batch(callback)
+        yield future
+        self.assertTrue(all(batches))
+        expected = [{'_id': i} for i in range(200)]
+        self.assertEqual(expected, sum(batches, []))
+
+    @gen_test
+    def test_each_batch_cancel(self):
+        yield self.make_test_data()
+        cursor = self.collection.find().batch_size(10)
+        future = Future()
+        batches = []
+
+        def callback(batch, error):
+            batches.append(batch)
+            self.io_loop.add_callback(future.set_result, True)
+            return False  # Cancel iteration.
+
+        cursor.each_batch(callback)
+        yield future
+        self.assertEqual(1, len(batches))
+        self.assertTrue(cursor.alive)
+        yield cursor.close()
+
+    @gen_test
+    def test_decode_in_processes(self):
+        yield self.make_test_data()
+        executor = ProcessPoolExecutor(max_workers=2)
+        try:
+            cursor = self.collection.find().sort('_id').batch_size(50)
+            self.assertIs(cursor, cursor.decode_in_processes(executor))
+
+            # Part of the first batch, then the rest of it and later batches.
+            docs = yield cursor.to_list(10)
+            docs += yield cursor.to_list(None)
+            self.assertEqual([{'_id': i} for i in range(200)], docs)
+
+            cursor = self.collection.find().decode_in_processes(executor)
+            ids = []
+            while (yield cursor.fetch_next):
+                ids.append(cursor.next_object()['_id'])
+
+            self.assertEqual(200, len(ids))
+            self.assertRaises(InvalidOperation,
+                              cursor.decode_in_processes, executor)
+        finally:
+            executor.shutdown()
+
     @gen_test
     def test_to_list_argument_checking(self):
         # We need more than 10 documents so the cursor stays alive.
@@ -486,6 +554,123 @@ class MotorCursorTest(MotorMockServerTest):
 
         self.assertEqual(0, len(w))
 
+    @gen_test
+    def test_to_queue(self):
+        yield self.make_test_data()
+        cursor = self.collection.find().sort('_id').batch_size(10)
+        queue = cursor.to_queue(5)
+        self.assertEqual(5, queue.maxsize)
+
+        ids = []
+        while True:
+            doc = yield queue.get()
+            if doc is None:
+                break
+
+            ids.append(doc['_id'])
+
+        self.assertEqual(list(range(200)), ids)
+
+    @gen_test
+    def test_stream_into_error(self):
+        queue = Queue()
+        n = yield self.collection.find({'$foo': 1}).stream_into(queue)
+        self.assertEqual(0, n)
+        self.assertIsInstance((yield queue.get()), OperationFailure)
+
+    @gen_test
+    def test_stream_into_close(self):
+        yield self.make_test_data()
+        queue = Queue(maxsize=1)
+        cursor = self.collection.find().batch_size(10)
+        future = cursor.stream_into(queue)
+        yield queue.get()
+        yield cursor.close()
+
+        # The producer ends the stream with None, even though it's closed.
+        docs = 1
+        while (yield queue.get()) is not None:
+            docs += 1
+
+        n = yield future
+        self.assertLess(n, 200)
+        self.assertEqual(n, docs)
+
+    def test_stream_into_tailable(self):
+        cursor = self.collection.find(cursor_type=CursorType.TAILABLE)
+        with self.assertRaises(InvalidOperation):
+            cursor.stream_into(Queue())
+
+    @gen_test
+    def test_merged_cursor(self):
+        yield self.make_test_data()
+        coll = self.collection
+
+        def cursors(direction):
+            return [
+                coll.find({'_id': {'$mod': [3, r]}}).sort(
+                    '_id', direction).batch_size(10)
+                for r in range(3)]
+
+        merged = motor.motor_tornado.MotorMergedCursor(
+            cursors(pymongo.ASCENDING), '_id')
+
+        self.assertEqual(None, merged.next_object())  # Haven't fetched yet.
+        ids = []
+        while (yield merged.fetch_next):
+            ids.append(merged.next_object()['_id'])
+
+        self.assertEqual(list(range(200)), ids)
+        self.assertEqual(False, (yield merged.fetch_next))
+
+        merged = motor.motor_tornado.MotorMergedCursor(
+            cursors(pymongo.DESCENDING), [('_id', pymongo.DESCENDING)])
+
+        ids = []
+        while (yield merged.fetch_next):
+            ids.append(merged.next_object()['_id'])
+
+        self.assertEqual(list(reversed(range(200))), ids)
+
+    @gen_test
+    def test_merged_cursor_arrays(self):
+        coll = self.db.test_merged_arrays
+        yield coll.drop()
+        yield coll.insert_many([
+            {'_id': 0, 'a': [5, 1]},
+            {'_id': 1, 'a': 3},
+            {'_id': 2, 'a': [2, 9]},
+            {'_id': 3, 'a': []},
+            {'_id': 4},
+            {'_id': 5, 'a': 'x'},
+            {'_id': 6, 'a': [0, 's']},
+            {'_id': 7, 'a': [{'b': 4}]}])
+
+        # Merge the same order the server sorts in, arrays included.
+        for direction in pymongo.ASCENDING, pymongo.DESCENDING:
+            expected = yield coll.find().sort('a', direction).to_list(
+                None)
+            merged = motor.motor_tornado.MotorMergedCursor(
+                [coll.find({'_id': {'$mod': [2, r]}}).sort('a', direction)
+                 for r in range(2)],
+                'a', direction)
+
+            ids = []
+            while (yield merged.fetch_next):
+                ids.append(merged.next_object()['_id'])
+
+            self.assertEqual([doc['_id'] for doc in expected], ids)
+
+        yield coll.drop()
+
+    def test_merged_cursor_args(self):
+        MotorMergedCursor = motor.motor_tornado.MotorMergedCursor
+        cursor = self.collection.find()
+        self.assertRaises(ValueError, MotorMergedCursor, [], '_id')
+        self.assertRaises(TypeError, MotorMergedCursor, [{}], '_id')
+        self.assertRaises(ValueError,
+                          MotorMergedCursor, [cursor], [('_id', 'text')])
+
 
 class MotorCursorMaxTimeMSTest(MotorTest):
     def setUp(self):
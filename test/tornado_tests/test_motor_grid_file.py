@@ -18,12 +18,13 @@ from __future__ import unicode_literals
 """Test GridFS with Motor, an asynchronous driver for MongoDB and Tornado."""
 
 import datetime
+import hashlib
 import sys
 import traceback
 import unittest
 
 from bson.objectid import ObjectId
-from gridfs.errors import NoFile
+from gridfs.errors import CorruptGridFile, NoFile
 from tornado import gen
 from tornado.testing import gen_test
 from pymongo.errors import InvalidOperation
@@ -365,6 +366,138 @@ class MotorGridFileTest(MotorTest):
         self.assertEqual("a", g.bar)
         self.assertEqual("b", g.baz)
 
+    @gen_test
+    def test_read_ahead(self):
+        in_data = b'0123456789'
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3)
+        yield f.write(in_data)
+        yield f.close()
+
+        g = motor.MotorGridOut(self.db.fs, f._id)
+        self.assertIs(g, g.read_ahead(2))
+        self.assertEqual(b'012', (yield g.readchunk()))
+        self.assertEqual(b'34', (yield g.read(2)))
+        self.assertEqual(b'5', (yield g.readchunk()))
+        self.assertEqual(b'6789', (yield g.read()))
+        self.assertEqual(b'', (yield g.readchunk()))
+
+        g.seek(4)
+        self.assertEqual(b'45678', (yield g.read(5)))
+        g.seek(1)
+        self.assertEqual(b'12', (yield g.readchunk()))
+        self.assertEqual(b'3456789', (yield g.read()))
+
+        g = motor.MotorGridOut(self.db.fs, f._id).read_ahead(
+            8, max_buffer_size=3)
+
+        handler = MockRequestHandler()
+        yield g.stream_to_handler(handler)
+        self.assertEqual(10, handler.n_written)
+
+        yield self.db.fs.chunks.delete_one({'files_id': f._id, 'n': 2})
+        g = motor.MotorGridOut(self.db.fs, f._id).read_ahead()
+        with self.assertRaises(CorruptGridFile):
+            yield g.read()
+
+        self.assertRaises(ValueError, g.read_ahead, 0)
+        self.assertRaises(ValueError, g.read_ahead, max_buffer_size=0)
+
+    @gen_test
+    def test_stream_chunks(self):
+        in_data = b'0123456789'
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3)
+        yield f.write(in_data)
+        yield f.close()
+
+        g = motor.MotorGridOut(self.db.fs, f._id)
+        self.assertIs(g, g.stream_chunks(batch_size=2))
+        self.assertEqual(b'012', (yield g.readchunk()))
+        self.assertEqual(b'34', (yield g.read(2)))
+        self.assertEqual(b'56789', (yield g.read()))
+        self.assertEqual(b'', (yield g.readchunk()))
+
+        g.seek(4)
+        self.assertEqual(b'45678', (yield g.read(5)))
+
+        handler = MockRequestHandler()
+        g = motor.MotorGridOut(self.db.fs, f._id).stream_chunks()
+        yield g.stream_to_handler(handler)
+        self.assertEqual(10, handler.n_written)
+
+        yield self.db.fs.chunks.delete_one({'files_id': f._id, 'n': 2})
+        g = motor.MotorGridOut(self.db.fs, f._id).stream_chunks()
+        with self.assertRaises(CorruptGridFile):
+            yield g.read()
+
+        self.assertRaises(ValueError, g.stream_chunks, 0)
+
+    @gen_test
+    def test_read_range(self):
+        in_data = b'0123456789'
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3)
+        yield f.write(in_data)
+        yield f.close()
+
+        g = motor.MotorGridOut(self.db.fs, f._id)
+        self.assertEqual(b'2345', (yield g.read_range(2, 4)))
+        self.assertEqual(b'789', (yield g.read_range(7, 100)))
+        self.assertEqual(b'', (yield g.read_range(10, 1)))
+        self.assertEqual(b'', (yield g.read_range(0, 0)))
+        self.assertEqual(0, g.tell())
+
+        # Chunks 0 to 3 are cached now.
+        yield self.db.fs.chunks.delete_many({'files_id': f._id})
+        self.assertEqual(in_data, (yield g.read_range(0, 10)))
+
+        g.chunk_cache_size = 1
+        self.assertEqual(b'4', (yield g.read_range(4, 1)))
+        with self.assertRaises(CorruptGridFile):
+            yield g.read_range(0, 1)
+
+        self.assertRaises(ValueError, g.read_range, -1, 1)
+        self.assertRaises(ValueError, g.read_range, 0, -1)
+
+    @gen_test
+    def test_parallel_upload(self):
+        in_data = b'0123456789' * 10
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3)
+        self.assertIs(f, f.parallel_upload(batch_chunks=2, max_in_flight=2))
+        for i in range(0, len(in_data), 7):
+            yield f.write(in_data[i:i + 7])
+
+        yield f.close()
+        self.assertTrue(f.closed)
+        self.assertEqual(34, (yield self.db.fs.chunks.count(
+            {'files_id': f._id})))
+
+        g = motor.MotorGridOut(self.db.fs, f._id)
+        self.assertEqual(in_data, (yield g.read()))
+        self.assertEqual(hashlib.md5(in_data).hexdigest(), g.md5)
+        self.assertRaises(InvalidOperation, f.parallel_upload)
+
+        # Closing twice at once waits for the batches and closes once.
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3).parallel_upload()
+        yield f.write(in_data)
+        yield [f.close(), f.close()]
+        self.assertTrue(f.closed)
+        g = motor.MotorGridOut(self.db.fs, f._id)
+        self.assertEqual(in_data, (yield g.read()))
+
+        # Abort removes the chunks inserted.
+        f = motor.MotorGridIn(self.db.fs, chunkSize=3).parallel_upload()
+        yield f.write(in_data)
+        yield f.abort()
+        self.assertTrue(f.closed)
+        self.assertEqual(0, (yield self.db.fs.chunks.count(
+            {'files_id': f._id})))
+
+        f = motor.MotorGridIn(self.db.fs).parallel_upload()
+        with self.assertRaises(TypeError):
+            yield f.write(1)
+
+        with self.assertRaises(TypeError):
+            yield f.write('text, but no encoding')
+
     @gen_test
     def test_stream_to_handler(self):
         fs = motor.MotorGridFS(self.db)
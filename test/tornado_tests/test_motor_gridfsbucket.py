@@ -67,3 +67,32 @@ class MotorGridFSBucketTest(MotorTest):
         yield self.bucket.download_to_stream(gin._id, dst)
         self.assertEqual(b"hello world", dst.getvalue())
 
+    @gen_test
+    def test_parallel_upload_from_stream(self):
+        data = b'x' * 1000 + b'y'
+        oid = yield self.bucket.parallel_upload_from_stream(
+            'test_filename', BytesIO(data), chunk_size_bytes=10,
+            batch_chunks=3, max_in_flight=2)
+
+        gout = yield self.bucket.open_download_stream(oid)
+        self.assertEqual(data, (yield gout.read()))
+        self.assertEqual(1, (yield self.db.fs.files.count()))
+        self.assertEqual(101, (yield self.db.fs.chunks.count()))
+
+        class FailingSource(object):
+            reads = 0
+
+            def read(self, size):
+                self.reads += 1
+                if self.reads > 2:
+                    raise IOError('read failed')
+
+                return b'x' * size
+
+        # The failed upload's chunks are removed.
+        with self.assertRaises(IOError):
+            yield self.bucket.parallel_upload_from_stream(
+                'failed', FailingSource(), chunk_size_bytes=10)
+
+        self.assertEqual(1, (yield self.db.fs.files.count()))
+        self.assertEqual(101, (yield self.db.fs.chunks.count()))
@@ -19,15 +19,18 @@ from __future__ import unicode_literals
 import datetime
 import email
 import hashlib
+import json
 import time
 import re
 import unittest
 
 import gridfs
+from tornado import gen
 from tornado.testing import AsyncHTTPTestCase
-from tornado.web import Application
+from tornado.web import Application, RequestHandler
 
 import motor
+import motor.motor_cache
 import motor.web
 import test
 from test.test_environment import env, CA_PEM, CLIENT_PEM
@@ -143,6 +146,73 @@ class GridFSHandlerTest(GridFSHandlerTestBase):
         self.assertEqual(200, response.code)
         self.assertEqual(self.contents, response.body)
 
+    def test_range(self):
+        length = len(self.contents)
+        response = self.fetch('/foo', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(206, response.code)
+        self.assertEqual(self.contents[10:20], response.body)
+        self.assertEqual('bytes 10-19/%d' % length,
+                         response.headers['Content-Range'])
+        self.assertEqual('bytes', response.headers['Accept-Ranges'])
+
+        # Spans a chunk boundary.
+        response = self.fetch('/foo', headers={'Range': 'bytes=261000-'})
+        self.assertEqual(206, response.code)
+        self.assertEqual(self.contents[261000:], response.body)
+
+        # Suffix range.
+        response = self.fetch('/foo', headers={'Range': 'bytes=-5'})
+        self.assertEqual(206, response.code)
+        self.assertEqual(self.contents[-5:], response.body)
+
+        response = self.fetch('/foo', method='HEAD',
+                              headers={'Range': 'bytes=0-99'})
+        self.assertEqual(206, response.code)
+        self.assertEqual(100, int(response.headers['Content-Length']))
+
+        response = self.fetch('/foo',
+                              headers={'Range': 'bytes=%d-' % length})
+        self.assertEqual(416, response.code)
+        self.assertEqual('bytes */%d' % length,
+                         response.headers['Content-Range'])
+
+        # Unknown units are ignored.
+        response = self.fetch('/foo', headers={'Range': 'items=0-1'})
+        self.assertEqual(200, response.code)
+        self.assertEqual(self.contents, response.body)
+
+    def test_if_range(self):
+        response = self.fetch('/foo', method='HEAD')
+        etag = response.headers['Etag']
+        last_modified = response.headers['Last-Modified']
+
+        for if_range in etag, last_modified:
+            response = self.fetch('/foo', headers={'Range': 'bytes=0-9',
+                                                   'If-Range': if_range})
+            self.assertEqual(206, response.code)
+            self.assertEqual(self.contents[:10], response.body)
+
+        # The file changed, send all of it.
+        response = self.fetch('/foo', headers={'Range': 'bytes=0-9',
+                                               'If-Range': '"other"'})
+        self.assertEqual(200, response.code)
+        self.assertEqual(self.contents, response.body)
+
+    def test_multipart_range(self):
+        response = self.fetch('/foo', headers={'Range': 'bytes=0-4,-5'})
+        self.assertEqual(206, response.code)
+        content_type = response.headers['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/byteranges'))
+        boundary = content_type.split('boundary=')[1].encode('ascii')
+        parts = response.body.split(b'--' + boundary)
+        self.assertEqual(4, len(parts))
+        self.assertEqual(b'--\r\n', parts[-1])
+        for part, data in zip(parts[1:3],
+                              (self.contents[:5], self.contents[-5:])):
+            headers, body = part.split(b'\r\n\r\n', 1)
+            self.assertIn(b'Content-Type: my type', headers)
+            self.assertEqual(data, body.rstrip(b'\r\n'))
+
     def test_404(self):
         response = self.fetch('/bar')
         self.assertEqual(404, response.code)
@@ -184,6 +254,190 @@ class GridFSHandlerTest(GridFSHandlerTestBase):
                         expected_type))
 
 
+class CachedGridFSHandlerTest(GridFSHandlerTestBase):
+    def get_app(self):
+        self.cache = motor.motor_cache.FileCache(max_size=768 * 1024,
+                                                 max_file_size=768 * 1024)
+        return Application([
+            ('/(.+)', motor.web.GridFSHandler,
+             {'database': self.motor_db(), 'cache': self.cache})])
+
+    def test_cache(self):
+        response = self.fetch('/foo')
+        self.assertEqual(200, response.code)
+        self.assertEqual(self.contents, response.body)
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(len(self.contents), self.cache.size)
+
+        # Stale entries are checked against the file, and still served.
+        self.cache.revalidate_after = 0
+        response = self.fetch('/foo')
+        self.assertEqual(self.contents, response.body)
+        self.assertEqual(1, self.cache.revalidations)
+
+        # Fresh entries are served without querying MongoDB.
+        self.cache.revalidate_after = 60
+        self.fs.delete(self.file_id)
+        response = self.fetch('/foo', headers={'Range': 'bytes=0-4'})
+        self.assertEqual(206, response.code)
+        self.assertEqual(self.contents[:5], response.body)
+        self.assertEqual(1, self.cache.hits)
+
+        self.cache.revalidate_after = 0
+        response = self.fetch('/foo')
+        self.assertEqual(404, response.code)
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.size)
+
+    def test_cache_eviction(self):
+        self.fs.put(self.contents, filename='bar')
+        self.addCleanup(self.fs.delete, self.fs.get_last_version('bar')._id)
+        self.fetch('/foo')
+        self.fetch('/bar')
+
+        # The cache holds only one copy of contents.
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.assertEqual(self.contents, self.fetch('/foo').body)
+        self.assertEqual(2, self.cache.evictions)
+
+
+class MetadataCachedGridFSHandlerTest(GridFSHandlerTestBase):
+    def get_app(self):
+        class UnopenedGridFSHandler(motor.web.GridFSHandler):
+            @gen.coroutine
+            def get_gridfs_file(self, bucket, filename, request):
+                # Look up by file_id, without opening the gridout.
+                raise gen.Return(motor.MotorGridOut(
+                    self.database[self.root_collection], file_id=filename))
+
+        self.metadata_cache = motor.motor_cache.MetadataCache(
+            ttl=60, negative_ttl=60)
+        db = self.motor_db()
+        return Application([
+            ('/unopened/(.+)', UnopenedGridFSHandler,
+             {'database': db, 'metadata_cache': self.metadata_cache}),
+            ('/(.+)', motor.web.GridFSHandler,
+             {'database': db, 'metadata_cache': self.metadata_cache})])
+
+    def test_metadata_cache(self):
+        response = self.fetch('/foo')
+        self.assertEqual(200, response.code)
+        self.assertEqual(1, len(self.metadata_cache))
+        etag = response.headers['Etag']
+
+        # Conditional and HEAD requests are answered from the cache.
+        self.fs.delete(self.file_id)
+        response = self.fetch('/foo', headers={'If-None-Match': etag})
+        self.assertEqual(304, response.code)
+        response = self.fetch('/foo', method='HEAD')
+        self.assertEqual(200, response.code)
+        self.assertEqual(etag, response.headers['Etag'])
+        self.assertEqual(
+            len(self.contents), int(response.headers['Content-Length']))
+        self.assertEqual('my type', response.headers['Content-Type'])
+        self.assertEqual(2, self.metadata_cache.hits)
+
+    def test_negative_cache(self):
+        self.assertEqual(404, self.fetch('/bar').code)
+        _id = self.fs.put(b'bar', filename='bar')
+        self.addCleanup(self.fs.delete, _id)
+
+        # Still missing until the entry expires.
+        self.assertEqual(404, self.fetch('/bar').code)
+        self.metadata_cache.discard('bar')
+        response = self.fetch('/bar')
+        self.assertEqual(200, response.code)
+        self.assertEqual(b'bar', response.body)
+
+    def test_unopened_gridout(self):
+        # The file document is cached, not the unopened gridout's None.
+        for _ in range(2):
+            response = self.fetch('/unopened/' + self.file_id)
+            self.assertEqual(200, response.code)
+            self.assertEqual(self.contents, response.body)
+
+        self.assertEqual(1, self.metadata_cache.hits)
+        found, document = self.metadata_cache.get(self.file_id)
+        self.assertTrue(found)
+        self.assertEqual('foo', document['filename'])
+
+
+class StaticURLGridFSHandlerTest(GridFSHandlerTestBase):
+    def get_app(self):
+        class StaticURLHandler(RequestHandler):
+            def get(self, path):
+                self.write(self.static_url(path))
+
+        self.versions = motor.web.GridFSVersions(self.motor_db())
+        return Application([('/url/(.+)', StaticURLHandler)],
+                           static_path='unused',
+                           static_handler_class=motor.web.GridFSHandler,
+                           static_handler_args={'database': self.motor_db()},
+                           gridfs_versions=self.versions)
+
+    def test_static_url(self):
+        # Not known until the versions are read.
+        self.assertEqual(b'/static/foo', self.fetch('/url/foo').body)
+        self.io_loop.run_sync(self.versions.start)
+        self.addCleanup(self.versions.stop)
+        url = '/static/foo?v=' + self.contents_hash
+        self.assertEqual(url.encode('ascii'), self.fetch('/url/foo').body)
+
+        # Versioned URLs are cached for a year.
+        response = self.fetch(url)
+        self.assertEqual(200, response.code)
+        self.assertEqual(self.contents, response.body)
+        self.assertEqual('max-age=31536000, immutable',
+                         response.headers['Cache-Control'])
+
+        for url in '/static/foo', '/static/foo?v=old':
+            response = self.fetch(url)
+            self.assertEqual(200, response.code)
+            self.assertEqual('public', response.headers['Cache-Control'])
+
+        # Files uploaded later are read by refresh().
+        _id = self.fs.put(b'bar', filename='bar')
+        self.addCleanup(self.fs.delete, _id)
+        self.assertEqual(None, self.versions.get_version('bar'))
+        self.io_loop.run_sync(self.versions.refresh)
+        self.assertEqual(hashlib.md5(b'bar').hexdigest(),
+                         self.versions.get_version('bar'))
+
+
+class GridFSUploadHandlerTest(GridFSHandlerTestBase):
+    def get_app(self):
+        db = self.motor_db()
+        return Application([
+            ('/upload/(.+)', motor.web.GridFSUploadHandler, {'database': db}),
+            ('/parallel/(.+)', motor.web.GridFSUploadHandler,
+             {'database': db, 'parallel_upload': True}),
+            ('/(.+)', motor.web.GridFSHandler, {'database': db})])
+
+    def test_upload(self):
+        for method, prefix in ('POST', 'upload'), ('PUT', 'parallel'):
+            response = self.fetch('/%s/uploaded' % prefix,
+                                  method=method,
+                                  body=self.contents,
+                                  headers={'Content-Type': 'my type'})
+            self.assertEqual(201, response.code)
+            result = json.loads(response.body.decode('utf-8'))
+            self.assertEqual(len(self.contents), result['length'])
+            self.addCleanup(self.fs.delete, self.fs.get_last_version(
+                'uploaded')._id)
+
+            response = self.fetch('/uploaded')
+            self.assertEqual(200, response.code)
+            self.assertEqual(self.contents, response.body)
+            self.assertEqual('my type', response.headers['Content-Type'])
+            self.assertEqual(self.contents_hash,
+                             response.headers['Etag'].strip('"'))
+
+    def test_upload_method(self):
+        response = self.fetch('/upload/foo')
+        self.assertEqual(405, response.code)
+
+
 class TZAwareGridFSHandlerTest(GridFSHandlerTestBase):
     def motor_db(self):
         return super(TZAwareGridFSHandlerTest, self).motor_db(tz_aware=True)